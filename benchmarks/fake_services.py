@@ -0,0 +1,703 @@
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# GitHub stops listing a recursive tree after this many entries and marks the listing as truncated
+GITHUB_TREE_LIMIT = 100000
+
+# The MIME types Drive reports for Google Sheets and Google Slides files
+SHEETS_MIME_TYPE = "application/vnd.google-apps.spreadsheet"
+SLIDES_MIME_TYPE = "application/vnd.google-apps.presentation"
+
+
+class ServiceError(Exception):
+    """ An error response from one of the fake services.
+    """
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def column_number(letters):
+    """ Turns a column name into its number ('A' --> 1, 'AA' --> 27).
+
+    Args:
+        letters (str): The column name
+
+    Returns:
+        int: The column number
+    """
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number
+
+
+def column_name(number):
+    """ Turns a column number into its name (1 --> 'A', 27 --> 'AA').
+
+    Args:
+        number (int): The column number
+
+    Returns:
+        str: The column name
+    """
+    letters = ""
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def parse_range(range_name):
+    """ Splits an A1 range ("'Sheet1'!A5:I", "Sheet1!A12:12", "Sheet1") into its sheet and bounds.
+
+    Args:
+        range_name (str): The range
+
+    Returns:
+        tuple: The sheet title (str), first row (int), last row (int or None for "to the end"), first column (int) and
+               last column (int or None for "to the end")
+    """
+    sheet_part, _, cells = range_name.partition("!")
+    title = sheet_part[1:-1].replace("''", "'") if sheet_part.startswith("'") else sheet_part
+    match = re.fullmatch(r"([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?", cells)
+    first_column = column_number(match.group(1)) if match.group(1) else 1
+    first_row = int(match.group(2)) if match.group(2) else 1
+    if match.group(3) is None and match.group(4) is None: # <--- a single cell (or the whole sheet)
+        last_column = first_column if match.group(1) else None
+        last_row = first_row if match.group(2) else None
+    else:
+        last_column = column_number(match.group(3)) if match.group(3) else None
+        last_row = int(match.group(4)) if match.group(4) else None
+    return title, first_row, last_row, first_column, last_column
+
+
+def format_sheet_title(title):
+    """ Formats a sheet title the way the Sheets API does in the ranges it returns.
+
+    Args:
+        title (str): The sheet title
+
+    Returns:
+        str: The title, quoted if it has anything other than letters, digits and underscores in it
+    """
+    return title if re.fullmatch(r"\w+", title) else "'" + title.replace("'", "''") + "'"
+
+
+class FakeServices:
+    """ Local stand-ins for the parts of the GitHub Git Data and Contents APIs and the Sheets, Slides and Drive APIs that
+        flake_tracker.py, bulk_ingest.py and cleanup.py use, served over HTTP on 127.0.0.1 so the real client code runs
+        against them unchanged. Every request is counted, and each one can be given a fixed latency and held to a
+        per-second rate limit (GitHub and Google are limited separately, with each service's own throttling response).
+    """
+
+    def __init__(self, latency_ms=0, github_rate_limit=0, google_rate_limit=0):
+        """
+        Args:
+            latency_ms (float, optional): How long every request takes before it is answered. Defaults to 0.
+            github_rate_limit (int, optional): The most GitHub requests answered per second (0 for no limit). Defaults to 0.
+            google_rate_limit (int, optional): The most Google requests answered per second (0 for no limit). Defaults to 0.
+        """
+        self.latency_ms = latency_ms
+        self.rate_limits = {"github": github_rate_limit, "google": google_rate_limit}
+        self.windows = {"github": [0, 0], "google": [0, 0]} # <--- [second, requests answered in that second]
+        self.lock = threading.RLock()
+        self.requests = Counter() # <--- "<service> <METHOD> <route>" --> how many times it was called
+        self.throttled = Counter() # <--- service --> how many requests were turned away by the rate limit
+        self.bytes_received = Counter() # <--- service --> request body bytes
+        self.repos = {}
+        self.spreadsheets = {}
+        self.presentations = {}
+        self.permissions = {} # <--- file ID --> who it is shared with (presentations are shared with the lab when added)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(self))
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        """ The base URL the fake services are served at (e.g. "http://127.0.0.1:53124").
+        """
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """ Starts serving requests on a background thread.
+
+        Returns:
+            FakeServices: Itself, so it can be created and started in one line
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """ Stops serving requests.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counts(self):
+        """ Forgets every request counted so far (e.g. between benchmark scenarios).
+        """
+        with self.lock:
+            self.requests.clear()
+            self.throttled.clear()
+            self.bytes_received.clear()
+
+    def get_counts(self):
+        """ Gets how many requests each service has answered since the counts were last reset.
+
+        Returns:
+            dict: Request totals by service, the number of throttled requests by service, the bytes received by service
+                  and the count of every individual route
+        """
+        with self.lock:
+            by_service = Counter()
+            for route, count in self.requests.items():
+                by_service[route.split(" ", 1)[0]] += count
+            return {"requests": dict(by_service), "throttled": dict(self.throttled), "bytes_received": dict(self.bytes_received),
+                    "routes": dict(self.requests)}
+
+    # --- Setting up test data ---
+
+    def add_repo(self, repo, branch, files=None, committed_at=None):
+        """ Creates a repo with one commit holding the given files.
+
+        Args:
+            repo (str): The repo in the form "owner/name"
+            branch (str): The branch the commit is on
+            files (dict, optional): Paths mapped to their contents (bytes). Defaults to None (an empty repo).
+            committed_at (datetime, optional): When the commit was made (UTC). Defaults to now.
+        """
+        with self.lock:
+            state = {"blobs": {}, "trees": {}, "commits": {}, "refs": {}}
+            self.repos[repo] = state
+            tree = {}
+            for path, content in (files or {}).items():
+                tree[path] = self.store_blob(state, content)
+            tree_sha = self.store_tree(state, tree)
+            state["refs"][branch] = self.store_commit(state, "Initial commit", tree_sha, [], committed_at)
+
+    def add_spreadsheet(self, title, sheet_title="Sheet1", rows=None):
+        """ Creates a spreadsheet with one sheet.
+
+        Args:
+            title (str): The spreadsheet name
+            sheet_title (str, optional): The sheet name. Defaults to "Sheet1".
+            rows (list, optional): The rows already in the sheet (lists of values). Defaults to None (an empty sheet).
+
+        Returns:
+            str: The spreadsheet's ID
+        """
+        with self.lock:
+            spreadsheet_id = uuid.uuid4().hex
+            now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            self.spreadsheets[spreadsheet_id] = {"title": title, "created": now, "modified": now, "sheets": []}
+            self.add_sheet(spreadsheet_id, sheet_title, rows)
+            return spreadsheet_id
+
+    def add_sheet(self, spreadsheet_id, sheet_title, rows=None):
+        """ Adds a sheet to a spreadsheet.
+
+        Args:
+            spreadsheet_id (str): The spreadsheet's ID
+            sheet_title (str): The sheet name
+            rows (list, optional): The rows already in the sheet (lists of values). Defaults to None (an empty sheet).
+        """
+        with self.lock:
+            sheets = self.spreadsheets[spreadsheet_id]["sheets"]
+            sheets.append({"sheetId": len(sheets), "title": sheet_title, "rows": [[str(value) for value in row] for row in rows or []]})
+
+    def add_presentation(self, title, slide_count):
+        """ Creates a presentation whose first slide is the flake template.
+
+        Args:
+            title (str): The presentation name
+            slide_count (int): How many slides it starts with (including the template)
+
+        Returns:
+            str: The presentation's ID
+        """
+        with self.lock:
+            presentation_id = uuid.uuid4().hex
+            now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            self.presentations[presentation_id] = {"title": title, "created": now, "modified": now, "elements": {}, "skipped": set(),
+                                                   "slides": ["template"] + [f"existing_{i}" for i in range(1, slide_count)]}
+            self.permissions[presentation_id] = [{"type": "user", "role": "owner", "emailAddress": "benchmark@example.com"},
+                                                 {"type": "group", "role": "writer", "emailAddress": "lab@example.com"}]
+            return presentation_id
+
+    # --- Request handling ---
+
+    def handle(self, method, url, body):
+        """ Answers one request.
+
+        Args:
+            method (str): The HTTP method
+            url (str): The path and query string
+            body (bytes): The request body
+
+        Returns:
+            tuple: The status code (int), extra headers (dict) and JSON response (dict or list)
+        """
+        parts = urlsplit(url)
+        path = parts.path
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        service = self.get_service(path)
+        family = "github" if service == "github" else "google"
+        with self.lock:
+            self.bytes_received[service] += len(body)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        try:
+            self.check_rate_limit(family)
+            data = json.loads(body) if body else {}
+            route, status, response = self.route(service, method, path, query, data)
+            with self.lock:
+                self.requests[f"{service} {method} {route}"] += 1
+            return status, {}, response
+        except ServiceError as e:
+            with self.lock:
+                self.requests[f"{service} {method} error"] += 1
+            if family == "github":
+                return e.status, e.headers, {"message": str(e)}
+            return e.status, e.headers, {"error": {"code": e.status, "message": str(e), "status": "FAILED_PRECONDITION"}}
+
+    def get_service(self, path):
+        """ Works out which service a request is for from its path.
+
+        Args:
+            path (str): The request path
+
+        Returns:
+            str: "github", "sheets", "slides" or "drive"
+        """
+        if path.startswith("/repos/"):
+            return "github"
+        if path.startswith("/v4/spreadsheets"):
+            return "sheets"
+        if path.startswith("/v1/presentations"):
+            return "slides"
+        return "drive"
+
+    def check_rate_limit(self, family):
+        """ Turns a request away if too many requests have already been answered this second.
+
+        Args:
+            family (str): "github" or "google" (they are limited separately)
+
+        Raises:
+            ServiceError: If the rate limit has been reached, with the headers the real service sends
+        """
+        limit = self.rate_limits[family]
+        if not limit:
+            return
+        with self.lock:
+            second = int(time.time())
+            window = self.windows[family]
+            if window[0] != second:
+                window[:] = [second, 0]
+            if window[1] < limit:
+                window[1] += 1
+                return
+            self.throttled[family] += 1
+        if family == "github": # <--- GitHub uses 403 with its rate limit headers
+            raise ServiceError(403, "API rate limit exceeded", {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(second + 1)})
+        raise ServiceError(429, "Quota exceeded", {"Retry-After": "1"})
+
+    def route(self, service, method, path, query, data):
+        """ Sends a request to the handler for its route.
+
+        Returns:
+            tuple: The route name (str), status code (int) and JSON response
+        """
+        handler = getattr(self, f"handle_{service}")
+        with self.lock:
+            return handler(method, unquote(path), query, data)
+
+    # --- GitHub ---
+
+    def store_blob(self, state, content):
+        sha = hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+        state["blobs"][sha] = len(content)
+        return sha
+
+    def store_tree(self, state, files):
+        sha = hashlib.sha1(json.dumps(sorted(files.items())).encode("utf-8")).hexdigest()
+        state["trees"][sha] = dict(files)
+        return sha
+
+    def store_commit(self, state, message, tree_sha, parents, committed_at=None):
+        sha = hashlib.sha1(uuid.uuid4().bytes).hexdigest()
+        date = (committed_at or datetime.utcnow()).strftime("%Y-%m-%dT%H:%M:%SZ")
+        state["commits"][sha] = {"message": message, "tree": tree_sha, "parents": parents, "date": date}
+        return sha
+
+    def resolve_tree(self, state, tree_ish):
+        """ Gets the files under a tree SHA or a "<branch or commit>:<folder>" path.
+
+        Returns:
+            dict: Paths (relative to the folder) mapped to blob SHAs
+        """
+        if ":" not in tree_ish:
+            if tree_ish not in state["trees"]:
+                raise ServiceError(404, "Not Found")
+            return state["trees"][tree_ish]
+        ref, folder = tree_ish.split(":", 1)
+        commit_sha = state["refs"].get(ref, ref)
+        if commit_sha not in state["commits"]:
+            raise ServiceError(404, "Not Found")
+        files = state["trees"][state["commits"][commit_sha]["tree"]]
+        if not folder:
+            return files
+        prefix = folder.rstrip("/") + "/"
+        found = {path[len(prefix):]: sha for path, sha in files.items() if path.startswith(prefix)}
+        if not found:
+            raise ServiceError(404, "Not Found")
+        return found
+
+    def handle_github(self, method, path, query, data):
+        match = re.fullmatch(r"/repos/([^/]+/[^/]+)/(.*)", path)
+        if not match or match.group(1) not in self.repos:
+            raise ServiceError(404, "Not Found")
+        state = self.repos[match.group(1)]
+        rest = match.group(2)
+
+        if method == "GET" and rest.startswith("git/ref/heads/"):
+            branch = rest[len("git/ref/heads/"):]
+            if branch not in state["refs"]:
+                raise ServiceError(404, "Not Found")
+            return "git/ref", 200, {"ref": f"refs/heads/{branch}", "object": {"sha": state["refs"][branch], "type": "commit"}}
+
+        if method == "GET" and rest.startswith("git/commits/"):
+            commit = state["commits"].get(rest[len("git/commits/"):])
+            if commit is None:
+                raise ServiceError(404, "Not Found")
+            return "git/commits", 200, {"sha": rest[len("git/commits/"):], "tree": {"sha": commit["tree"]},
+                                        "parents": [{"sha": parent} for parent in commit["parents"]]}
+
+        if method == "GET" and rest.startswith("git/trees/"):
+            files = self.resolve_tree(state, rest[len("git/trees/"):])
+            entries = [{"path": file_path, "mode": "100644", "type": "blob", "sha": sha, "size": state["blobs"].get(sha, 0)}
+                       for file_path, sha in sorted(files.items())]
+            return "git/trees", 200, {"sha": hashlib.sha1(rest.encode("utf-8")).hexdigest(), "tree": entries[:GITHUB_TREE_LIMIT],
+                                      "truncated": len(entries) > GITHUB_TREE_LIMIT}
+
+        if method == "POST" and rest == "git/blobs":
+            sha = self.store_blob(state, base64.b64decode(data["content"]))
+            return "git/blobs", 201, {"sha": sha}
+
+        if method == "POST" and rest == "git/trees":
+            files = dict(state["trees"][data["base_tree"]]) if data.get("base_tree") else {}
+            for entry in data["tree"]:
+                if entry["sha"] is None:
+                    if entry["path"] not in files: # <--- GitHub rejects removing a path that isn't there
+                        raise ServiceError(422, f"path '{entry['path']}' does not exist")
+                    del files[entry["path"]]
+                elif entry["sha"] not in state["blobs"]:
+                    raise ServiceError(422, f"blob {entry['sha']} does not exist")
+                else:
+                    files[entry["path"]] = entry["sha"]
+            return "git/trees", 201, {"sha": self.store_tree(state, files)}
+
+        if method == "POST" and rest == "git/commits":
+            return "git/commits", 201, {"sha": self.store_commit(state, data["message"], data["tree"], data["parents"])}
+
+        if method == "PATCH" and rest.startswith("git/refs/heads/"):
+            branch = rest[len("git/refs/heads/"):]
+            commit = state["commits"].get(data["sha"])
+            if commit is None:
+                raise ServiceError(422, "Object does not exist")
+            if not data.get("force") and state["refs"].get(branch) not in commit["parents"]:
+                raise ServiceError(422, "Update is not a fast forward")
+            state["refs"][branch] = data["sha"]
+            return "git/refs", 200, {"ref": f"refs/heads/{branch}", "object": {"sha": data["sha"], "type": "commit"}}
+
+        if method == "GET" and rest == "commits":
+            commit_sha = state["refs"].get(query.get("sha"), query.get("sha"))
+            history = []
+            while commit_sha and len(history) < int(query.get("per_page", 30)):
+                commit = state["commits"][commit_sha]
+                parent = commit["parents"][0] if commit["parents"] else None
+                file_sha = state["trees"][commit["tree"]].get(query.get("path"))
+                parent_sha = state["trees"][state["commits"][parent]["tree"]].get(query.get("path")) if parent else None
+                if file_sha != parent_sha: # <--- this commit changed the file
+                    history.append({"sha": commit_sha, "commit": {"message": commit["message"], "committer": {"date": commit["date"]}}})
+                commit_sha = parent
+            return "commits", 200, history
+
+        if method == "DELETE" and rest.startswith("contents/"):
+            file_path = rest[len("contents/"):]
+            branch = data.get("branch")
+            head = state["commits"][state["refs"][branch]]
+            files = dict(state["trees"][head["tree"]])
+            if file_path not in files:
+                raise ServiceError(404, "Not Found")
+            if files[file_path] != data.get("sha"):
+                raise ServiceError(409, f"{file_path} does not match {data.get('sha')}")
+            del files[file_path]
+            state["refs"][branch] = self.store_commit(state, data["message"], self.store_tree(state, files), [state["refs"][branch]])
+            return "contents", 200, {"commit": {"sha": state["refs"][branch]}}
+
+        raise ServiceError(404, "Not Found")
+
+    # --- Drive ---
+
+    def list_drive_files(self):
+        """ Gets every spreadsheet and presentation as a Drive file.
+
+        Returns:
+            list: Drive file resources
+        """
+        files = [{"id": key, "name": s["title"], "mimeType": SHEETS_MIME_TYPE, "createdTime": s["created"],
+                  "modifiedTime": s["modified"]} for key, s in self.spreadsheets.items()]
+        files += [{"id": key, "name": p["title"], "mimeType": SLIDES_MIME_TYPE, "createdTime": p["created"],
+                   "modifiedTime": p["modified"]} for key, p in self.presentations.items()]
+        return files
+
+    def handle_drive(self, method, path, query, data):
+        match = re.fullmatch(r"/drive/v3/files(?:/([^/]+))?(?:/(copy|permissions))?", path)
+        if not match:
+            raise ServiceError(404, "Not Found")
+        if match.group(2) == "copy": # <--- (only presentations are ever copied)
+            with self.lock:
+                if match.group(1) not in self.presentations:
+                    raise ServiceError(404, "File not found")
+                original = self.presentations[match.group(1)]
+                presentation_id = uuid.uuid4().hex
+                now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000Z")
+                self.presentations[presentation_id] = {"title": data.get("name", original["title"]), "created": now, "modified": now,
+                                                       "elements": dict(original["elements"]),
+                                                       "skipped": set(original["skipped"]), "slides": list(original["slides"])}
+                self.permissions[presentation_id] = [{"type": "user", "role": "owner", "emailAddress": "benchmark@example.com"}]
+            return "files.copy", 200, {"id": presentation_id}
+        if match.group(2) == "permissions":
+            with self.lock:
+                if match.group(1) not in self.permissions:
+                    raise ServiceError(404, "File not found")
+                if method == "POST":
+                    self.permissions[match.group(1)].append(data)
+                    return "permissions.create", 200, data
+                return "permissions.list", 200, {"permissions": list(self.permissions[match.group(1)])}
+        files = self.list_drive_files()
+        if method == "GET" and match.group(1) is None:
+            q = query.get("q", "")
+            name = re.search(r'name = "(.*?)"', q)
+            mime_type = re.search(r'mimeType\s*=\s*"(.*?)"', q)
+            files = [f for f in files if (not name or f["name"] == name.group(1)) and (not mime_type or f["mimeType"] == mime_type.group(1))]
+            return "files.list", 200, {"kind": "drive#fileList", "files": files}
+        if method == "GET":
+            for f in files:
+                if f["id"] == match.group(1):
+                    return "files.get", 200, f
+        raise ServiceError(404, "File not found")
+
+    # --- Sheets ---
+
+    def touch(self, resource):
+        resource["modified"] = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    def find_sheet(self, spreadsheet, title=None, sheet_id=None):
+        for sheet in spreadsheet["sheets"]:
+            if sheet["title"] == title or sheet["sheetId"] == sheet_id:
+                return sheet
+        raise ServiceError(400, f"Unable to parse range: {title}")
+
+    def handle_sheets(self, method, path, query, data):
+        match = re.fullmatch(r"/v4/spreadsheets/([^/:]+)(?::(batchUpdate)|/values/(.+?)(?::(append))?)?", path)
+        if not match or match.group(1) not in self.spreadsheets:
+            raise ServiceError(404, "Requested entity was not found.")
+        spreadsheet_id = match.group(1)
+        spreadsheet = self.spreadsheets[spreadsheet_id]
+
+        if method == "GET" and match.group(2) is None and match.group(3) is None: # <--- spreadsheet metadata
+            sheets = [{"properties": {"sheetId": s["sheetId"], "title": s["title"], "index": i, "sheetType": "GRID",
+                                      "gridProperties": {"rowCount": max(len(s["rows"]), 1000), "columnCount": 26}}}
+                      for i, s in enumerate(spreadsheet["sheets"])]
+            return "spreadsheets.get", 200, {"spreadsheetId": spreadsheet_id, "sheets": sheets,
+                                             "properties": {"title": spreadsheet["title"], "locale": "en_US", "timeZone": "Etc/GMT"}}
+
+        if method == "GET" and match.group(3): # <--- read a range of values
+            title, first_row, last_row, first_column, last_column = parse_range(match.group(3))
+            rows = self.find_sheet(spreadsheet, title)["rows"]
+            selected = rows[first_row - 1:last_row]
+            values = [row[first_column - 1:last_column] for row in selected]
+            while values and not values[-1]:
+                values.pop()
+            response = {"range": match.group(3), "majorDimension": "ROWS"}
+            if values:
+                response["values"] = values
+            return "values.get", 200, response
+
+        if method == "POST" and match.group(4): # <--- append rows after the last row with data
+            title = parse_range(match.group(3))[0]
+            sheet = self.find_sheet(spreadsheet, title)
+            new_rows = [[str(value) for value in row] for row in data.get("values", [])]
+            first_row = len(sheet["rows"]) + 1
+            sheet["rows"].extend(new_rows)
+            self.touch(spreadsheet)
+            width = max((len(row) for row in new_rows), default=1)
+            updated_range = f"{format_sheet_title(title)}!A{first_row}:{column_name(width)}{first_row + len(new_rows) - 1}"
+            return "values.append", 200, {"spreadsheetId": spreadsheet_id, "tableRange": f"{format_sheet_title(title)}!A1:{column_name(width)}{first_row - 1}",
+                                          "updates": {"spreadsheetId": spreadsheet_id, "updatedRange": updated_range,
+                                                      "updatedRows": len(new_rows), "updatedColumns": width,
+                                                      "updatedCells": len(new_rows) * width}}
+
+        if method == "POST" and match.group(2): # <--- batch update
+            replies = []
+            for request in data.get("requests", []):
+                if "deleteDimension" in request and request["deleteDimension"]["range"]["dimension"] == "ROWS":
+                    bounds = request["deleteDimension"]["range"]
+                    sheet = self.find_sheet(spreadsheet, sheet_id=bounds["sheetId"])
+                    del sheet["rows"][bounds["startIndex"]:bounds["endIndex"]]
+                replies.append({})
+            self.touch(spreadsheet)
+            return "spreadsheets.batchUpdate", 200, {"spreadsheetId": spreadsheet_id, "replies": replies}
+
+        raise ServiceError(404, "Not Found")
+
+    # --- Slides ---
+
+    def handle_slides(self, method, path, query, data):
+        match = re.fullmatch(r"/v1/presentations/([^/:]+)(:batchUpdate)?", path)
+        if not match or match.group(1) not in self.presentations:
+            raise ServiceError(404, "Requested entity was not found.")
+        presentation_id = match.group(1)
+        presentation = self.presentations[presentation_id]
+
+        if method == "GET" and not match.group(2):
+            if query.get("fields") == "slides.objectId": # <--- field-masked read: slide IDs only
+                return "presentations.get", 200, {"slides": [{"objectId": slide_id} for slide_id in presentation["slides"]]}
+            if query.get("fields") == "slides(objectId,slideProperties/isSkipped)": # <--- slide IDs and which are hidden (false is left out, like the real API)
+                return "presentations.get", 200, {"slides": [{"objectId": slide_id, **({"slideProperties": {"isSkipped": True}} if slide_id in presentation["skipped"] else {})}
+                                                             for slide_id in presentation["slides"]]}
+            slides = [{"objectId": slide_id, "pageElements": [{"objectId": f"{slide_id}_{name}", "shape": {"shapeType": "TEXT_BOX"}}
+                                                              for name in ("title", "navigation", "size")]}
+                      for slide_id in presentation["slides"]]
+            return "presentations.get", 200, {"presentationId": presentation_id, "title": presentation["title"], "slides": slides}
+
+        if method == "POST" and match.group(2):
+            slides = list(presentation["slides"]) # <--- work on a copy so a bad request changes nothing (like the real API)
+            elements = dict(presentation["elements"])
+            skipped = set(presentation["skipped"])
+            replies = [self.apply_slides_request(slides, elements, skipped, request) for request in data.get("requests", [])]
+            presentation["slides"], presentation["elements"], presentation["skipped"] = slides, elements, skipped
+            self.touch(presentation)
+            return "presentations.batchUpdate", 200, {"presentationId": presentation_id, "replies": replies}
+
+        raise ServiceError(404, "Not Found")
+
+    def apply_slides_request(self, slides, elements, skipped, request):
+        """ Applies one Slides batch update request to a presentation's slides and page elements.
+
+        Args:
+            slides (list): The slide IDs, in order (changed in place)
+            elements (dict): Page element IDs mapped to the slide they are on (changed in place)
+            skipped (set): The IDs of the slides hidden from the slideshow (changed in place)
+            request (dict): The request
+
+        Raises:
+            ServiceError: If the request refers to something that doesn't exist (or creates something that already does)
+
+        Returns:
+            dict: The reply for the request
+        """
+        def check_new_id(object_id):
+            if object_id in slides or object_id in elements:
+                raise ServiceError(400, f"The object ID ({object_id}) should be unique among all pages and page elements.")
+
+        if "duplicateObject" in request:
+            original = request["duplicateObject"]["objectId"]
+            if original not in slides:
+                raise ServiceError(400, f"The object ({original}) could not be found.")
+            new_id = request["duplicateObject"].get("objectIds", {}).get(original) or uuid.uuid4().hex
+            check_new_id(new_id)
+            slides.insert(slides.index(original) + 1, new_id)
+            if original in skipped:
+                skipped.add(new_id)
+            return {"duplicateObject": {"objectId": new_id}}
+        if "updateSlidesPosition" in request:
+            moving = request["updateSlidesPosition"]["slideObjectIds"]
+            insertion_index = request["updateSlidesPosition"]["insertionIndex"]
+            if any(slide_id not in slides for slide_id in moving) or not 0 <= insertion_index <= len(slides):
+                raise ServiceError(400, "Invalid requests[updateSlidesPosition]")
+            before = sum(1 for i, slide_id in enumerate(slides) if slide_id in moving and i < insertion_index)
+            remaining = [slide_id for slide_id in slides if slide_id not in moving]
+            slides[:] = remaining[:insertion_index - before] + moving + remaining[insertion_index - before:]
+            return {}
+        if "updateSlideProperties" in request:
+            slide_id = request["updateSlideProperties"]["objectId"]
+            if slide_id not in slides:
+                raise ServiceError(400, f"The object ({slide_id}) could not be found.")
+            if "isSkipped" in request["updateSlideProperties"]["fields"]:
+                if request["updateSlideProperties"]["slideProperties"].get("isSkipped"):
+                    skipped.add(slide_id)
+                else:
+                    skipped.discard(slide_id)
+            return {}
+        if "replaceAllText" in request:
+            pages = request["replaceAllText"].get("pageObjectIds") or slides
+            return {"replaceAllText": {"occurrencesChanged": sum(1 for page in pages if page in slides)}}
+        if "createImage" in request:
+            page = request["createImage"]["elementProperties"]["pageObjectId"]
+            if page not in slides:
+                raise ServiceError(400, f"The object ({page}) could not be found.")
+            new_id = request["createImage"].get("objectId") or uuid.uuid4().hex
+            check_new_id(new_id)
+            elements[new_id] = page
+            return {"createImage": {"objectId": new_id}}
+        if "deleteObject" in request:
+            object_id = request["deleteObject"]["objectId"]
+            if object_id in slides:
+                slides.remove(object_id)
+                skipped.discard(object_id)
+                for element_id in [e for e, page in elements.items() if page == object_id]:
+                    del elements[element_id]
+            elif object_id in elements:
+                del elements[object_id]
+            else:
+                raise ServiceError(400, f"The object ({object_id}) could not be found.")
+            return {}
+        return {}
+
+
+def make_handler(services):
+    """ Makes the request handler class for a FakeServices server.
+
+    Args:
+        services (FakeServices): The fake services that answer the requests
+
+    Returns:
+        type: A BaseHTTPRequestHandler subclass
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # <--- keep connections open between requests, like the real APIs
+
+        def respond(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            status, headers, response = services.handle(self.command, self.path, body)
+            payload = json.dumps(response).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = respond
+
+        def log_message(self, format, *args): # <--- don't print a line per request
+            pass
+
+    return Handler
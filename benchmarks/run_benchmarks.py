@@ -0,0 +1,626 @@
+""" Runs the Flake Tracker's real upload, bulk ingest, cleanup and undo code against local stand-ins for GitHub and the
+    Google APIs (see fake_services.py) and reports how long each scenario took and how many requests it made. Nothing
+    touches the network, so this can be run before every release to catch performance regressions.
+
+    Run it from the top of the repo (python benchmarks/run_benchmarks.py works too):
+        python -m benchmarks.run_benchmarks                      # every scenario
+        python -m benchmarks.run_benchmarks undo --deck-size 5000
+        python -m benchmarks.run_benchmarks catalog --sheet-rows 50000
+        python -m benchmarks.run_benchmarks watch --submits 10
+        python -m benchmarks.run_benchmarks server --stations 8 --submits 10
+        python -m benchmarks.run_benchmarks quota --quota-per-minute 120 --google-rate-limit 5
+        python -m benchmarks.run_benchmarks rollover --deck-rollover slides:3 --submits 10
+        python -m benchmarks.run_benchmarks --output results.json
+        python -m benchmarks.run_benchmarks --baseline results.json   # exits with 1 if anything got slower or chattier
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+import gspread
+import httplib2
+import requests
+from googleapiclient.discovery import build
+
+if not __package__: # <--- run as a script (python benchmarks/run_benchmarks.py), so the top of the repo isn't on the path yet
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bulk_ingest
+import cleanup
+import flake_catalog
+import flake_tracker
+import github_git
+import http_session
+import image_processing
+import outbox
+import quota_scheduler
+import submission_server
+import tracing
+import watch_folder
+from benchmarks.fake_services import FakeServices
+
+# The names the benchmark data is set up under
+BENCHMARK_REPO = "benchmark/flake-images"
+BENCHMARK_BRANCH = "main"
+BENCHMARK_UPLOAD_PATH = "Images"
+BENCHMARK_PRESENTATION = "Benchmark Deck"
+BENCHMARK_SPREADSHEET = "Benchmark Flakes"
+BENCHMARK_SHEET = "Sheet1"
+BENCHMARK_DATE = "101726" # <--- the MMDDYY scan folder the generated images go in
+
+# The header row of our flake sheet
+SHEET_HEADER = ["Flake_ID", "Date", "Chip", "Flake", "Horizontal_Max", "Vertical_Max", "Down_From_TR", "Left_From_TR", "Layers"]
+
+# What share of the images in the cleanup scenario have no upload time in their name (so cleanup has to look up their
+# last commit instead, like images uploaded before timestamps were added)
+LEGACY_IMAGE_FRACTION = 0.01
+
+# The quota (requests per minute, for every API) the quota scenario uses when --quota-per-minute isn't given
+DEFAULT_QUOTA_PER_MINUTE = 120
+
+# How much slower (as a fraction) a scenario may get compared to the baseline before it counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+class FakeRoutedHTTPClient(flake_tracker.TracedHTTPClient):
+    """ The gspread HTTP client the Flake Tracker uses, but sending every Sheets and Drive request to the fake services.
+    """
+    base_url = ""
+
+    def request(self, method, endpoint, *args, **kwargs):
+        for real_url in ("https://sheets.googleapis.com", "https://www.googleapis.com"):
+            if endpoint.startswith(real_url):
+                endpoint = self.base_url + endpoint[len(real_url):]
+        return super().request(method, endpoint, *args, **kwargs)
+
+
+def connect_to_fakes(services, workdir):
+    """ Points flake_tracker (and the modules it uses) at the fake services, with every cache emptied and every local file
+        kept in the working directory.
+
+    Args:
+        services (FakeServices): The running fake services
+        workdir (str): The scenario's working directory
+    """
+    github_git.GITHUB_API_URL = services.url
+    FakeRoutedHTTPClient.base_url = services.url
+    flake_tracker.client = gspread.Client(None, session=requests.Session(), http_client=FakeRoutedHTTPClient)
+    flake_tracker.slides_service = build("slides", "v1", http=httplib2.Http(), static_discovery=True,
+                                         client_options={"api_endpoint": services.url + "/"})
+    flake_tracker.drive_service = build("drive", "v3", http=httplib2.Http(), static_discovery=True,
+                                        client_options={"api_endpoint": services.url + "/drive/v3/"})
+
+    flake_tracker.github_token = "benchmark-token"
+    flake_tracker.github_repo = BENCHMARK_REPO
+    flake_tracker.github_branch = BENCHMARK_BRANCH
+    flake_tracker.github_upload_path = BENCHMARK_UPLOAD_PATH
+    flake_tracker.image_index = {}
+    flake_tracker.image_index_seeded = False
+    flake_tracker.image_index_file = os.path.join(workdir, "uploaded_images.json")
+    flake_tracker.image_cache_dir = os.path.join(workdir, ".image_cache")
+    flake_tracker.image_processing_enabled = image_processing.is_available()
+    flake_tracker.startup_cache_file = os.path.join(workdir, "startup_cache.json")
+    flake_tracker.startup_cache = None
+    flake_tracker.worksheets.clear()
+    flake_tracker.slide_ids_cache.clear()
+    flake_tracker.spare_slides.clear()
+    flake_tracker.spare_slides_wanted.clear()
+    quota_scheduler.reset()
+    outbox.open_outbox(os.path.join(workdir, "outbox.db"))
+
+
+def create_lab(services, options):
+    """ Creates the repo, presentation and spreadsheets a lab would have.
+
+    Args:
+        services (FakeServices): The running fake services
+        options (argparse.Namespace): The command-line options (for the deck and sheet sizes)
+    """
+    services.add_repo(BENCHMARK_REPO, BENCHMARK_BRANCH, {f"{BENCHMARK_UPLOAD_PATH}/.gitkeep": b""})
+    presentation_id = services.add_presentation(BENCHMARK_PRESENTATION, options.deck_size)
+    services.add_spreadsheet("Presentation IDs", rows=[["Slideshow_Name", "Presentation_ID"], [BENCHMARK_PRESENTATION, presentation_id]])
+    rows = [SHEET_HEADER] + [[f"S9_{i}_010125", "01/01/2025", 9, i, 10, 10, 1, 1, 2] for i in range(1, options.sheet_rows)]
+    services.add_spreadsheet(BENCHMARK_SPREADSHEET, BENCHMARK_SHEET, rows)
+
+
+def start_session():
+    """ Loads the presentation names and opens the chosen presentation and sheet, the way the GUI does at startup.
+    """
+    flake_tracker.pres_id_dict = flake_tracker.process_presentation_IDs(flake_tracker.PRESENTATION_IDS_SPREADSHEET,
+                                                                        flake_tracker.PRESENTATION_IDS_SHEET)
+    flake_tracker.load_settings_from_inputs(flake_tracker.get_presentation_ID_from_slideshow_name(BENCHMARK_PRESENTATION),
+                                            BENCHMARK_SPREADSHEET, BENCHMARK_SHEET)
+
+
+def set_up_lab(services, workdir, options):
+    """ Creates the lab's repo, presentation and spreadsheets, connects flake_tracker to them and starts a session.
+
+    Args:
+        services (FakeServices): The running fake services
+        workdir (str): The scenario's working directory
+        options (argparse.Namespace): The command-line options (for the deck and sheet sizes, the spare slides, the quotas 
+                                      and the deck rollover policy)
+    """
+    create_lab(services, options)
+    connect_to_fakes(services, workdir)
+    flake_tracker.spare_slide_pool_size = options.spare_slides
+    quota_scheduler.configure({api: options.quota_per_minute for api in quota_scheduler.DEFAULT_LIMITS})
+    flake_tracker.deck_rollover = options.deck_rollover
+    start_session()
+
+
+def write_image(path, options):
+    """ Writes a noisy test image (every one is different, so none of them are deduplicated).
+
+    Args:
+        path (str): Where to write it
+        options (argparse.Namespace): The command-line options (for the image size)
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if image_processing.is_available():
+        from PIL import Image
+        Image.effect_noise((options.image_width, options.image_height), 32).convert("RGB").save(path, "JPEG", quality=95)
+    else:
+        with open(path, "wb") as f:
+            f.write(b"\xff\xd8\xff" + os.urandom(options.image_width * options.image_height // 10))
+
+
+def write_flake(workdir, flake_number, options):
+    """ Writes the 10x and 50x images of one flake into the benchmark scan folder.
+
+    Args:
+        workdir (str): The scenario's working directory
+        flake_number (int): The flake number
+        options (argparse.Namespace): The command-line options (for the image size)
+
+    Returns:
+        tuple: The flake ID (str) and the paths of its 10x and 50x images (str, str)
+    """
+    paths = []
+    for zoom in (watch_folder.IMAGE_1_ZOOM, watch_folder.IMAGE_2_ZOOM):
+        path = os.path.join(workdir, "scans", BENCHMARK_DATE, f"S1_{flake_number}_{zoom}.jpg")
+        write_image(path, options)
+        paths.append(path)
+    return flake_tracker.get_flake_id_from_filepath(paths[0]), paths[0], paths[1]
+
+
+def start_measuring(services):
+    """ Forgets every request and stage timing from the scenario's setup, so only the part being measured is reported.
+
+    Args:
+        services (FakeServices): The running fake services
+    """
+    services.reset_counts()
+    with tracing.lock:
+        tracing.durations.clear()
+
+
+def submit(flake_id, image_1_path, image_2_path):
+    """ Submits one flake the way the GUI's submit button and background worker do.
+    """
+    with tracing.stage("journal_submission", flake_id=flake_id):
+        submission = flake_tracker.create_submission(flake_id, "1", "2", "10.5", "12.25", "3", image_1_path, image_2_path)
+        outbox.add_submission(submission, flake_tracker.presentation_id, flake_tracker.current_spreadsheet_name,
+                              flake_tracker.current_sheet_name)
+    flake_tracker.flush_outbox()
+
+
+def run_startup(services, workdir, options):
+    """ Starts a session twice: cold (nothing cached on disk) and warm (spreadsheet keys and presentation names cached by
+        the first start), including the check that the cached presentation names are current.
+
+    Returns:
+        tuple: The latency of each start in milliseconds (list) and the requests each one made (dict)
+    """
+    create_lab(services, options)
+    start_measuring(services)
+    latencies = []
+    details = {}
+    for run in ("cold", "warm"):
+        connect_to_fakes(services, workdir) # <--- a new session: nothing in memory, only what is on disk
+        before = sum(services.get_counts()["requests"].values())
+        start = time.perf_counter()
+        start_session()
+        flake_tracker.refresh_presentation_IDs(flake_tracker.PRESENTATION_IDS_SPREADSHEET, flake_tracker.PRESENTATION_IDS_SHEET)
+        latencies.append((time.perf_counter() - start) * 1000)
+        details[f"{run}_requests"] = sum(services.get_counts()["requests"].values()) - before
+    return latencies, details
+
+
+def run_single_submit(services, workdir, options):
+    """ Submits flakes one at a time through the outbox, like an operator at the microscope. The first submit is cold
+        (nothing cached yet); the rest show the steady state.
+
+    Returns:
+        tuple: The latency of each submit in milliseconds (list) and anything else worth reporting (dict)
+    """
+    set_up_lab(services, workdir, options)
+    flakes = [write_flake(workdir, i, options) for i in range(1, options.submits + 1)]
+    flake_tracker.want_spare_slides(flake_tracker.presentation_id)
+    flake_tracker.refill_spare_slides_quietly() # <--- (does nothing unless --spare-slides is set)
+    start_measuring(services)
+    latencies = []
+    for flake in flakes:
+        start = time.perf_counter()
+        submit(*flake)
+        latencies.append((time.perf_counter() - start) * 1000)
+        flake_tracker.refill_spare_slides_quietly() # <--- what the worker does once it is idle again
+    return latencies, {"submits": len(flakes), "spare_slides": options.spare_slides}
+
+
+def run_bulk_ingest(services, workdir, options):
+    """ Pushes a whole directory of scans through bulk_ingest.py.
+
+    Returns:
+        tuple: The latency of the whole ingest in milliseconds (list) and anything else worth reporting (dict)
+    """
+    set_up_lab(services, workdir, options)
+    csv_path = os.path.join(workdir, "measurements.csv")
+    with open(csv_path, "w") as f:
+        f.write(",".join(bulk_ingest.CSV_COLUMNS) + "\n")
+        for i in range(1, options.flakes + 1):
+            flake_id, _, _ = write_flake(workdir, i, options)
+            f.write(f"{flake_id},10.5,12.25,1,2,3\n")
+    start_measuring(services)
+    start = time.perf_counter()
+    submissions, _ = bulk_ingest.build_submissions(bulk_ingest.find_image_pairs(os.path.join(workdir, "scans")),
+                                                   bulk_ingest.read_measurements(csv_path))
+    entries = bulk_ingest.journal_submissions(submissions)
+    with tracing.stage("bulk_ingest", flake_count=len(entries)):
+        bulk_ingest.push_entries(entries)
+    return [(time.perf_counter() - start) * 1000], {"flakes": len(submissions)}
+
+
+def run_cleanup(services, workdir, options):
+    """ Runs cleanup.py over an upload folder where about half of the images have expired.
+
+    Returns:
+        tuple: The latency of the cleanup in milliseconds (list) and anything else worth reporting (dict)
+    """
+    now = datetime.utcnow()
+    files = {}
+    for i in range(options.cleanup_images):
+        if i < options.cleanup_images * LEGACY_IMAGE_FRACTION:
+            name = f"legacy_{i}.jpg" # <--- no upload time in the name
+        else:
+            uploaded_at = now - timedelta(hours=2 * cleanup.MAX_AGE_HOURS * i / options.cleanup_images)
+            name = f"flake_{i}_{uploaded_at.strftime(github_git.UPLOAD_TIMESTAMP_FORMAT)}.jpg"
+        files[f"{BENCHMARK_UPLOAD_PATH}/{name}"] = f"image {i}".encode("utf-8")
+    services.add_repo(BENCHMARK_REPO, BENCHMARK_BRANCH, files, committed_at=now - timedelta(days=2))
+    github_git.GITHUB_API_URL = services.url
+    cleanup.REPO, cleanup.BRANCH, cleanup.IMAGES_PATH = BENCHMARK_REPO, BENCHMARK_BRANCH, BENCHMARK_UPLOAD_PATH
+    cleanup.headers = github_git.github_headers("benchmark-token")
+
+    start_measuring(services)
+    start = time.perf_counter()
+    with tracing.stage("cleanup"):
+        cleanup.clean_up_expired_images()
+    latency = (time.perf_counter() - start) * 1000
+    remaining, _ = github_git.list_tree(BENCHMARK_REPO, f"{BENCHMARK_BRANCH}:{BENCHMARK_UPLOAD_PATH}", cleanup.headers)
+    return [latency], {"images": len(files), "deleted": len(files) - len(remaining)}
+
+
+def run_undo(services, workdir, options):
+    """ Submits a few flakes to a large deck and sheet, then undoes them one at a time.
+
+    Returns:
+        tuple: The latency of each undo in milliseconds (list) and anything else worth reporting (dict)
+    """
+    set_up_lab(services, workdir, options)
+    for i in range(1, options.submits + 1):
+        submit(*write_flake(workdir, i, options))
+    start_measuring(services)
+    latencies = []
+    for _ in range(options.submits):
+        start = time.perf_counter()
+        flake_tracker.delete_last_entry()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, {"undos": options.submits, "deck_size": options.deck_size, "sheet_rows": options.sheet_rows}
+
+
+def run_catalog(services, workdir, options):
+    """ Syncs the local flake catalog with a large sheet (first in full, then just the rows added since), then searches it.
+
+    Returns:
+        tuple: The latency of each search in milliseconds (list) and the cost of each sync (dict)
+    """
+    set_up_lab(services, workdir, options)
+    flake_catalog.open_catalog(os.path.join(workdir, "flake_catalog.db"))
+    start_measuring(services)
+    details = {}
+    for run in ("full", "incremental"):
+        if run == "incremental": # <--- a day's worth of new flakes
+            flake_tracker.sheet.append_rows([[f"S3_{i}_101726", "10/17/2026", 3, i, 45, 30, 1, 1, 2] for i in range(1, options.submits + 1)])
+        before = sum(services.get_counts()["requests"].values())
+        start = time.perf_counter()
+        flake_tracker.sync_flake_catalog()
+        details[f"{run}_sync_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        details[f"{run}_sync_requests"] = sum(services.get_counts()["requests"].values()) - before
+    latencies = []
+    for _ in range(100):
+        start = time.perf_counter()
+        flakes = flake_catalog.find_flakes(chip_num=3, min_horizontal_max=40, max_layers=2)
+        latencies.append((time.perf_counter() - start) * 1000)
+    details["matches"] = len(flakes)
+    return latencies, details
+
+
+def run_watch(services, workdir, options):
+    """ Watches the scan folder while flakes are captured into it, pre-uploading each image as soon as it is finished, then
+        submits each flake the way an operator would once they've typed its measurements.
+
+    Returns:
+        tuple: The latency of each submit (after its images were pre-uploaded) in milliseconds (list) and the requests
+               the watcher's polls and pre-uploads cost (dict)
+    """
+    set_up_lab(services, workdir, options)
+    os.makedirs(os.path.join(workdir, "scans", BENCHMARK_DATE))
+    watcher = watch_folder.FolderWatcher(os.path.join(workdir, "scans"), flake_tracker.get_flake_id_from_filepath)
+    start_measuring(services)
+    latencies = []
+    pre_upload_requests = 0
+    poll_ms = []
+    for i in range(1, options.submits + 1):
+        write_flake(workdir, i, options)
+        pairs = []
+        while not pairs: # <--- poll until both images count as finished
+            time.sleep(watch_folder.STABLE_SECONDS / 2)
+            start = time.perf_counter()
+            finished, pairs = watcher.poll()
+            poll_ms.append((time.perf_counter() - start) * 1000)
+            if finished:
+                before = sum(services.get_counts()["requests"].values())
+                watch_folder.pre_upload_images(finished, flake_tracker.upload_images)
+                pre_upload_requests += sum(services.get_counts()["requests"].values()) - before
+        start = time.perf_counter()
+        submit(*pairs[0])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, {"submits": options.submits, "pre_upload_requests": pre_upload_requests,
+                       "poll_p95_ms": round(tracing.percentile(poll_ms, 0.95), 2)}
+
+
+def run_server(services, workdir, options):
+    """ Has several stations submit flakes at the same time through a submission server, which coalesces their rows and
+        slides into shared writes. The stations' images are taken as already uploaded, so only the server's work is timed.
+
+    Returns:
+        tuple: The latency of each station's submit in milliseconds (list) and how well the writes were coalesced (dict)
+    """
+    set_up_lab(services, workdir, options)
+    server = submission_server.SubmissionServer(port=0, window_ms=options.window_ms).start()
+    start_measuring(services)
+    latencies = []
+    errors = []
+    latencies_lock = threading.Lock()
+
+    def run_station(station):
+        for i in range(1, options.submits + 1):
+            flake_id = f"S{station}_{i}_{BENCHMARK_DATE}"
+            fields = flake_tracker.create_submission(flake_id, "1", "2", "10.5", "12.25", "3", "", "")
+            start = time.perf_counter()
+            resp = http_session.post(f"{server.url}/submit", json={"station": f"station-{station}", "submissions": [{
+                "client_id": i, "fields": fields, "presentation_id": flake_tracker.presentation_id,
+                "spreadsheet_name": BENCHMARK_SPREADSHEET, "sheet_name": BENCHMARK_SHEET,
+                "image_1_url": "https://example.com/1.jpg", "image_2_url": "https://example.com/2.jpg"}]})
+            with latencies_lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+                errors.extend(result['error'] for result in resp.json()['results'] if result['error'])
+
+    stations = [threading.Thread(target=run_station, args=(station,)) for station in range(1, options.stations + 1)]
+    for station in stations:
+        station.start()
+    for station in stations:
+        station.join()
+    status = server.get_status()
+    server.stop()
+    google_requests = sum(count for service, count in services.get_counts()["requests"].items() if service in ("sheets", "slides"))
+    return latencies, {"stations": options.stations, "submissions": len(latencies), "errors": len(errors),
+                       "batches": status["batches"], "largest_batch": status["largest_batch"],
+                       "google_requests_per_submission": round(google_requests / max(len(latencies), 1), 2)}
+
+
+def run_quota(services, workdir, options):
+    """ Submits flakes one at a time while a background thread keeps syncing the flake catalog as fast as the quota lets it,
+        to check that the submits are let through first and that nothing goes over the quota.
+
+    Returns:
+        tuple: The latency of each submit in milliseconds (list) and how the quota was shared out (dict)
+    """
+    options.quota_per_minute = options.quota_per_minute or DEFAULT_QUOTA_PER_MINUTE
+    set_up_lab(services, workdir, options)
+    flake_catalog.open_catalog(os.path.join(workdir, "flake_catalog.db"))
+    stop = threading.Event()
+    syncs = []
+
+    def sync_forever():
+        while not stop.is_set():
+            try:
+                flake_tracker.sync_flake_catalog()
+                syncs.append(1)
+            except Exception as e:
+                print(f"Sync failed: {e}")
+
+    start_measuring(services)
+    background = threading.Thread(target=sync_forever)
+    background.start()
+    latencies = []
+    try:
+        for i in range(1, options.submits + 1):
+            flake_id, image_1_path, image_2_path = write_flake(workdir, i, options)
+            start = time.perf_counter()
+            submit(flake_id, image_1_path, image_2_path)
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        stop.set()
+        background.join()
+    usage = quota_scheduler.get_usage()
+    return latencies, {"quota_per_minute": options.quota_per_minute, "background_syncs": len(syncs),
+                       "sheets_used": usage["sheets"]["used_last_minute"],
+                       "quota_throttled": sum(api_usage["throttled"] for api_usage in usage.values())}
+
+
+def run_rollover(services, workdir, options):
+    """ Submits flakes one at a time to a large deck under a rollover policy, so they go into new, small shards of it
+        (each made by copying the deck and pruning it to the template).
+
+    Returns:
+        tuple: The latency of each submit in milliseconds (list) and the shards that were made (dict)
+    """
+    options.deck_rollover = options.deck_rollover or f"slides:{max(options.submits // 2, 1)}"
+    set_up_lab(services, workdir, options)
+    flakes = [write_flake(workdir, i, options) for i in range(1, options.submits + 1)]
+    start_measuring(services)
+    latencies = []
+    for flake in flakes:
+        start = time.perf_counter()
+        submit(*flake)
+        latencies.append((time.perf_counter() - start) * 1000)
+    with services.lock:
+        shards = {p["title"]: len(p["slides"]) for p in services.presentations.values() if p["title"] != BENCHMARK_PRESENTATION}
+    registered = [name for name in flake_tracker.fetch_presentation_IDs(flake_tracker.PRESENTATION_IDS_SPREADSHEET,
+                                                                        flake_tracker.PRESENTATION_IDS_SHEET) if name in shards]
+    return latencies, {"policy": options.deck_rollover, "shards": len(shards), "registered": len(registered),
+                       "largest_shard_slides": max(shards.values(), default=0)}
+
+
+# Every scenario, by the name it is picked by on the command line
+SCENARIOS = {
+    "startup": run_startup,
+    "single_submit": run_single_submit,
+    "bulk_ingest": run_bulk_ingest,
+    "cleanup": run_cleanup,
+    "undo": run_undo,
+    "catalog": run_catalog,
+    "watch": run_watch,
+    "server": run_server,
+    "quota": run_quota,
+    "rollover": run_rollover
+}
+
+
+def run_scenario(name, options):
+    """ Runs one scenario against a fresh set of fake services in a temporary working directory.
+
+    Args:
+        name (str): The scenario name (a key of SCENARIOS)
+        options (argparse.Namespace): The command-line options
+
+    Returns:
+        dict: The scenario's results
+    """
+    services = FakeServices(options.latency_ms, options.github_rate_limit, options.google_rate_limit).start()
+    workdir = tempfile.mkdtemp(prefix=f"flake_benchmark_{name}_")
+    output = sys.stdout if options.verbose else io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            start = time.perf_counter()
+            latencies, details = SCENARIOS[name](services, workdir, options)
+            wall_ms = (time.perf_counter() - start) * 1000
+    finally:
+        services.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    counts = services.get_counts()
+    with tracing.lock:
+        stages = {stage: {"n": len(values), "p50_ms": round(tracing.percentile(values, 0.5), 1),
+                          "p95_ms": round(tracing.percentile(values, 0.95), 1)} for stage, values in tracing.durations.items()}
+    return {"scenario": name, "wall_ms": round(wall_ms, 1), "runs": len(latencies),
+            "p50_ms": round(tracing.percentile(latencies, 0.5), 1), "p95_ms": round(tracing.percentile(latencies, 0.95), 1),
+            "max_ms": round(max(latencies), 1), "total_requests": sum(counts["requests"].values()), **counts,
+            "stages": stages, "details": details}
+
+
+def print_result(result):
+    """ Prints one scenario's results.
+
+    Args:
+        result (dict): The results from run_scenario
+    """
+    print(f"{result['scenario']}: {result['runs']} run(s), p50 {result['p50_ms']:.0f}ms, p95 {result['p95_ms']:.0f}ms, "
+          f"max {result['max_ms']:.0f}ms ({', '.join(f'{k}={v}' for k, v in result['details'].items())})")
+    requests_by_service = ", ".join(f"{service} {count}" for service, count in sorted(result["requests"].items()))
+    print(f"  requests: {result['total_requests']} ({requests_by_service or 'none'})")
+    if result["throttled"]:
+        print(f"  throttled: {', '.join(f'{family} {count}' for family, count in sorted(result['throttled'].items()))}")
+    for stage, timing in sorted(result["stages"].items()):
+        print(f"  {stage}: n={timing['n']} p50={timing['p50_ms']:.0f}ms p95={timing['p95_ms']:.0f}ms")
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """ Compares results to an earlier run and lists every scenario that got slower or made more requests.
+
+    Args:
+        results (list): The results of this run
+        baseline (list): The results of the earlier run (as saved with --output)
+        tolerance (float): How much slower (as a fraction) a scenario may get before it counts
+
+    Returns:
+        list: A message for each regression (empty if there were none)
+    """
+    earlier = {result["scenario"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = earlier.get(result["scenario"])
+        if before is None:
+            continue
+        if result["total_requests"] > before["total_requests"]:
+            regressions.append(f"{result['scenario']}: {before['total_requests']} --> {result['total_requests']} requests")
+        if result["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: p50 {before['p50_ms']:.0f}ms --> {result['p50_ms']:.0f}ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Flake Tracker against local stand-ins for GitHub and Google.")
+    parser.add_argument("scenarios", nargs="*", help=f"Which scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--latency-ms", type=float, default=50, help="How long every fake request takes (default: 50)")
+    parser.add_argument("--github-rate-limit", type=int, default=0, help="GitHub requests allowed per second (default: 0, no limit)")
+    parser.add_argument("--google-rate-limit", type=int, default=0, help="Google requests allowed per second (default: 0, no limit)")
+    parser.add_argument("--deck-size", type=int, default=2000, help="Slides already in the deck (default: 2000)")
+    parser.add_argument("--sheet-rows", type=int, default=5000, help="Rows already in the flake sheet (default: 5000)")
+    parser.add_argument("--submits", type=int, default=5, help="Flakes submitted (and undone) one at a time (default: 5)")
+    parser.add_argument("--spare-slides", type=int, default=0, help="Spare template slides to keep ready (default: 0, off)")
+    parser.add_argument("--stations", type=int, default=4, help="Stations submitting at once in the server scenario (default: 4)")
+    parser.add_argument("--window-ms", type=float, default=submission_server.DEFAULT_WINDOW_MS, help=f"The submission server's coalescing window (default: {submission_server.DEFAULT_WINDOW_MS})")
+    parser.add_argument("--quota-per-minute", type=int, default=0, help="Every API's quota in requests per minute (default: 0, no quota)")
+    parser.add_argument("--deck-rollover", default="", help="Deck rollover policy: slides:<N>, month or chip (default: none)")
+    parser.add_argument("--flakes", type=int, default=500, help="Flakes in the bulk ingest (default: 500)")
+    parser.add_argument("--cleanup-images", type=int, default=2000, help="Images in the upload folder for cleanup (default: 2000)")
+    parser.add_argument("--image-width", type=int, default=640, help="Width of the generated images (default: 640)")
+    parser.add_argument("--image-height", type=int, default=480, help="Height of the generated images (default: 480)")
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results saved earlier with --output")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help=f"Allowed slowdown against the baseline (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--verbose", action="store_true", help="Show what the code under test prints")
+    options = parser.parse_args(argv)
+    unknown = [name for name in options.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    results = []
+    for name in options.scenarios or list(SCENARIOS):
+        result = run_scenario(name, options)
+        print_result(result)
+        results.append(result)
+
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if options.baseline:
+        with open(options.baseline, "r") as f:
+            regressions = compare_to_baseline(results, json.load(f), options.tolerance)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
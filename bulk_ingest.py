@@ -0,0 +1,189 @@
+import argparse
+import csv
+import os
+import flake_tracker
+import outbox
+import tracing
+import watch_folder
+
+# How many flakes to put in each Slides batch update (keeps each request well under the API's size limits)
+SLIDES_PER_BATCH = 20
+
+# The columns we expect in the measurements CSV
+CSV_COLUMNS = ["flake_id", "horizontal_max", "vertical_max", "down_from_TR", "left_from_TR", "approx_num_layers"]
+
+
+def find_image_pairs(directory):
+    """ Scans a directory tree of dated scan folders (<MMDDYY>/S<chip>_<flake>_<zoom>.jpg) and pairs up the 10x and 50x
+        images of each flake.
+
+    Args:
+        directory (str): The top of the directory tree to scan
+
+    Returns:
+        dict: A dict with keys of the flake ID and values of a dict holding the 'image_1_path' (10x) and 'image_2_path'
+              (50x) found for that flake
+    """
+    pairs = {}
+    for folder, _, filenames in os.walk(directory): # <--- visit every folder under the directory
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(watch_folder.IMAGE_EXTENSIONS): # <--- skip anything that isn't an image
+                continue
+            filepath = os.path.join(folder, filename)
+            zoom = watch_folder.get_zoom_from_filepath(filepath)
+            if zoom == watch_folder.IMAGE_1_ZOOM:
+                slot = 'image_1_path'
+            elif zoom == watch_folder.IMAGE_2_ZOOM:
+                slot = 'image_2_path'
+            else: # <--- not one of our two zooms
+                continue
+            flake_id = flake_tracker.get_flake_id_from_filepath(filepath)
+            pairs.setdefault(flake_id, {})[slot] = filepath
+    return pairs
+
+
+def read_measurements(csv_path):
+    """ Reads the per-flake measurements from a CSV file with a header row of CSV_COLUMNS.
+
+    Args:
+        csv_path (str): The path to the CSV file
+
+    Raises:
+        ValueError: If the CSV is missing any of the expected columns
+
+    Returns:
+        dict: A dict with keys of the flake ID and values of the dict of measurements for that flake
+    """
+    with open(csv_path, "r", newline="") as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Measurements CSV is missing columns: {', '.join(missing)}")
+        return {row['flake_id'].strip(): row for row in reader if row['flake_id'].strip()}
+
+
+def build_submissions(pairs, measurements):
+    """ Matches up image pairs with their measurements and turns each into a submission.
+
+    Args:
+        pairs (dict): The image pairs found by find_image_pairs
+        measurements (dict): The measurements read by read_measurements
+
+    Returns:
+        tuple: The list of submissions (list) and a list of (flake ID, reason) tuples for the flakes we had to skip (list)
+    """
+    submissions = []
+    skipped = []
+    for flake_id in sorted(set(pairs) | set(measurements)):
+        images = pairs.get(flake_id, {})
+        if 'image_1_path' not in images or 'image_2_path' not in images:
+            skipped.append((flake_id, f"missing {watch_folder.IMAGE_1_ZOOM} or {watch_folder.IMAGE_2_ZOOM} image"))
+            continue
+        if flake_id not in measurements:
+            skipped.append((flake_id, "no row in the measurements CSV"))
+            continue
+        row = measurements[flake_id]
+        try:
+            submissions.append(flake_tracker.create_submission(flake_id, row['down_from_TR'], row['left_from_TR'],
+                                                               row['horizontal_max'], row['vertical_max'],
+                                                               row['approx_num_layers'], images['image_1_path'],
+                                                               images['image_2_path']))
+        except ValueError as e:
+            skipped.append((flake_id, str(e)))
+    return submissions, skipped
+
+
+def journal_submissions(submissions):
+    """ Writes every submission to the outbox journal (see outbox.py) before anything is sent, so a run that fails part 
+        way leaves a record of what got in (which can be undone like any other submission) and what is left to do 
+        (which --resume, or the next Flake Tracker session, finishes).
+
+    Args:
+        submissions (list): The submissions to journal
+
+    Returns:
+        list: Their journal entries, in the same order
+    """
+    entry_ids = [outbox.add_submission(s, flake_tracker.presentation_id, flake_tracker.current_spreadsheet_name,
+                                       flake_tracker.current_sheet_name) for s in submissions]
+    return outbox.get_entries(entry_ids)
+
+
+def push_entries(entries):
+    """ Pushes journal entries onto sheets and slides: every image in one commit, every row in one append, then the 
+        slides SLIDES_PER_BATCH flakes per Slides batch update. Each stage is recorded in the journal as it finishes.
+
+    Args:
+        entries (list): The journal entries (see journal_submissions)
+
+    Raises:
+        Exception: If any stage fails. Whatever did succeed is recorded, and the rest is left in the outbox.
+    """
+    flake_tracker.upload_outbox_images(entries) # <--- one commit (or one Drive batch) no matter how many images
+    print(f"Uploaded {2 * len(entries)} images")
+    flake_tracker.append_outbox_rows(entries) # <--- one append for the whole batch
+    print(f"Appended {len(entries)} rows")
+    for start in range(0, len(entries), SLIDES_PER_BATCH):
+        chunk = entries[start:start + SLIDES_PER_BATCH]
+        flake_tracker.create_outbox_slides(chunk) # <--- under a rollover policy, each slide goes in the right shard
+        print(f"Added slides {start + 1}-{start + len(chunk)} of {len(entries)}")
+
+
+def connect(args):
+    """ Connects to the services, loads the presentation, spreadsheet and sheet chosen on the command line and opens the 
+        outbox (the same journal the GUI uses, so either can finish a run that failed part way).
+
+    Args:
+        args (argparse.Namespace): The parsed command line
+    """
+    flake_tracker.connect_services(args.env)
+    flake_tracker.pres_id_dict = flake_tracker.refresh_presentation_IDs(flake_tracker.PRESENTATION_IDS_SPREADSHEET,
+                                                                        flake_tracker.PRESENTATION_IDS_SHEET)
+    flake_tracker.load_settings_from_inputs(flake_tracker.get_presentation_ID_from_slideshow_name(args.presentation),
+                                            args.spreadsheet, args.sheet)
+    outbox.open_outbox(flake_tracker.outbox_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Push every flake in a directory of scans to sheets and slides without the GUI.")
+    parser.add_argument("directory", nargs="?", help="Directory of dated scan folders (<MMDDYY>/S<chip>_<flake>_<10x|50x>.jpg)")
+    parser.add_argument("--csv", help=f"Measurements CSV with the columns: {', '.join(CSV_COLUMNS)}")
+    parser.add_argument("--env", default=".env", help="The .env file to use (default: .env)")
+    parser.add_argument("--presentation", required=True, help="Slideshow name, as listed in the 'Presentation IDs' sheet")
+    parser.add_argument("--spreadsheet", required=True, help="Name of the spreadsheet to append rows to")
+    parser.add_argument("--sheet", default="Sheet1", help="Name of the sheet within the spreadsheet (default: Sheet1)")
+    parser.add_argument("--dry-run", action="store_true", help="Only list what would be pushed")
+    parser.add_argument("--resume", action="store_true", help="Finish pushing the flakes an earlier run didn't get to, "
+                                                              "instead of scanning a directory")
+    args = parser.parse_args(argv)
+    if not args.resume and (args.directory is None or args.csv is None):
+        parser.error("a directory and --csv are needed (unless you --resume)")
+
+    if args.resume:
+        connect(args)
+        with tracing.stage("bulk_ingest_resume"):
+            flake_tracker.flush_outbox()
+        print("✅ Pushed every unfinished flake")
+        return
+
+    submissions, skipped = build_submissions(find_image_pairs(args.directory), read_measurements(args.csv))
+    for flake_id, reason in skipped:
+        print(f"⚠️ Skipping {flake_id}: {reason}")
+    print(f"Found {len(submissions)} complete flakes")
+    if args.dry_run or not submissions:
+        return
+
+    connect(args)
+    entries = journal_submissions(submissions)
+    try:
+        with tracing.stage("bulk_ingest", flake_count=len(entries)):
+            push_entries(entries)
+    except Exception:
+        print("❌ Not every flake was pushed. What did get in is recorded; run again with --resume to finish the rest "
+              "(or they'll be finished the next time Flake Tracker is opened).")
+        raise
+    print(f"✅ Pushed {len(entries)} flakes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import os
-import requests
+import sys
+import http_session
 from datetime import datetime, timedelta
+import github_git
+import quota_scheduler
+import tracing
 
 
 # 🔒 Global configuration for github access
@@ -12,6 +16,9 @@ IMAGES_PATH = "Images"
 # How long should images exist in the image folder on github
 MAX_AGE_HOURS = 12
 
+# Delete all expired images in one commit (True) or with one Contents API request (and commit) per image (False)
+BULK_DELETE = True
+
 # Request header setup for pulling github information
 headers = {
     "Authorization": f"token {GITHUB_TOKEN}",
@@ -19,16 +26,17 @@ headers = {
 }
 
 def list_files():
-    """ Returns a list of all the files at the given location in the repo.
+    """ Returns a list of all the files at the given location in the repo (including subfolders). This is a single git 
+        tree request, so unlike the Contents API it doesn't stop at 1000 files.
 
     Returns:
         List: A list of dicts representing all the files at the given location in the repo with their identifying 
-              information
+              information ("name", "path" and "sha")
     """
-    url = f"https://api.github.com/repos/{REPO}/contents/{IMAGES_PATH}?ref={BRANCH}" # <--- the url of the location that we want to find files in within our repo
-    resp = requests.get(url, headers=headers) # <--- Get a JSON array of objects representing the files in our folder
-    resp.raise_for_status() # <--- Check if we got an error
-    return resp.json() # <--- return our list
+    tree_files, truncated = github_git.list_tree(REPO, f"{BRANCH}:{IMAGES_PATH}", headers) # <--- get every file under our folder in one request
+    if truncated: # <--- GitHub only cuts the list short for enormous folders; the rest will be picked up next run
+        print(f"⚠️ The listing of {IMAGES_PATH} was truncated, only the files listed will be checked.")
+    return [{"name": os.path.basename(f["path"]), "path": f"{IMAGES_PATH}/{f['path']}", "sha": f["sha"]} for f in tree_files]
 
 def filter_jpg_files(all_files):
     """ Filters a list of files to only contain the .jpg entries.
@@ -53,9 +61,9 @@ def get_last_commit_timestamp(path):
     Returns:
         str: A string representing the commit timestamp (datetime) of a given image at the specified path
     """
-    url = f"https://api.github.com/repos/{REPO}/commits" # <--- URL to get the commit history for our repository
+    url = f"{github_git.GITHUB_API_URL}/repos/{REPO}/commits" # <--- URL to get the commit history for our repository
     params = {"path": path, "sha": BRANCH, "per_page": 1} # <--- Parameters for our request to get the commits (we only want commits that affected the image at "path" in our branch)
-    resp = requests.get(url, headers=headers, params=params) # <--- Submit our request for commit data
+    resp = http_session.get(url, headers=headers, params=params) # <--- Submit our request for commit data
     resp.raise_for_status() # <--- Check for errors that occured
     commit_data = resp.json() # <--- Get the commit data as a JSON array
     if not commit_data: # <--- If we didn't get any data, return None
@@ -68,35 +76,110 @@ def delete_file(path, sha):
     Args:
         path (str): The path to the image we want to delete
         sha (str): The unique identifier of the image we want to delete
+
+    Returns:
+        bool: True if it was deleted
     """
-    url = f"https://api.github.com/repos/{REPO}/contents/{path}" # <--- the URL path to the image we want to delete
+    url = f"{github_git.GITHUB_API_URL}/repos/{REPO}/contents/{path}" # <--- the URL path to the image we want to delete
     data = {"message": f"Delete old image {path}", "branch": BRANCH, "sha": sha} # <--- The data we will pass in our delete request
-    resp = requests.delete(url, headers=headers, json=data) # <--- submit our delete file request
+    resp = http_session.delete(url, headers=headers, json=data) # <--- submit our delete file request
     if resp.status_code == 200: # <--- check if our request was successful
         print(f"✅ Deleted {path}")
-    else:
-        print(f"❌ Failed to delete {path}: {resp.text}")
+        return True
+    print(f"❌ Failed to delete {path}: {resp.text}")
+    return False
+
+def delete_files(paths):
+    """Deletes all of the files at the given paths in a single commit. If the branch moves while we are working (e.g. 
+       someone uploads an image), the commit is rebuilt on top of the new head, leaving out any paths that are already gone.
+
+    Args:
+        paths (list): The paths to the images we want to delete
+
+    Raises:
+        Exception: If the commit failed (nothing was deleted)
+
+    Returns:
+        int: How many images the commit deleted (paths someone else already removed don't count)
+    """
+    deleting = [] # <--- the entries of the latest attempt, which is the one that gets committed
+    def build_entries(head_sha):
+        # Only delete paths that still exist at this head (removing a missing path would make GitHub reject the tree)
+        tree_files, _ = github_git.list_tree(REPO, f"{head_sha}:{IMAGES_PATH}", headers)
+        present = {f"{IMAGES_PATH}/{f['path']}" for f in tree_files}
+        deleting[:] = [{"path": path, "mode": "100644", "type": "blob", "sha": None} for path in paths if path in present] # <--- a sha of None removes the file
+        return deleting
+
+    try:
+        github_git.commit_files(REPO, BRANCH, f"Delete {len(paths)} old images", build_entries, headers)
+    except Exception as e:
+        print(f"❌ Failed to delete {len(paths)} images: {e}")
+        raise
+    print(f"✅ Deleted {len(deleting)} images" + (f" ({len(paths) - len(deleting)} were already gone)" if len(deleting) < len(paths) else ""))
+    return len(deleting)
+
+def get_upload_time(f):
+    """ Gets when a file was uploaded. Files uploaded by flake_tracker.py have the upload time in their name, so this 
+        usually needs no request at all; other files fall back to looking up their last commit.
+
+    Args:
+        f (dict): A file from list_files()
+
+    Returns:
+        datetime: The upload time (UTC), or None if we couldn't find one
+    """
+    upload_time = github_git.parse_upload_timestamp(f["name"]) # <--- read the timestamp out of the filename
+    if upload_time:
+        return upload_time
+    commit_time_str = get_last_commit_timestamp(f["path"]) # <--- no timestamp in the name, so ask the commit history
+    if not commit_time_str:
+        return None
+    return datetime.strptime(commit_time_str, "%Y-%m-%dT%H:%M:%SZ") # <--- converts the string returned by get_last_commit_timestamp() into a DateTime object to make it comparable
 
 def main():
-    files = filter_jpg_files(list_files()) # <--- gets a list of all the JPG files at our given GitHub location
+    tracing.configure(os.getenv("TRACE_FILE", tracing.TRACE_FILE)) # <--- log how long each stage of the cleanup takes
+    with tracing.stage("cleanup", priority=quota_scheduler.BACKGROUND): # <--- never gets in the way of a submit's requests
+        failed = clean_up_expired_images() # <--- (anything that goes wrong outright is raised, which fails the Action too)
+    if failed:
+        sys.exit(1) # <--- fail the Action so someone notices
+
+def clean_up_expired_images():
+    """ Deletes every image in the upload folder older than MAX_AGE_HOURS.
+
+    Raises:
+        Exception: If the images couldn't be listed, or the bulk delete commit failed
+
+    Returns:
+        int: How many expired images couldn't be deleted one at a time (always 0 with BULK_DELETE)
+    """
+    with tracing.stage("list_files"):
+        files = filter_jpg_files(list_files()) # <--- gets a list of all the JPG files at our given GitHub location
     now = datetime.utcnow() # <--- gets the current time
     cutoff = now - timedelta(hours=MAX_AGE_HOURS) # <--- finds the cutoff timestamp by subtracting the max-age from the current time
 
+    expired = [] # <--- the paths of the images that are old enough to delete
+    failed = 0
     for f in files: # <--- iterates over all the JPG files we found
         path = f["path"] # <--- gets the path of our image
         sha = f["sha"] # <--- gets the unique identifier of our image
 
-        commit_time_str = get_last_commit_timestamp(path) # <--- finds the commit time of the image we are looking at
-        if not commit_time_str: # <--- handle error in which we can't get a commit time from our image
-            print(f"⚠️ Could not get commit time for {path}, skipping.")
+        upload_time = get_upload_time(f) # <--- finds the upload time of the image we are looking at
+        if not upload_time: # <--- handle error in which we can't get an upload time for our image
+            print(f"⚠️ Could not get upload time for {path}, skipping.")
             continue
 
-        commit_time = datetime.strptime(commit_time_str, "%Y-%m-%dT%H:%M:%SZ") # <--- converts the string returned by get_last_commit_timestamp() into a DateTime object to make it comparable
-
-        if commit_time < cutoff: # <--- if our commit time is older than the cutoff 
-            delete_file(path, sha) # <--- delete our file 
+        if upload_time < cutoff: # <--- if our upload time is older than the cutoff 
+            if BULK_DELETE:
+                expired.append(path) # <--- delete it with the rest below
+            elif not delete_file(path, sha): # <--- delete our file
+                failed += 1
         else:
-            print(f"🕒 Keeping {path} (last modified {commit_time_str})") # <--- the case where our file is not old enough to be deleted
+            print(f"🕒 Keeping {path} (uploaded {upload_time.isoformat()})") # <--- the case where our file is not old enough to be deleted
+
+    if expired:
+        with tracing.stage("delete_files", file_count=len(expired)):
+            delete_files(expired) # <--- delete every expired image in one commit
+    return failed
 
 if __name__ == "__main__":
     main()
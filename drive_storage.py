@@ -0,0 +1,341 @@
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timedelta
+import requests
+import http_session
+import quota_scheduler
+import tracing
+
+# Where the Drive API lives (the upload and batch endpoints hang off the same host)
+DRIVE_API_URL = "https://www.googleapis.com"
+
+# How much of an image to send per request. Drive requires chunks to be a multiple of 256 KiB, and only one chunk is
+# ever held in memory, however big the image is.
+CHUNK_SIZE = 8 * 256 * 1024
+
+# How many times to retry a chunk that failed (asking Drive how much it received before each retry)
+MAX_CHUNK_RETRIES = 5
+
+# Drive keeps an unfinished upload session for a week; we give up on ours a day before that
+UPLOAD_SESSION_MAX_AGE_DAYS = 6
+
+# The most requests Drive accepts in one batch request
+BATCH_LIMIT = 100
+
+# Every image we upload is tagged with this app property, so expiring images never touches anything else in the folder
+UPLOAD_MARKER = "flake_tracker_image"
+
+
+def get_view_url(file_id):
+    """ Gets a public URL for an uploaded image that Slides can fetch it from.
+
+    Args:
+        file_id (str): The Drive file ID
+
+    Returns:
+        str: The URL
+    """
+    return f"https://drive.google.com/uc?export=view&id={file_id}"
+
+
+def load_state(path):
+    """ Loads our record of unfinished upload sessions and finished uploads.
+
+    Args:
+        path (str): The state file
+
+    Returns:
+        dict: {"sessions": {<content hash>: {"session_uri": ..., "started_at": ...}},
+               "uploads": {<content hash>: {"file_id": ..., "uploaded_at": ...}}}
+    """
+    state = {"sessions": {}, "uploads": {}}
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                state.update(json.load(f))
+        except ValueError: # <--- a damaged state file only costs us a fresh upload
+            pass
+    return state
+
+
+def save_state(path, state, max_age_hours):
+    """ Saves our record of upload sessions and finished uploads, dropping upload sessions Drive will have forgotten and
+        uploads that have expired.
+
+    Args:
+        path (str): The state file
+        state (dict): The state (see load_state)
+        max_age_hours (float): How long uploaded images are kept
+    """
+    now = datetime.utcnow()
+    oldest_session = now - timedelta(days=UPLOAD_SESSION_MAX_AGE_DAYS)
+    oldest_upload = now - timedelta(hours=max_age_hours)
+    state["sessions"] = {key: entry for key, entry in state["sessions"].items() if datetime.fromisoformat(entry["started_at"]) > oldest_session}
+    state["uploads"] = {key: entry for key, entry in state["uploads"].items() if datetime.fromisoformat(entry["uploaded_at"]) > oldest_upload}
+    temp_file = path + ".tmp"
+    with open(temp_file, "w") as f:
+        json.dump(state, f)
+    os.replace(temp_file, path) # <--- never leave a half-written state file behind
+
+
+def check_response(response, action):
+    """ Raises an error if a Drive request didn't succeed.
+
+    Args:
+        response (requests.Response): The response to check
+        action (str): What we were trying to do (used in the error message)
+
+    Raises:
+        Exception: If the response has an error status code
+    """
+    if response.status_code >= 400:
+        raise Exception(f"Drive {action} failed: {response.status_code} {response.text}")
+
+
+def start_upload(session, name, folder_id, total_size, mime_type="image/jpeg"):
+    """ Starts a resumable upload session.
+
+    Args:
+        session (google.auth.transport.requests.AuthorizedSession): The authorized session to send requests with
+        name (str): The filename to give the image in Drive
+        folder_id (str): The ID of the Drive folder to put it in
+        total_size (int): The size of the image in bytes
+        mime_type (str, optional): The image's MIME type. Defaults to "image/jpeg".
+
+    Returns:
+        str: The session URI the image's bytes are sent to
+    """
+    metadata = {"name": name, "parents": [folder_id], "appProperties": {UPLOAD_MARKER: "1"}}
+    resp = http_session.post(f"{DRIVE_API_URL}/upload/drive/v3/files", session=session, json=metadata,
+                             params={"uploadType": "resumable", "supportsAllDrives": "true"},
+                             headers={"X-Upload-Content-Type": mime_type, "X-Upload-Content-Length": str(total_size)})
+    check_response(resp, "upload start")
+    return resp.headers["Location"]
+
+
+def get_next_offset(response):
+    """ Reads how many bytes Drive has received from a "308 Resume Incomplete" response.
+
+    Args:
+        response (requests.Response): The 308 response
+
+    Returns:
+        int: The offset of the first byte Drive still needs
+    """
+    match = re.match(r"bytes=0-(\d+)", response.headers.get("Range", ""))
+    return int(match.group(1)) + 1 if match else 0 # <--- no Range header means Drive has nothing yet
+
+
+def get_upload_status(session, session_uri, total_size):
+    """ Asks Drive how much of an interrupted upload it received.
+
+    Args:
+        session (google.auth.transport.requests.AuthorizedSession): The authorized session to send requests with
+        session_uri (str): The upload session URI
+        total_size (int): The size of the image in bytes
+
+    Returns:
+        tuple: The offset to carry on from (int, or None if the session has expired) and the finished file's resource
+               (dict, or None if the upload isn't finished)
+    """
+    resp = http_session.put(session_uri, session=session, headers={"Content-Range": f"bytes */{total_size}"}, allow_redirects=False)
+    if resp.status_code in (200, 201): # <--- it had all finished
+        return total_size, resp.json()
+    if resp.status_code == 308:
+        return get_next_offset(resp), None
+    if resp.status_code in (404, 410): # <--- the session has expired, so we have to start over
+        return None, None
+    check_response(resp, "upload status")
+    raise Exception(f"Drive upload status check returned {resp.status_code}")
+
+
+def send_chunks(session, session_uri, path, offset, total_size):
+    """ Sends an image to an upload session a chunk at a time, starting at the given offset. If a chunk fails, we ask
+        Drive how much it actually received and carry on from there.
+
+    Args:
+        session (google.auth.transport.requests.AuthorizedSession): The authorized session to send requests with
+        session_uri (str): The upload session URI
+        path (str): The local path to the image
+        offset (int): The offset of the first byte Drive still needs
+        total_size (int): The size of the image in bytes
+
+    Raises:
+        Exception: If a chunk kept failing, or Drive rejected it
+
+    Returns:
+        dict: The finished file's resource (with its "id")
+    """
+    attempt = 0
+    with open(path, "rb") as f:
+        while True:
+            f.seek(offset)
+            chunk = f.read(CHUNK_SIZE) # <--- the only part of the image we ever hold in memory
+            content_range = f"bytes {offset}-{offset + len(chunk) - 1}/{total_size}" if chunk else f"bytes */{total_size}"
+            resp = None
+            api = quota_scheduler.acquire(session_uri, "PUT")
+            try:
+                with http_session.request_slots: # <--- count against the same limit as every other request
+                    resp = session.put(session_uri, data=chunk, headers={"Content-Range": content_range}, allow_redirects=False)
+                tracing.record_request(bytes_sent=len(chunk), retries=1 if attempt else 0)
+                quota_scheduler.record_response(api, resp.status_code, resp.headers)
+            except (requests.ConnectionError, requests.Timeout):
+                tracing.record_request(retries=1 if attempt else 0)
+            if resp is not None and resp.status_code in (200, 201): # <--- that was the last chunk
+                return resp.json()
+            if resp is not None and resp.status_code == 308: # <--- chunk received, send the next one
+                offset = get_next_offset(resp)
+                attempt = 0
+                continue
+            if resp is not None and not http_session.is_retryable(resp): # <--- Drive rejected it outright
+                check_response(resp, "upload")
+            if attempt == MAX_CHUNK_RETRIES:
+                raise Exception(f"Drive upload of {os.path.basename(path)} kept failing after {MAX_CHUNK_RETRIES} retries")
+            time.sleep(http_session.get_retry_delay(resp, attempt))
+            attempt += 1
+            offset, finished = get_upload_status(session, session_uri, total_size) # <--- pick up from what Drive actually got
+            if finished:
+                return finished
+            if offset is None:
+                raise Exception(f"Drive upload session for {os.path.basename(path)} expired")
+
+
+def upload_file(session, path, name, folder_id, session_uri=None, on_session_started=None):
+    """ Uploads an image with a resumable upload, resuming an earlier session for the same bytes if one is given.
+
+    Args:
+        session (google.auth.transport.requests.AuthorizedSession): The authorized session to send requests with
+        path (str): The local path to the image
+        name (str): The filename to give the image in Drive
+        folder_id (str): The ID of the Drive folder to put it in
+        session_uri (str, optional): The URI of an earlier, unfinished upload of the same bytes. Defaults to None.
+        on_session_started (function, optional): Called with the URI of a new upload session as soon as it starts (so
+                                                 the caller can save it, and a crash part way through loses nothing). 
+                                                 Defaults to None.
+
+    Returns:
+        str: The new file's ID
+    """
+    total_size = os.path.getsize(path)
+    offset = None
+    if session_uri: # <--- we started uploading these bytes before and didn't finish
+        offset, finished = get_upload_status(session, session_uri, total_size)
+        if finished:
+            return finished["id"]
+    if offset is None: # <--- nothing to resume
+        session_uri = start_upload(session, name, folder_id, total_size)
+        if on_session_started:
+            on_session_started(session_uri)
+        offset = 0
+    return send_chunks(session, session_uri, path, offset, total_size)["id"]
+
+
+def encode_batch_part(number, method, path, body=None):
+    """ Encodes one request as a part of a multipart/mixed batch request.
+
+    Args:
+        number (int): The request's position in the batch (used as its Content-ID)
+        method (str): The HTTP method
+        path (str): The request path (e.g. "/drive/v3/files/abc")
+        body (dict, optional): The JSON body. Defaults to None.
+
+    Returns:
+        str: The encoded part (without its boundary line)
+    """
+    lines = ["Content-Type: application/http", f"Content-ID: <item{number}>", "", f"{method} {path} HTTP/1.1"]
+    if body is not None:
+        lines += ["Content-Type: application/json; charset=UTF-8", "", json.dumps(body)]
+    return "\r\n".join(lines) + "\r\n"
+
+
+def send_batch(session, batch_requests):
+    """ Sends several Drive requests in batch requests of up to BATCH_LIMIT each.
+
+    Args:
+        session (google.auth.transport.requests.AuthorizedSession): The authorized session to send requests with
+        batch_requests (list): (method, path, body) tuples, with body None for requests without one
+
+    Returns:
+        list: The status code of each request (int), in order
+    """
+    statuses = []
+    for start in range(0, len(batch_requests), BATCH_LIMIT):
+        chunk = batch_requests[start:start + BATCH_LIMIT]
+        boundary = f"batch_{uuid.uuid4().hex}"
+        body = "".join(f"--{boundary}\r\n" + encode_batch_part(i, *request) for i, request in enumerate(chunk)) + f"--{boundary}--\r\n"
+        resp = http_session.post(f"{DRIVE_API_URL}/batch/drive/v3", session=session, data=body.encode("utf-8"),
+                                 headers={"Content-Type": f"multipart/mixed; boundary={boundary}"})
+        check_response(resp, "batch request")
+        response_boundary = re.search(r"boundary=\"?([^\";]+)", resp.headers.get("Content-Type", "")).group(1)
+        chunk_statuses = [None] * len(chunk)
+        for part in resp.text.split(f"--{response_boundary}"):
+            match = re.search(r"Content-ID:\s*<response-item(\d+)>.*?HTTP/1\.1 (\d+)", part, re.DOTALL | re.IGNORECASE)
+            if match:
+                chunk_statuses[int(match.group(1))] = int(match.group(2))
+        statuses.extend(chunk_statuses)
+    return statuses
+
+
+def share_files(session, file_ids):
+    """ Lets anyone with the link view the given files (so Slides can fetch them), in one batch request.
+
+    Args:
+        session (google.auth.transport.requests.AuthorizedSession): The authorized session to send requests with
+        file_ids (list): The Drive file IDs
+
+    Raises:
+        Exception: If any of the files couldn't be shared
+    """
+    statuses = send_batch(session, [("POST", f"/drive/v3/files/{file_id}/permissions?supportsAllDrives=true", {"role": "reader", "type": "anyone"})
+                                    for file_id in file_ids])
+    failed = [file_id for file_id, status in zip(file_ids, statuses) if status is None or status >= 400]
+    if failed:
+        raise Exception(f"Drive sharing failed for {len(failed)} image(s): {', '.join(failed)}")
+
+
+def list_expired_files(session, folder_id, cutoff):
+    """ Finds every image we uploaded to a folder before the cutoff, with one query (per page of 1000).
+
+    Args:
+        session (google.auth.transport.requests.AuthorizedSession): The authorized session to send requests with
+        folder_id (str): The ID of the Drive folder
+        cutoff (datetime): Images created before this (UTC) have expired
+
+    Returns:
+        list: The expired files (dicts with "id", "name" and "createdTime")
+    """
+    query = (f"'{folder_id}' in parents and appProperties has {{ key='{UPLOAD_MARKER}' and value='1' }} "
+             f"and createdTime < '{cutoff.strftime('%Y-%m-%dT%H:%M:%S')}' and trashed = false")
+    params = {"q": query, "fields": "nextPageToken,files(id,name,createdTime)", "pageSize": 1000,
+              "supportsAllDrives": "true", "includeItemsFromAllDrives": "true"}
+    files = []
+    while True:
+        resp = http_session.get(f"{DRIVE_API_URL}/drive/v3/files", session=session, params=params)
+        check_response(resp, "expired image listing")
+        data = resp.json()
+        files.extend(data.get("files", []))
+        if not data.get("nextPageToken"):
+            return files
+        params["pageToken"] = data["nextPageToken"]
+
+
+def expire_images(session, folder_id, max_age_hours):
+    """ Deletes every image we uploaded to a folder that is older than max_age_hours: one query to find them and one
+        batch request (per BATCH_LIMIT images) to delete them.
+
+    Args:
+        session (google.auth.transport.requests.AuthorizedSession): The authorized session to send requests with
+        folder_id (str): The ID of the Drive folder
+        max_age_hours (float): How long images are kept
+
+    Returns:
+        int: How many images were deleted
+    """
+    expired = list_expired_files(session, folder_id, datetime.utcnow() - timedelta(hours=max_age_hours))
+    if not expired:
+        return 0
+    statuses = send_batch(session, [("DELETE", f"/drive/v3/files/{f['id']}?supportsAllDrives=true", None) for f in expired])
+    return sum(1 for status in statuses if status is not None and (status < 300 or status == 404)) # <--- 404 means someone beat us to it
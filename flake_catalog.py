@@ -0,0 +1,330 @@
+import argparse
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+# The default file the catalog is kept in
+CATALOG_FILE = "flake_catalog.db"
+
+# A local copy of the flake sheet(s), so searching for flakes takes milliseconds and no API calls. Each sheet is a
+# "source" ("<spreadsheet>/<sheet>") and each of its rows is stored under its row number. The sheet is normally only read
+# from the last row we already have onwards (see sync_catalog), and not at all if its Drive modifiedTime hasn't changed,
+# so keeping the catalog current costs one or two small requests. Edits to rows we already have can't be seen that way,
+# so the whole sheet is read again every FULL_SYNC_HOURS.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS flakes (
+    source TEXT NOT NULL,
+    row_number INTEGER NOT NULL,
+    flake_id TEXT NOT NULL,
+    date TEXT,
+    chip_num INTEGER,
+    flake_num INTEGER,
+    horizontal_max REAL,
+    vertical_max REAL,
+    down_from_TR REAL,
+    left_from_TR REAL,
+    layers REAL,
+    layers_text TEXT,
+    PRIMARY KEY (source, row_number)
+);
+CREATE INDEX IF NOT EXISTS flakes_chip ON flakes (chip_num);
+CREATE INDEX IF NOT EXISTS flakes_date ON flakes (date);
+CREATE INDEX IF NOT EXISTS flakes_horizontal_max ON flakes (horizontal_max);
+CREATE INDEX IF NOT EXISTS flakes_vertical_max ON flakes (vertical_max);
+CREATE INDEX IF NOT EXISTS flakes_layers ON flakes (layers);
+CREATE INDEX IF NOT EXISTS flakes_flake_id ON flakes (flake_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    source TEXT PRIMARY KEY,
+    synced_rows INTEGER NOT NULL,
+    last_flake_id TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    last_row TEXT,
+    modified_time TEXT,
+    full_synced_at TEXT
+);
+"""
+
+# Columns added to sync_state since the first version, and how to add each one to an older catalog
+MIGRATIONS = {
+    "last_row": "ALTER TABLE sync_state ADD COLUMN last_row TEXT",
+    "modified_time": "ALTER TABLE sync_state ADD COLUMN modified_time TEXT",
+    "full_synced_at": "ALTER TABLE sync_state ADD COLUMN full_synced_at TEXT"
+}
+
+# How often the whole sheet is read again, to pick up edits to rows we already have
+FULL_SYNC_HOURS = 24
+
+# The columns of the flake sheet, in the order flake_tracker.create_sheet_row writes them
+SHEET_COLUMNS = ["flake_id", "date", "chip_num", "flake_num", "horizontal_max", "vertical_max", "down_from_TR", "left_from_TR", "layers"]
+LAST_COLUMN = "I"
+
+# How dates are written in the sheet (dates are stored as YYYY-MM-DD in the catalog so they sort and compare correctly)
+SHEET_DATE_FORMAT = "%m/%d/%Y"
+
+# The open catalog and the lock that makes it safe to use from several threads
+connection = None
+lock = threading.Lock()
+
+
+def open_catalog(path=CATALOG_FILE):
+    """ Opens (creating if needed) the flake catalog.
+
+    Args:
+        path (str, optional): The file to keep the catalog in. Defaults to CATALOG_FILE.
+    """
+    global connection
+    with lock:
+        connection = sqlite3.connect(path, check_same_thread=False) # <--- the worker thread syncs while the GUI searches (guarded by lock)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(sync_state)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns: # <--- catalog was made by an older version
+                connection.execute(statement)
+        connection.commit()
+
+
+def get_source(spreadsheet_name, sheet_name):
+    """ Gets the name a sheet's rows are stored under in the catalog.
+
+    Args:
+        spreadsheet_name (str): The name of the spreadsheet
+        sheet_name (str): The name of the sheet within the spreadsheet
+
+    Returns:
+        str: The source name
+    """
+    return f"{spreadsheet_name}/{sheet_name}"
+
+
+def parse_number(value, kind=float):
+    """ Reads a number from a sheet cell, which may be formatted (e.g. "1,234.5").
+
+    Args:
+        value (str): The cell's value
+        kind (type, optional): int or float. Defaults to float.
+
+    Returns:
+        int or float: The number, or None if the cell doesn't hold one
+    """
+    try:
+        number = float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+    if kind is int:
+        return int(number) if number.is_integer() else None
+    return number
+
+
+def parse_date(value):
+    """ Turns a sheet date (MM/DD/YYYY) into the YYYY-MM-DD the catalog stores.
+
+    Args:
+        value (str): The cell's value
+
+    Returns:
+        str: The date, or None if the cell doesn't hold one
+    """
+    try:
+        return datetime.strptime(str(value).strip(), SHEET_DATE_FORMAT).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def to_record(source, row_number, row):
+    """ Turns a sheet row into a catalog record.
+
+    Args:
+        source (str): The source the row comes from
+        row_number (int): The row's number in the sheet
+        row (list): The row's cell values
+
+    Returns:
+        tuple: The values to insert into the flakes table, or None if the row isn't a flake (e.g. the header row)
+    """
+    cells = dict(zip(SHEET_COLUMNS, list(row) + [""] * (len(SHEET_COLUMNS) - len(row)))) # <--- the API leaves off empty trailing cells
+    chip_num = parse_number(cells["chip_num"], int)
+    if not str(cells["flake_id"]).strip() or chip_num is None: # <--- the header row, or a row someone typed a note in
+        return None
+    return (source, row_number, str(cells["flake_id"]).strip(), parse_date(cells["date"]), chip_num,
+            parse_number(cells["flake_num"], int), parse_number(cells["horizontal_max"]), parse_number(cells["vertical_max"]),
+            parse_number(cells["down_from_TR"]), parse_number(cells["left_from_TR"]), parse_number(cells["layers"]),
+            str(cells["layers"]))
+
+
+def get_row_fingerprint(row):
+    """ Gets what a sheet row is compared by to tell whether it has changed since we last read it.
+
+    Args:
+        row (list): The row's cell values
+
+    Returns:
+        str: The row's values (trimmed, and without empty trailing cells) as JSON
+    """
+    values = [str(value).strip() for value in row]
+    while values and not values[-1]:
+        values.pop()
+    return json.dumps(values)
+
+
+def store_rows(source, first_row_number, rows, replace, modified_time=None):
+    """ Writes sheet rows into the catalog and records how far through the sheet we are.
+
+    Args:
+        source (str): The source the rows come from
+        first_row_number (int): The sheet row number of rows[0]
+        rows (list): The rows' cell values
+        replace (bool): Whether to throw away everything we had for this source first (for a full resync)
+        modified_time (str, optional): The sheet's Drive modifiedTime from before it was read. Defaults to None.
+    """
+    records = [to_record(source, first_row_number + i, row) for i, row in enumerate(rows)]
+    synced_rows = first_row_number + len(rows) - 1
+    last_flake_id = str(rows[-1][0]).strip() if rows and rows[-1] else ""
+    now = datetime.utcnow().isoformat()
+    with lock:
+        with connection: # <--- one transaction, so a search never sees half a sync
+            if replace:
+                connection.execute("DELETE FROM flakes WHERE source = ?", (source,))
+            full_synced_at = now if replace else connection.execute("SELECT full_synced_at FROM sync_state WHERE source = ?",
+                                                                    (source,)).fetchone()["full_synced_at"]
+            connection.executemany("INSERT OR REPLACE INTO flakes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   [record for record in records if record is not None])
+            connection.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (source, synced_rows, last_flake_id, now, get_row_fingerprint(rows[-1]) if rows else None,
+                                modified_time, full_synced_at))
+
+
+def sync_catalog(worksheet, source, modified_time=None):
+    """ Brings the catalog up to date with a flake sheet. If the sheet's modifiedTime is the same as last time, nothing 
+        is read. Otherwise only the rows from the last one we already have onwards are read (one request, however big the 
+        sheet is). The first of those is the row we finished on last time: if any of its values have changed or it has 
+        gone (e.g. rows were undone or edited), we read the whole sheet again instead. The whole sheet is also read again 
+        every FULL_SYNC_HOURS, since edits further up can't be seen any other way.
+
+    Args:
+        worksheet (gspread.Worksheet): The flake sheet
+        source (str): The name to store its rows under (see get_source)
+        modified_time (str, optional): The spreadsheet's Drive modifiedTime, looked up just before the sync (None if it 
+                                       isn't known, in which case the sheet is always read). Defaults to None.
+
+    Returns:
+        int: How many rows were read from the sheet
+    """
+    with lock:
+        state = connection.execute("SELECT synced_rows, last_row, modified_time, full_synced_at FROM sync_state WHERE source = ?",
+                                   (source,)).fetchone()
+    full_sync_due = state is None or state["full_synced_at"] is None or \
+        datetime.utcnow() - datetime.fromisoformat(state["full_synced_at"]) > timedelta(hours=FULL_SYNC_HOURS)
+    if not full_sync_due and state["synced_rows"] > 0:
+        if modified_time is not None and modified_time == state["modified_time"]: # <--- nobody has touched the sheet
+            return 0
+        rows = worksheet.get(f"A{state['synced_rows']}:{LAST_COLUMN}")
+        anchor = get_row_fingerprint(rows[0]) if rows else None # <--- None if the row is gone
+        if anchor == state["last_row"]: # <--- nothing we already have has moved, so just add what is new
+            if len(rows) > 1:
+                store_rows(source, state["synced_rows"] + 1, rows[1:], replace=False, modified_time=modified_time)
+            else:
+                with lock, connection:
+                    connection.execute("UPDATE sync_state SET modified_time = ? WHERE source = ?", (modified_time, source))
+            return len(rows) - 1
+    rows = worksheet.get(f"A1:{LAST_COLUMN}") # <--- first sync, a full sync is due, or the sheet changed under us
+    store_rows(source, 1, rows, replace=True, modified_time=modified_time)
+    return len(rows)
+
+
+def find_flakes(chip_num=None, date_from=None, date_to=None, min_horizontal_max=None, min_vertical_max=None,
+                min_layers=None, max_layers=None, flake_id=None, source=None, limit=500):
+    """ Searches the catalog. Every filter is optional and they are all combined.
+
+    Args:
+        chip_num (int, optional): Only flakes on this chip. Defaults to None.
+        date_from (str, optional): Only flakes from this date (MM/DD/YYYY) or later. Defaults to None.
+        date_to (str, optional): Only flakes from this date (MM/DD/YYYY) or earlier. Defaults to None.
+        min_horizontal_max (float, optional): Only flakes at least this wide. Defaults to None.
+        min_vertical_max (float, optional): Only flakes at least this tall. Defaults to None.
+        min_layers (float, optional): Only flakes with at least this many layers. Defaults to None.
+        max_layers (float, optional): Only flakes with at most this many layers. Defaults to None.
+        flake_id (str, optional): Only flakes whose ID starts with this. Defaults to None.
+        source (str, optional): Only flakes from this sheet (see get_source). Defaults to None.
+        limit (int, optional): The most flakes to return. Defaults to 500.
+
+    Raises:
+        ValueError: If a date isn't in MM/DD/YYYY format
+
+    Returns:
+        list: The matching flakes (dicts with the SHEET_COLUMNS plus source and row_number), newest first
+    """
+    conditions = []
+    params = []
+    for column, operator, value in (("chip_num", "=", chip_num), ("date", ">=", date_from), ("date", "<=", date_to),
+                                    ("horizontal_max", ">=", min_horizontal_max), ("vertical_max", ">=", min_vertical_max),
+                                    ("layers", ">=", min_layers), ("layers", "<=", max_layers), ("source", "=", source)):
+        if value is None:
+            continue
+        if column == "date":
+            value = parse_date(value)
+            if value is None:
+                raise ValueError("Dates must be in MM/DD/YYYY format")
+        conditions.append(f"{column} {operator} ?")
+        params.append(value)
+    if flake_id: # <--- prefix match (flake IDs are full of underscores, which LIKE would otherwise treat as wildcards)
+        conditions.append("flake_id LIKE ? ESCAPE '\\'")
+        params.append(flake_id.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with lock:
+        rows = connection.execute(f"SELECT * FROM flakes {where} ORDER BY date DESC, chip_num, flake_num LIMIT ?", params + [limit]).fetchall()
+    return [dict(row) for row in rows]
+
+
+def format_flake(flake):
+    """ Formats a flake as one line of search results.
+
+    Args:
+        flake (dict): The flake (see find_flakes)
+
+    Returns:
+        str: A line like "S2_1_052825  2025-05-28  chip 2  45.0 x 30.5 µm  3 layers"
+    """
+    return (f"{flake['flake_id']:<16} {flake['date'] or '?':<10}  chip {flake['chip_num']:<3} "
+            f"{flake['horizontal_max']} x {flake['vertical_max']} µm  {flake['layers_text']} layers")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search a local copy of the flake sheet (and keep it in sync).")
+    parser.add_argument("--catalog", default=CATALOG_FILE, help=f"The catalog file (default: {CATALOG_FILE})")
+    parser.add_argument("--sync", action="store_true", help="Bring the catalog up to date with the sheet first")
+    parser.add_argument("--env", default=".env", help="The .env file to use when syncing (default: .env)")
+    parser.add_argument("--spreadsheet", help="Name of the spreadsheet to sync (and search)")
+    parser.add_argument("--sheet", default="Sheet1", help="Name of the sheet within the spreadsheet (default: Sheet1)")
+    parser.add_argument("--chip", type=int, help="Only flakes on this chip")
+    parser.add_argument("--from", dest="date_from", help="Only flakes from this date (MM/DD/YYYY) or later")
+    parser.add_argument("--to", dest="date_to", help="Only flakes from this date (MM/DD/YYYY) or earlier")
+    parser.add_argument("--min-hmax", type=float, help="Only flakes with at least this horizontal max (µm)")
+    parser.add_argument("--min-vmax", type=float, help="Only flakes with at least this vertical max (µm)")
+    parser.add_argument("--min-layers", type=float, help="Only flakes with at least this many layers")
+    parser.add_argument("--max-layers", type=float, help="Only flakes with at most this many layers")
+    parser.add_argument("--id", dest="flake_id", help="Only flakes whose ID starts with this")
+    parser.add_argument("--limit", type=int, default=500, help="The most flakes to list (default: 500)")
+    args = parser.parse_args(argv)
+    if args.sync and not args.spreadsheet:
+        parser.error("--sync needs --spreadsheet")
+
+    open_catalog(args.catalog)
+    source = get_source(args.spreadsheet, args.sheet) if args.spreadsheet else None
+    if args.sync:
+        import flake_tracker # <--- only needed to reach the sheet (and flake_tracker imports this module)
+        flake_tracker.connect_services(args.env)
+        worksheet = flake_tracker.get_worksheet(args.spreadsheet, args.sheet)
+        print(f"Read {sync_catalog(worksheet, source, flake_tracker.get_modified_time(worksheet.spreadsheet.id))} rows from the sheet")
+
+    flakes = find_flakes(args.chip, args.date_from, args.date_to, args.min_hmax, args.min_vmax, args.min_layers,
+                         args.max_layers, args.flake_id, source, args.limit)
+    for flake in flakes:
+        print(format_flake(flake))
+    print(f"{len(flakes)} flake(s) found")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,34 @@ from tkinter import filedialog
 from tkinter import ttk
 import os
 import gspread
+import httplib2
 import requests
-import base64
-from datetime import datetime
+from gspread.exceptions import APIError
+from gspread.http_client import BackOffHTTPClient, HTTPClient
+import uuid
+import hashlib
+import time
+import re
+import json as json_lib
+import queue
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import AuthorizedSession, Request as GoogleAuthRequest
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
+import github_git
+import drive_storage
+import outbox
+import quota_scheduler
+import flake_catalog
+import http_session
+import image_processing
+import tracing
+import watch_folder
 
 # These global variables store the values for the Flake Tracker main screen inputs
 horizontal_max = "0"
@@ -22,6 +44,44 @@ image_2_path = ""
 # This variable is where the extracted flake_id is stored
 flake_id = "0"
 
+# These variables hold the background work queue. Button callbacks put jobs on job_queue, the worker thread runs them
+# and reports back on job_updates, and the GUI reads job_updates with root.after so it never has to wait on the network.
+# The outbox and quota status shown under the jobs comes the same way (see status_reporter).
+job_queue = queue.Queue()
+job_updates = queue.Queue()
+job_list = [] # <--- every job we've queued this session, in order, so the status area can show them
+JOB_POLL_MS = 200 # <--- how often (in milliseconds) the GUI checks for job updates
+STATUS_REPORT_SECONDS = 1 # <--- how often the outbox and quota status is read (off the GUI thread) and sent on job_updates
+
+# Submissions are written to a local journal (see outbox.py) before anything is sent, then flushed in batches of up to
+# OUTBOX_BATCH_SIZE. If a flush fails (e.g. the Wi-Fi drops), the worker quietly tries again every OUTBOX_RETRY_SECONDS.
+outbox_file = outbox.OUTBOX_FILE
+OUTBOX_BATCH_SIZE = 20
+OUTBOX_RETRY_SECONDS = 30
+
+# If SUBMISSION_SERVER_URL is set in the .env file, this station uploads its own images but hands its rows and slides to 
+# the submission server (see submission_server.py) instead of writing them itself, so stations sharing a sheet and deck 
+# never compete for quota or race each other. Each station identifies itself by station_name (STATION_NAME).
+submission_server_url = ""
+station_name = socket.gethostname()
+SUBMISSION_SERVER_TIMEOUT_SECONDS = 120
+
+# A local, indexed copy of the flake sheet (see flake_catalog.py) that the "Search Flakes" window searches without any 
+# API calls. It is brought up to date (reading only the new rows) whenever that window is opened.
+catalog_file = flake_catalog.CATALOG_FILE
+
+# Watch mode (see watch_folder.py): a thread polls the chosen folder and reports new captures on watch_events. Finished 
+# images are pre-uploaded straight away, and each flake whose 10x and 50x images are both in waits in waiting_pairs 
+# until it is loaded into the main window for the operator to measure.
+watch_stop_event = None
+watch_events = queue.Queue()
+waiting_pairs = []
+watched_flake = None # <--- the flake from the watcher that is loaded into the window now (None if there isn't one)
+
+# How many times execute_request retries a request that is throttled (429) or hits a server error (5xx), with 
+# exponential backoff between tries (each try waits for quota like any other request)
+GOOGLE_NUM_RETRIES = 5
+
 # Define the scope (this contains the authorization for the APIs we used)
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/presentations', 'https://www.googleapis.com/auth/drive']
 
@@ -31,19 +91,120 @@ creds = ""
 client = ""
 presentation_id = ""
 sheet = ""
+current_spreadsheet_name = ""
+current_sheet_name = ""
+worksheets = {} # <--- (spreadsheet name, sheet name) --> worksheet, so we only look each one up once
+
+# If the row an undo should delete isn't where we appended it (rows above it were added or deleted since), we look for
+# it this many rows either side of there rather than reading the whole sheet
+UNDO_SEARCH_ROWS = 50
+
+# Cached slide order of each presentation we push to, as {presentation ID: {"slide_ids": [...], "fetched_at": ...}}. It 
+# is fetched with a field mask (slide IDs only) and then kept up to date from our own batch updates, so a steady stream of 
+# submits doesn't need to read the deck at all. It is re-read after SLIDE_IDS_MAX_AGE_SECONDS to pick up other people's 
+# edits, and straight away if a batch update fails.
+# Where new slides go is worked out from the end of this list, so it is only trusted for that when we are the one writer
+# to every deck (sole_slides_writer, i.e. we are the submission server). Otherwise another station may have added slides
+# since, and the list is re-read first (one small request).
+slide_ids_cache = {}
+slide_ids_lock = threading.Lock()
+SLIDE_IDS_MAX_AGE_SECONDS = 600
+sole_slides_writer = False
+
+# An optional pool of spare slides: copies of the template made ahead of time (while nobody is waiting), hidden from the 
+# slideshow with isSkipped and parked right after the template. A submit fills in a spare, un-hides it and moves it to the 
+# end instead of duplicating the template. spare_slide_pool_size (SPARE_SLIDES in the .env file, 0 to turn it off) is how 
+# many each presentation keeps. Spares are named after this station (see get_spare_slide_prefix), so at startup we can 
+# find our leftovers in the deck and reuse them, and stations sharing a deck never take each other's.
+spare_slide_pool_size = 0
+spare_slides = {} # <--- presentation ID --> IDs of its spares that are ready to use (missing until we've checked the deck)
+spare_slides_wanted = set() # <--- presentations we keep a pool for
+spare_slides_lock = threading.Lock()
+
+# An optional rollover policy that keeps each presentation small: new flakes go into "shards" of the chosen presentation, 
+# copies of it with only the template slide, named "<presentation> (<shard>)" and registered in the "Presentation IDs" 
+# sheet like any other deck. Set with DECK_ROLLOVER in the .env file:
+#   slides:<N>  a new numbered shard ("Deck (2)", "Deck (3)"...) once the newest one holds N flake slides
+#   month       one shard per month of the flakes' scan dates ("Deck (2026-10)")
+#   chip        one shard per chip ("Deck (chip 3)")
+# Leave it empty (the default) to keep adding every flake to the chosen presentation.
+deck_rollover = ""
+DECK_ROLLOVER_POLICIES = ("slides", "month", "chip")
+deck_rollover_lock = threading.Lock() # <--- so two batches never both create the same shard
 slides_service = ""
 drive_service = ""
+drive_service_lock = threading.Lock()
 pres_id_dict = {}
 
+# Spreadsheet names almost never move to a new key and the "Presentation IDs" directory rarely changes, so both are kept
+# in startup_cache_file between sessions (per service account) as
+# {<account>: {"spreadsheet_keys": {<name>: <key>}, "presentation_ids": {"<spreadsheet>/<sheet>": {"modified_time": ...,
+# "records": {...}}}}}. The cached directory is shown straight away and checked against its Drive modifiedTime in the
+# background, and a cached key that no longer opens the right spreadsheet falls back to a search by name.
+PRESENTATION_IDS_SPREADSHEET = "Presentation IDs"
+PRESENTATION_IDS_SHEET = "Sheet1"
+startup_cache_file = "startup_cache.json"
+startup_cache = None
+startup_cache_lock = threading.Lock()
+presentation_ids_refreshed = threading.Event() # <--- set once the background check of the directory has finished
+
 # 🔒 Global configuration for github upload
 github_token = ""
 github_repo = ""
 github_branch = ""
 github_upload_path = ""
+GITHUB_BLOB_WORKERS = 4 # <--- how many images to send to GitHub at the same time
+
+# Images in the upload folder are deleted by cleanup.py once they are this old, so we only reuse an earlier upload if it
+# has at least IMAGE_REUSE_MARGIN_HOURS left before that happens
+IMAGE_MAX_AGE_HOURS = 12
+IMAGE_REUSE_MARGIN_HOURS = 1
+
+# The index of images we know are already uploaded, so resubmitting the same bytes doesn't upload them again. It is 
+# kept in image_index_file as {"<repo>@<branch>": {<git blob SHA>: {"path": ..., "uploaded_at": ...}}} and seeded from 
+# the repo's upload folder the first time we upload in a session.
+image_index_file = "uploaded_images.json"
+image_index = {}
+image_index_seeded = False
+image_index_lock = threading.Lock()
+
+# Where images are hosted: "github" (the upload folder of github_repo, cleaned up by cleanup.py) or "drive" (the Drive 
+# folder drive_folder_id, see drive_storage.py). Drive images are expired by the background worker, at most every 
+# DRIVE_EXPIRY_INTERVAL_SECONDS. Set in the .env file with IMAGE_BACKEND and DRIVE_FOLDER_ID.
+image_backend = "github"
+drive_folder_id = ""
+drive_session = None
+DRIVE_UPLOAD_WORKERS = 4 # <--- how many images to send to Drive at the same time
+DRIVE_EXPIRY_INTERVAL_SECONDS = 3600
+last_drive_expiry = 0
+
+# Our record of unfinished Drive upload sessions (so an interrupted upload resumes where it stopped) and of finished 
+# uploads (so resubmitting the same bytes doesn't upload them again), kept in drive_upload_state_file
+drive_upload_state_file = "drive_uploads.json"
+drive_upload_state = None
+drive_upload_state_lock = threading.Lock()
+
+# Where and how big the two images are placed on each flake slide (in EMU, 914400 EMU = 1 inch)
+IMAGE_HEIGHT_EMU = 3000000
+IMAGE_WIDTH_EMU = 4000000
+IMAGE_SCALE_X = 1.14
+IMAGE_SCALE_Y = 1.13
+SLIDE_WIDTH_EMU = 9144000 # <--- the width of a standard 16:9 slide
+SLIDE_DISPLAY_WIDTH_PX = 1920 # <--- how many pixels wide a slide is when presented full screen
+
+# Settings for shrinking images before upload (see image_processing.py). They can be changed in the .env file with
+# IMAGE_PROCESSING (set to 0 to upload the original files), IMAGE_MAX_WIDTH, IMAGE_JPEG_QUALITY and IMAGE_CACHE_DIR.
+image_processing_enabled = True
+image_max_width = int(IMAGE_WIDTH_EMU * IMAGE_SCALE_X / SLIDE_WIDTH_EMU * SLIDE_DISPLAY_WIDTH_PX) # <--- the widest an image is ever shown on a slide
+image_jpeg_quality = 85
+image_cache_dir = ".image_cache"
 
 def load_in_env_information(filename):
     load_dotenv(filename) # <--- load in our .env file
     global github_token, github_repo, github_branch, github_upload_path, json
+    global image_processing_enabled, image_max_width, image_jpeg_quality, image_cache_dir, image_index_file, outbox_file, catalog_file
+    global submission_server_url, station_name, spare_slide_pool_size, deck_rollover
+    global startup_cache_file, image_backend, drive_folder_id, drive_upload_state_file
 
     # Now you can use os.getenv to access them
     github_token = os.getenv("GITHUB_TOKEN")
@@ -52,11 +213,171 @@ def load_in_env_information(filename):
     github_upload_path = os.getenv("GITHUB_UPLOAD_PATH")
     json = os.getenv("JSON")
 
+    # Optional image processing settings (the defaults are used if they aren't in the .env file)
+    image_processing_enabled = os.getenv("IMAGE_PROCESSING", "1") != "0"
+    image_max_width = int(os.getenv("IMAGE_MAX_WIDTH", image_max_width))
+    image_jpeg_quality = int(os.getenv("IMAGE_JPEG_QUALITY", image_jpeg_quality))
+    image_cache_dir = os.getenv("IMAGE_CACHE_DIR", image_cache_dir)
+    image_index_file = os.getenv("IMAGE_INDEX_FILE", image_index_file)
+    startup_cache_file = os.getenv("STARTUP_CACHE_FILE", startup_cache_file)
+
+    # Optional image hosting settings (GitHub is used unless IMAGE_BACKEND says otherwise)
+    image_backend = os.getenv("IMAGE_BACKEND", image_backend).lower()
+    if image_backend not in IMAGE_BACKENDS:
+        raise ValueError(f"Unknown IMAGE_BACKEND '{image_backend}' (choose from {', '.join(IMAGE_BACKENDS)})")
+    drive_folder_id = os.getenv("DRIVE_FOLDER_ID", drive_folder_id)
+    drive_upload_state_file = os.getenv("DRIVE_UPLOAD_STATE_FILE", drive_upload_state_file)
+    outbox_file = os.getenv("OUTBOX_FILE", outbox_file)
+    catalog_file = os.getenv("CATALOG_FILE", catalog_file)
+    submission_server_url = os.getenv("SUBMISSION_SERVER_URL", submission_server_url).rstrip("/")
+    station_name = os.getenv("STATION_NAME", station_name)
+    spare_slide_pool_size = int(os.getenv("SPARE_SLIDES", spare_slide_pool_size))
+    deck_rollover = os.getenv("DECK_ROLLOVER", deck_rollover).strip().lower()
+    parse_deck_rollover(deck_rollover) # <--- fail now, not on the first submit
+
+    # Where stage timings are logged (see tracing.py)
+    tracing.configure(os.getenv("TRACE_FILE", tracing.TRACE_FILE))
+
+    # Optional limit on how many GitHub requests may be in flight at once
+    if os.getenv("HTTP_MAX_CONCURRENT_REQUESTS"):
+        http_session.set_max_concurrent_requests(int(os.getenv("HTTP_MAX_CONCURRENT_REQUESTS")))
+
+    # Optional changes to each API's quota in requests per minute, e.g. QUOTA_SHEETS_PER_MINUTE=300 (see quota_scheduler.py)
+    quota_scheduler.configure({api: int(os.getenv(f"QUOTA_{api.upper()}_PER_MINUTE")) for api in quota_scheduler.DEFAULT_LIMITS
+                               if os.getenv(f"QUOTA_{api.upper()}_PER_MINUTE")})
+
+
+def execute_request(request):
+    """ Sends a Google API (Slides or Drive) request once the API has quota for it, retrying with exponential backoff if it
+        is throttled or hits a temporary server error.
+
+    Args:
+        request (googleapiclient.http.HttpRequest): The request to send (e.g. slides_service.presentations().get(...))
+
+    Returns:
+        dict: The response
+    """
+    for attempt in range(GOOGLE_NUM_RETRIES + 1):
+        api = quota_scheduler.acquire(request.uri, request.method) # <--- every try waits for the API's quota (see quota_scheduler.py)
+        tracing.record_request(bytes_sent=len(request.body or ""), retries=1 if attempt else 0)
+        headers = {}
+        try:
+            response = request.execute(num_retries=0) # <--- we retry ourselves, so the retries are counted against the quota too
+        except HttpError as e:
+            headers = {"Retry-After": e.resp['retry-after']} if 'retry-after' in e.resp else {}
+            quota_scheduler.record_response(api, e.resp.status, headers)
+            throttled = e.resp.status == 403 and b"rateLimitExceeded" in (e.content or b"") # <--- (Google's older way of saying 429)
+            if not (is_temporary_error(e) or throttled) or attempt == GOOGLE_NUM_RETRIES:
+                raise
+        except Exception as e:
+            if not is_temporary_error(e) or attempt == GOOGLE_NUM_RETRIES: # <--- e.g. the connection dropped
+                raise
+        else:
+            quota_scheduler.record_response(api, 200)
+            return response
+        if not headers: # <--- (a Retry-After pauses the API in quota_scheduler, so the next acquire already waits for it)
+            time.sleep(http_session.get_retry_delay(None, attempt))
+
+
+class QuotaHTTPClient(HTTPClient):
+    """ gspread's plain HTTP client, but waiting for the API's quota before each try and tuning the quota from each 
+        response (see quota_scheduler.py). BackOffHTTPClient's retries come through here too.
+    """
+
+    def request(self, method, endpoint, *args, **kwargs):
+        api = quota_scheduler.acquire(endpoint, method)
+        try:
+            response = super().request(method, endpoint, *args, **kwargs)
+        except APIError as e:
+            quota_scheduler.record_response(api, e.response.status_code, e.response.headers)
+            raise
+        quota_scheduler.record_response(api, response.status_code, response.headers)
+        return response
+
+
+class TracedHTTPClient(BackOffHTTPClient, QuotaHTTPClient):
+    """ gspread's backoff client, but counting each request (and each of its retries) against the current tracing stage
+        and keeping each try within the API's quota.
+    """
+    calls = threading.local() # <--- how deep we are in request() on this thread (BackOffHTTPClient retries by calling itself)
+
+    def request(self, *args, **kwargs):
+        depth = getattr(self.calls, "depth", 0)
+        body = kwargs.get("data") or kwargs.get("json") or ""
+        tracing.record_request(bytes_sent=len(body if isinstance(body, (str, bytes)) else json_lib.dumps(body)), retries=1 if depth else 0)
+        self.calls.depth = depth + 1
+        try:
+            return super().request(*args, **kwargs)
+        finally:
+            self.calls.depth = depth
 
-def process_presentation_IDs(spreadsheet_name, sheet_name):
-    """This method takes in a spreadsheet name and sheet name assuming it contains the two columns 'Slideshow_Name' and
-       'Presentation_ID' and processes the sheet into a dict with keys of the slideshow name and values of the
-       presentation ID to make processing in plain english easier.
+
+def get_startup_cache():
+    """ Gets this service account's part of the startup cache, loading startup_cache_file the first time. Call with 
+        startup_cache_lock held.
+
+    Returns:
+        dict: The cached "spreadsheet_keys" and "presentation_ids"
+    """
+    global startup_cache
+    if startup_cache is None:
+        startup_cache = {}
+        if os.path.exists(startup_cache_file):
+            try:
+                with open(startup_cache_file, "r") as f:
+                    startup_cache = json_lib.load(f)
+            except ValueError: # <--- a damaged cache just means a slower start
+                startup_cache = {}
+    account = getattr(creds, "service_account_email", "") or "default"
+    return startup_cache.setdefault(account, {"spreadsheet_keys": {}, "presentation_ids": {}})
+
+def save_startup_cache():
+    """ Writes the startup cache to startup_cache_file. Call with startup_cache_lock held.
+    """
+    temp_file = startup_cache_file + ".tmp"
+    with open(temp_file, "w") as f:
+        json_lib.dump(startup_cache, f)
+    os.replace(temp_file, startup_cache_file) # <--- never leave a half-written cache behind
+
+def open_spreadsheet(spreadsheet_name):
+    """ Opens a spreadsheet by name. If we have opened it before, its cached key is used, which skips the Drive search 
+        by name; if that key no longer opens a spreadsheet with this name (deleted, unshared or renamed), we search by 
+        name again.
+
+    Args:
+        spreadsheet_name (str): The name of the spreadsheet
+
+    Returns:
+        gspread.Spreadsheet: The spreadsheet
+    """
+    with startup_cache_lock:
+        key = get_startup_cache()["spreadsheet_keys"].get(spreadsheet_name)
+    if key:
+        try:
+            spreadsheet = client.open_by_key(key)
+            if spreadsheet.title == spreadsheet_name:
+                return spreadsheet
+        except (gspread.SpreadsheetNotFound, gspread.exceptions.APIError, PermissionError):
+            pass # <--- fall back to searching by name below
+    spreadsheet = client.open(spreadsheet_name) # <--- Drive search by name
+    with startup_cache_lock:
+        get_startup_cache()["spreadsheet_keys"][spreadsheet_name] = spreadsheet.id
+        save_startup_cache()
+    return spreadsheet
+
+def get_modified_time(file_id):
+    """ Gets when a Drive file (e.g. a spreadsheet) was last changed.
+
+    Args:
+        file_id (str): The file's ID (for a spreadsheet, its key)
+
+    Returns:
+        str: The file's modifiedTime
+    """
+    return execute_request(get_drive_service().files().get(fileId=file_id, fields="modifiedTime", supportsAllDrives=True))["modifiedTime"]
+
+def fetch_presentation_IDs(spreadsheet_name, sheet_name):
+    """ Reads the presentation ID directory from its sheet and caches it along with when the sheet was last changed.
 
     Args:
         spreadsheet_name (str): The name of the spreadsheet containing our information.
@@ -65,13 +386,77 @@ def process_presentation_IDs(spreadsheet_name, sheet_name):
     Returns:
         dict: A dict with keys of the slideshow name and values of the presentation ID
     """
-    pres_id_sheet = client.open(spreadsheet_name).worksheet(sheet_name)
-    records = pres_id_sheet.get_all_records()
+    spreadsheet = open_spreadsheet(spreadsheet_name)
+    modified_time = get_modified_time(spreadsheet.id) # <--- read this before the records, so an edit made while we read is picked up next time
+    records = spreadsheet.worksheet(sheet_name).get_all_records()
     dict_to_return = {}
     for item in records:
         dict_to_return[item['Slideshow_Name']] = item['Presentation_ID']
+    with startup_cache_lock:
+        get_startup_cache()["presentation_ids"][f"{spreadsheet_name}/{sheet_name}"] = {"modified_time": modified_time, "records": dict_to_return}
+        save_startup_cache()
     return dict_to_return
 
+def process_presentation_IDs(spreadsheet_name, sheet_name):
+    """This method takes in a spreadsheet name and sheet name assuming it contains the two columns 'Slideshow_Name' and
+       'Presentation_ID' and processes the sheet into a dict with keys of the slideshow name and values of the
+       presentation ID to make processing in plain english easier. If we have read it in an earlier session, the cached
+       copy is returned without any requests (use refresh_presentation_IDs to check that it is still current).
+
+    Args:
+        spreadsheet_name (str): The name of the spreadsheet containing our information.
+        sheet_name (str): The name of the sheet within our spreadsheet containing our information.
+
+    Returns:
+        dict: A dict with keys of the slideshow name and values of the presentation ID
+    """
+    with startup_cache_lock:
+        cached = get_startup_cache()["presentation_ids"].get(f"{spreadsheet_name}/{sheet_name}")
+    if cached:
+        return dict(cached["records"])
+    return fetch_presentation_IDs(spreadsheet_name, sheet_name)
+
+def refresh_presentation_IDs(spreadsheet_name, sheet_name):
+    """ Makes sure the presentation ID directory is current: if the sheet's Drive modifiedTime hasn't changed since we 
+        cached it, the cached copy is used (one small request); otherwise the sheet is read again.
+
+    Args:
+        spreadsheet_name (str): The name of the spreadsheet containing our information.
+        sheet_name (str): The name of the sheet within our spreadsheet containing our information.
+
+    Returns:
+        dict: A dict with keys of the slideshow name and values of the presentation ID
+    """
+    with startup_cache_lock:
+        cached = get_startup_cache()["presentation_ids"].get(f"{spreadsheet_name}/{sheet_name}")
+        key = get_startup_cache()["spreadsheet_keys"].get(spreadsheet_name)
+    if cached and key:
+        try:
+            if get_modified_time(key) == cached["modified_time"]: # <--- nobody has edited the directory
+                return dict(cached["records"])
+        except HttpError:
+            pass # <--- the key may be stale, so read it again the slow way
+    return fetch_presentation_IDs(spreadsheet_name, sheet_name)
+
+def refresh_presentation_IDs_in_background(spreadsheet_name, sheet_name):
+    """ Runs refresh_presentation_IDs on its own thread, updating pres_id_dict when it finishes and setting 
+        presentation_ids_refreshed so the settings window can show any changes.
+
+    Args:
+        spreadsheet_name (str): The name of the spreadsheet containing our information.
+        sheet_name (str): The name of the sheet within our spreadsheet containing our information.
+    """
+    def refresh():
+        global pres_id_dict
+        try:
+            pres_id_dict = refresh_presentation_IDs(spreadsheet_name, sheet_name)
+        except Exception as e: # <--- keep using the cached copy
+            print(f"Could not refresh the presentation IDs: {e}")
+        presentation_ids_refreshed.set()
+
+    presentation_ids_refreshed.clear()
+    threading.Thread(target=refresh, daemon=True).start()
+
 
 def load_options(f_name):
     """ This method takes in a file name that should store dropdown options (1 per line) and returns a 
@@ -147,23 +532,87 @@ def load_settings_from_inputs(pres_id, spreadsheet_name, sheet_name):
                                 service account email)
         sheet_name (str): The name of the sheet within the spreadsheet that you want to edit
     """
-    global presentation_id, sheet # <--- make sure we are setting the global variables
+    global presentation_id, sheet, current_spreadsheet_name, current_sheet_name # <--- make sure we are setting the global variables
     
     presentation_id = pres_id
-    sheet = client.open(spreadsheet_name).worksheet(sheet_name)
+    sheet = get_worksheet(spreadsheet_name, sheet_name)
+    current_spreadsheet_name = spreadsheet_name
+    current_sheet_name = sheet_name
 
-def setup_env_info():
-    """"A method to set global variables for google APIs access and GitHub access. Connects to drive after setting up 
-        JSON service account.
+def get_worksheet(spreadsheet_name, sheet_name):
+    """Opens a sheet within a spreadsheet, remembering it so the next time it is needed costs no requests.
+
+    Args:
+        spreadsheet_name (str): The name of the spreadsheet
+        sheet_name (str): The name of the sheet within the spreadsheet
+
+    Returns:
+        gspread.Worksheet: The sheet
+    """
+    if (spreadsheet_name, sheet_name) not in worksheets:
+        worksheets[(spreadsheet_name, sheet_name)] = open_spreadsheet(spreadsheet_name).worksheet(sheet_name)
+    return worksheets[(spreadsheet_name, sheet_name)]
+
+def connect_services(env_filename):
+    """ A method to set global variables for google APIs access and GitHub access from the given .env file. Connects to 
+        drive after setting up JSON service account. This doesn't touch the GUI, so command-line tools can use it too.
+
+    Args:
+        env_filename (str): The name of the .env file to load
     """
     global creds, client, slides_service, drive_service, json
-    env_filename = get_dropdown_value(env_select, "env_filenames.txt") # <--- get .env filename from dropdown
     # Set up service account
     load_in_env_information(env_filename)
     creds = Credentials.from_service_account_file(json, scopes=SCOPES) 
-    client = gspread.authorize(creds)
-    slides_service = build('slides', 'v1', credentials=creds)
-    drive_service = build('drive', 'v3', credentials=creds)
+    drive_service = "" # <--- built the first time it is needed (see get_drive_service)
+    threading.Thread(target=fetch_access_token, daemon=True).start() # <--- get the OAuth token while everything else is set up
+
+    # Build the Slides service on another thread while the gspread client is created
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        slides_future = executor.submit(build_service, 'slides', 'v1')
+        client = gspread.authorize(creds, http_client=TracedHTTPClient) # <--- retries throttled requests with backoff over a pooled session
+        slides_service = slides_future.result()
+
+def build_service(name, version):
+    """ Builds a Google API service from the discovery document bundled with googleapiclient (so nothing is downloaded) 
+        without trying to cache it on disk.
+
+    Args:
+        name (str): The API name (e.g. 'slides')
+        version (str): The API version (e.g. 'v1')
+
+    Returns:
+        googleapiclient.discovery.Resource: The service
+    """
+    return build(name, version, credentials=creds, static_discovery=True, cache_discovery=False)
+
+def get_drive_service():
+    """ Gets the Drive service, building it the first time it is needed (most sessions never use it).
+
+    Returns:
+        googleapiclient.discovery.Resource: The Drive service
+    """
+    global drive_service
+    with drive_service_lock:
+        if not drive_service:
+            drive_service = build_service('drive', 'v3')
+        return drive_service
+
+def fetch_access_token():
+    """ Gets an OAuth access token for the service account ahead of the first request, so that request doesn't have to 
+        wait for it. If this fails, the first request just tries again.
+    """
+    try:
+        creds.refresh(GoogleAuthRequest())
+    except Exception as e:
+        print(f"Could not fetch an access token yet: {e}")
+
+def setup_env_info():
+    """"A method to set global variables for google APIs access and GitHub access. Connects to drive after setting up 
+        JSON service account.
+    """
+    env_filename = get_dropdown_value(env_select, "env_filenames.txt") # <--- get .env filename from dropdown
+    connect_services(env_filename)
 
     env_selector_root.destroy() # <--- destroy selector page
 
@@ -171,17 +620,208 @@ def setup_env_info():
 def shutdown_options_screen():
     """
         Get all of the options screen input values, pass them into the method to load settings and access to the 
-        relevant sheets/slides. Then shut down the options window.
+        relevant sheets/slides. Then shut down the options window. If the slideshow isn't one we know of, the window 
+        stays open and says why; if we can't tell yet, Next is disabled and this runs again once the check has finished.
     """
     # Get all of the dropdown values
     slideshow_name = get_dropdown_value(presentation_id_select, "presentation_ids.txt")
     spreadsheet = get_dropdown_value(spreadsheet_select, "spreadsheets.txt")
     sheet = get_dropdown_value(sheet_select, "sheets.txt")
 
+    # It may be a new slideshow our cached names don't have yet. Never wait for the check on the GUI thread, so the window 
+    # stays responsive
+    if slideshow_name not in pres_id_dict and not presentation_ids_refreshed.is_set():
+        options_next_button.config(state="disabled")
+        options_status_label.config(text="Checking for new presentations...")
+        options_root.after(JOB_POLL_MS, shutdown_options_screen)
+        return
+    options_next_button.config(state="normal")
+    if slideshow_name not in pres_id_dict:
+        options_status_label.config(text=f'There is no presentation called "{slideshow_name}" in "{PRESENTATION_IDS_SPREADSHEET}".')
+        return
     load_settings_from_inputs(get_presentation_ID_from_slideshow_name(slideshow_name), spreadsheet, sheet) # <--- Load settings
 
     options_root.destroy() # <--- Close window
 
+def get_unique_filenames(image_paths):
+    """ Makes a unique upload filename for each image by adding the current timestamp ('S1_2_10x.jpg' --> 
+        'S1_2_10x_20250528153000.jpg'). Images in the same batch with the same name (e.g. the same flake number from two 
+        different date folders) also get a counter so they don't overwrite each other.
+
+    Args:
+        image_paths (list): Local paths to the images that we want to upload
+
+    Returns:
+        list: The unique filenames, in the same order as image_paths
+    """
+    timestamp = datetime.utcnow().strftime(github_git.UPLOAD_TIMESTAMP_FORMAT) # <--- get the timestamp to make this filename unique
+    unique_filenames = []
+    for image_path in image_paths:
+        filename = os.path.basename(image_path) # <--- get the filename from the image path
+        name, ext = os.path.splitext(filename) # <--- split the name of the file and the file extension (e.g. ".png" or ".jpg")
+        unique_filename = f"{name}_{timestamp}{ext}" # <--- combine our extracted information to get a fully unique filename
+        count = 1
+        while unique_filename in unique_filenames: # <--- another image in this batch already has that name
+            count += 1
+            unique_filename = f"{name}-{count}_{timestamp}{ext}"
+        unique_filenames.append(unique_filename)
+    return unique_filenames
+
+def get_raw_url(path):
+    """ Gets the public raw.githubusercontent.com URL for a file in our GitHub repo.
+
+    Args:
+        path (str): The path of the file within the repo
+
+    Returns:
+        str: Public raw.githubusercontent.com URL
+    """
+    return f"https://raw.githubusercontent.com/{github_repo}/{github_branch}/{path}"
+
+def get_repo_image_index():
+    """ Gets the part of the image index for the repo and branch we are currently uploading to, loading the index file and 
+        seeding it from the repo's upload folder the first time it is needed. Call with image_index_lock held.
+
+    Returns:
+        dict: A dict with keys of git blob SHAs and values of dicts with the "path" and "uploaded_at" of that upload
+    """
+    global image_index, image_index_seeded
+    if not image_index_seeded:
+        if os.path.exists(image_index_file): # <--- pick up what earlier sessions uploaded
+            with open(image_index_file, "r") as f:
+                image_index = json_lib.load(f)
+        repo_index = image_index.setdefault(f"{github_repo}@{github_branch}", {})
+        headers = github_git.github_headers(github_token)
+        try:
+            files, _ = github_git.list_tree(github_repo, f"{github_branch}:{github_upload_path}", headers) # <--- one request lists every image already in the upload folder
+        except Exception as e: # <--- e.g. the upload folder doesn't exist yet; we can still use what we know locally
+            print(f"Could not list uploaded images: {e}")
+            files = []
+        for file in files:
+            uploaded_at = github_git.parse_upload_timestamp(file["path"])
+            if uploaded_at: # <--- only our own timestamped uploads can be reused (we need to know when they expire)
+                repo_index.setdefault(file["sha"], {"path": f"{github_upload_path}/{file['path']}", "uploaded_at": uploaded_at.isoformat()})
+        image_index_seeded = True
+    return image_index.setdefault(f"{github_repo}@{github_branch}", {})
+
+def save_image_index():
+    """ Writes the image index to image_index_file, dropping any uploads that have expired. Call with image_index_lock held.
+    """
+    oldest = datetime.utcnow() - timedelta(hours=IMAGE_MAX_AGE_HOURS)
+    for repo_index in image_index.values():
+        for blob_sha in [sha for sha, entry in repo_index.items() if datetime.fromisoformat(entry["uploaded_at"]) < oldest]:
+            del repo_index[blob_sha] # <--- cleanup.py has deleted this one by now
+    temp_file = image_index_file + ".tmp"
+    with open(temp_file, "w") as f:
+        json_lib.dump(image_index, f)
+    os.replace(temp_file, image_index_file) # <--- never leave a half-written index behind
+
+def find_uploaded_image(blob_sha):
+    """ Looks up whether an image with exactly these contents is already in the upload folder and will stay there long 
+        enough to be used.
+
+    Args:
+        blob_sha (str): The git blob SHA of the image contents
+
+    Returns:
+        str: The raw URL of the existing upload, or None if it needs to be uploaded
+    """
+    with image_index_lock:
+        entry = get_repo_image_index().get(blob_sha)
+    if entry is None:
+        return None
+    expires_at = datetime.fromisoformat(entry["uploaded_at"]) + timedelta(hours=IMAGE_MAX_AGE_HOURS - IMAGE_REUSE_MARGIN_HOURS)
+    if datetime.utcnow() >= expires_at: # <--- too close to being cleaned up
+        return None
+    return get_raw_url(entry["path"])
+
+def record_uploaded_images(entries, uploaded_at):
+    """ Adds freshly uploaded images to the image index and saves it.
+
+    Args:
+        entries (list): The git tree entries we just committed
+        uploaded_at (datetime): When they were uploaded (UTC)
+    """
+    with image_index_lock:
+        repo_index = get_repo_image_index()
+        for entry in entries:
+            repo_index[entry["sha"]] = {"path": entry["path"], "uploaded_at": uploaded_at.isoformat()}
+        save_image_index()
+
+def prepare_image_for_upload(image_path):
+    """ Shrinks an image to the size it is actually shown at on the slide and recompresses it before upload, if image 
+        processing is turned on (and Pillow is installed).
+
+    Args:
+        image_path (str): Local path to the original image
+
+    Returns:
+        str: Local path to the file that should be uploaded
+    """
+    if not image_processing_enabled:
+        return image_path
+    return image_processing.process_image(image_path, image_max_width, image_jpeg_quality, image_cache_dir)
+
+def stage_image(image_path):
+    """ Prepares an image for upload and, unless the same bytes are already uploaded, stores it in our GitHub repo as a 
+        blob (blobs don't touch the branch, so this is safe to do for several images at once).
+
+    Args:
+        image_path (str): Local path to the original image
+
+    Returns:
+        tuple: The local path that was staged (str), its git blob SHA (str), and the raw URL of an existing upload of the 
+               same bytes (str, or None if it still needs committing)
+    """
+    upload_path = prepare_image_for_upload(image_path) # <--- shrink the image first (if turned on)
+    with open(upload_path, "rb") as f:
+        content = f.read()
+    blob_sha = github_git.git_blob_sha(content) # <--- work out the blob SHA locally so we can check the index without uploading
+    existing_url = find_uploaded_image(blob_sha)
+    if existing_url is None:
+        github_git.create_blob(github_repo, content, github_git.github_headers(github_token))
+    return upload_path, blob_sha, existing_url
+
+def upload_images_to_github(image_paths):
+    """
+    Uploads a batch of images to a public GitHub repo in a single commit and returns raw URLs to access them. However many 
+    images there are, this costs one commit, so uploads from a submission or a bulk ingest never fight over the branch head. 
+    Images whose exact bytes are already uploaded (e.g. when resubmitting after an error) are not uploaded again.
+
+    Args:
+        image_paths (list): Local paths to the images that we want to upload
+
+    Returns:
+        list: Public raw.githubusercontent.com URLs, in the same order as image_paths
+    """
+    global github_repo, github_branch, github_token, github_upload_path
+    if not image_paths: # <--- nothing to upload
+        return []
+
+    # Prepare, hash and send several images at once
+    with tracing.stage("stage_images", image_count=len(image_paths)), ThreadPoolExecutor(max_workers=GITHUB_BLOB_WORKERS) as executor:
+        staged = list(executor.map(tracing.wrap(stage_image), image_paths))
+
+    new_images = {} # <--- blob SHA --> local path of each image that still needs committing (so identical images are only committed once)
+    for upload_path, blob_sha, existing_url in staged:
+        if existing_url is None:
+            new_images.setdefault(blob_sha, upload_path)
+
+    if new_images:
+        unique_filenames = get_unique_filenames(list(new_images.values()))
+        entries = [{"path": f"{github_upload_path}/{unique_filename}", "mode": "100644", "type": "blob", "sha": blob_sha}
+                   for unique_filename, blob_sha in zip(unique_filenames, new_images)] # <--- where each image goes in the repo
+        message = f"Upload {unique_filenames[0]}" if len(unique_filenames) == 1 else f"Upload {len(unique_filenames)} images"
+        uploaded_at = datetime.utcnow()
+        with tracing.stage("github_commit", image_count=len(entries)):
+            github_git.commit_files(github_repo, github_branch, message, entries, github_git.github_headers(github_token)) # <--- one commit for the whole batch
+        record_uploaded_images(entries, uploaded_at)
+
+    # Return raw.githubusercontent URLs
+    with image_index_lock:
+        repo_index = get_repo_image_index()
+        return [existing_url or get_raw_url(repo_index[blob_sha]["path"]) for _, blob_sha, existing_url in staged]
+
 def upload_image_to_github(image_path):
     """
     Uploads an image to a public GitHub repo and returns a raw URL to access it
@@ -192,40 +832,159 @@ def upload_image_to_github(image_path):
     Returns:
         str: Public raw.githubusercontent.com URL
     """
-    global github_repo, github_branch, github_token, github_upload_path
-    filename = os.path.basename(image_path) # <--- get the filename from the image path
-    name, ext = os.path.splitext(filename) # <--- split the name of the file and the file extension (e.g. ".png" or ".jpg")
-    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S") # <--- get the timestamp to make this filename unique
-    unique_filename = f"{name}_{timestamp}{ext}" # <--- combine our extracted information to get a fully unique filename
+    return upload_images_to_github([image_path])[0]
+
+def get_drive_session():
+    """ Gets the authorized session Drive uploads are sent with, creating it the first time.
 
-    github_api_url = f"https://api.github.com/repos/{github_repo}/contents/{github_upload_path}/{unique_filename}" # <--- format the github api url
+    Returns:
+        google.auth.transport.requests.AuthorizedSession: The session
+    """
+    global drive_session
+    with drive_service_lock:
+        if drive_session is None:
+            drive_session = AuthorizedSession(creds)
+        return drive_session
 
-    # Encode the image to upload
-    with open(image_path, "rb") as f:
-        content = base64.b64encode(f.read()).decode("utf-8")
+def get_drive_upload_state():
+    """ Gets our record of Drive upload sessions and finished uploads, loading it the first time. Call with 
+        drive_upload_state_lock held.
 
-    # Create upload request information
-    headers = {
-        "Authorization": f"token {github_token}", # <--- what's the personal access github token we're using?
-        "Accept": "application/vnd.github+json"
-    }
-    data = {
-        "message": f"Upload {unique_filename}", # <--- what's the filename of our upload?
-        "content": content, # <--- what's our encoded image?
-        "branch": github_branch # <--- what branch of our repo are we uploading to?
-    }
+    Returns:
+        dict: The upload state (see drive_storage.load_state)
+    """
+    global drive_upload_state
+    if drive_upload_state is None:
+        drive_upload_state = drive_storage.load_state(drive_upload_state_file)
+    return drive_upload_state
+
+def find_drive_upload(content_hash):
+    """ Looks up whether an image with exactly these contents is already in the Drive folder and will stay there long 
+        enough to be used.
+
+    Args:
+        content_hash (str): The SHA-256 of the image contents
+
+    Returns:
+        str: The Drive file ID of the existing upload, or None if it needs to be uploaded
+    """
+    with drive_upload_state_lock:
+        entry = get_drive_upload_state()["uploads"].get(content_hash)
+    if entry is None:
+        return None
+    expires_at = datetime.fromisoformat(entry["uploaded_at"]) + timedelta(hours=IMAGE_MAX_AGE_HOURS - IMAGE_REUSE_MARGIN_HOURS)
+    return entry["file_id"] if datetime.utcnow() < expires_at else None
 
-    response = requests.put(github_api_url, headers=headers, json=data) # <--- submit upload request
+def upload_image_to_drive(content_hash, upload_path, name):
+    """ Uploads one image to the Drive folder, resuming an earlier unfinished upload of the same bytes if there is one.
 
+    Args:
+        content_hash (str): The SHA-256 of the image contents
+        upload_path (str): Local path to the (processed) image
+        name (str): The filename to give it in Drive
+
+    Returns:
+        str: The new file's ID
+    """
+    def remember_session(session_uri): # <--- saved straight away, so a crash part way through can resume
+        with drive_upload_state_lock:
+            state = get_drive_upload_state()
+            state["sessions"][content_hash] = {"session_uri": session_uri, "started_at": datetime.utcnow().isoformat()}
+            drive_storage.save_state(drive_upload_state_file, state, IMAGE_MAX_AGE_HOURS)
+
+    with drive_upload_state_lock:
+        earlier = get_drive_upload_state()["sessions"].get(content_hash)
+    return drive_storage.upload_file(get_drive_session(), upload_path, name, drive_folder_id,
+                                     earlier["session_uri"] if earlier else None, remember_session)
+
+def upload_images_to_drive(image_paths):
+    """
+    Uploads a batch of images to the Drive folder and returns public URLs that Slides can fetch them from. Each image is
+    sent with a resumable upload in fixed-size chunks, so memory use doesn't grow with the image size and an interrupted 
+    upload picks up where it stopped. Images whose exact bytes are already uploaded are not uploaded again.
 
-    if response.status_code == 201: # <--- if the upload goes well
-        # Return raw.githubusercontent URL
-        raw_url = f"https://raw.githubusercontent.com/{github_repo}/{github_branch}/{github_upload_path}/{unique_filename}"
-        return raw_url
-    else: # <--- if something went wrong with the upload
-        raise Exception(f"GitHub upload failed: {response.status_code} {response.json()}")
+    Args:
+        image_paths (list): Local paths to the images that we want to upload
 
-def create_add_image_to_slide_request(image_url, slide_id, height, width, x_pos, y_pos, x_scale, y_scale):
+    Returns:
+        list: Public Drive URLs, in the same order as image_paths
+    """
+    if not image_paths: # <--- nothing to upload
+        return []
+
+    # Shrink and hash several images at once
+    with ThreadPoolExecutor(max_workers=DRIVE_UPLOAD_WORKERS) as executor:
+        upload_paths = list(executor.map(prepare_image_for_upload, image_paths))
+        content_hashes = list(executor.map(image_processing.hash_file, upload_paths))
+
+    file_ids = {content_hash: find_drive_upload(content_hash) for content_hash in content_hashes}
+    new_images = {} # <--- content hash --> local path of each image that still needs uploading (so identical images are only uploaded once)
+    for content_hash, upload_path in zip(content_hashes, upload_paths):
+        if file_ids[content_hash] is None:
+            new_images.setdefault(content_hash, upload_path)
+
+    if new_images:
+        names = get_unique_filenames(list(new_images.values()))
+        with tracing.stage("drive_upload", image_count=len(new_images)), ThreadPoolExecutor(max_workers=DRIVE_UPLOAD_WORKERS) as executor:
+            uploaded = list(executor.map(tracing.wrap(upload_image_to_drive), new_images, new_images.values(), names))
+        drive_storage.share_files(get_drive_session(), uploaded) # <--- one batch request makes them all viewable by Slides
+        uploaded_at = datetime.utcnow().isoformat()
+        with drive_upload_state_lock:
+            state = get_drive_upload_state()
+            for content_hash, file_id in zip(new_images, uploaded):
+                state["uploads"][content_hash] = {"file_id": file_id, "uploaded_at": uploaded_at}
+                state["sessions"].pop(content_hash, None) # <--- finished, nothing left to resume
+            drive_storage.save_state(drive_upload_state_file, state, IMAGE_MAX_AGE_HOURS)
+        file_ids.update(zip(new_images, uploaded))
+
+    return [drive_storage.get_view_url(file_ids[content_hash]) for content_hash in content_hashes]
+
+def expire_drive_images():
+    """ Deletes the images in the Drive folder that are older than IMAGE_MAX_AGE_HOURS, if it has been at least 
+        DRIVE_EXPIRY_INTERVAL_SECONDS since we last did. Errors are only printed; we just try again next time.
+    """
+    global last_drive_expiry
+    if image_backend != "drive" or time.time() - last_drive_expiry < DRIVE_EXPIRY_INTERVAL_SECONDS:
+        return
+    last_drive_expiry = time.time()
+    try:
+        with tracing.stage("expire_drive_images", priority=quota_scheduler.BACKGROUND):
+            deleted = drive_storage.expire_images(get_drive_session(), drive_folder_id, IMAGE_MAX_AGE_HOURS)
+        if deleted:
+            print(f"Deleted {deleted} expired image(s) from Drive.")
+    except Exception as e:
+        print(f"Could not expire Drive images: {e}")
+
+def upload_images(image_paths):
+    """ Uploads a batch of images to whichever image backend is configured (see image_backend).
+
+    Args:
+        image_paths (list): Local paths to the images that we want to upload
+
+    Returns:
+        list: Public URLs that Slides can fetch the images from, in the same order as image_paths
+    """
+    return IMAGE_BACKENDS[image_backend](image_paths)
+
+# The image backends, by the name IMAGE_BACKEND picks them with
+IMAGE_BACKENDS = {
+    "github": upload_images_to_github,
+    "drive": upload_images_to_drive
+}
+
+def new_object_id(prefix):
+    """ Creates a unique object ID that we can assign to a new slide or page element ourselves, so that later requests in 
+        the same batch update can refer to it before Google has created it.
+
+    Args:
+        prefix (str): A short readable prefix for the ID (e.g. "flake" or "image")
+
+    Returns:
+        str: An object ID that satisfies the Slides API rules (5-50 characters of letters, digits and underscores)
+    """
+    return f"{prefix}_{uuid.uuid4().hex}" # <--- a random hex string keeps the ID unique without having to ask Google
+
+def create_add_image_to_slide_request(image_url, slide_id, height, width, x_pos, y_pos, x_scale, y_scale, object_id=None):
     """ Creates a request dictionary to add a given image onto a given slide with the given specifications.
 
     Args:
@@ -237,6 +996,7 @@ def create_add_image_to_slide_request(image_url, slide_id, height, width, x_pos,
         y_pos (float): Where on the screen we want it to be in the y-direction (The origin is the top left corner)
         x_scale (float): How we want to scale the image in the x-direction
         y_scale (float): How we want to scale the image in the y-direction
+        object_id (str, optional): The object ID to give the new image. Defaults to None (Google picks one).
 
     Returns:
         dict: A request dictionary that details how we want to place the image on the slide with the given specifications.
@@ -260,8 +1020,27 @@ def create_add_image_to_slide_request(image_url, slide_id, height, width, x_pos,
                 }
             }
         }
+    if object_id: # <--- only set the object ID if we were given one
+        request["createImage"]["objectId"] = object_id
     return request
 
+def create_add_images_to_slide_requests(image_1_url, image_2_url, slide_id):
+    """ Creates the requests that place two images on a given slide around the middle of the screen side by side so that 
+        they fill the slide horizontally.
+
+    Args:
+        image_1_url (str): The public URL linking to the first image to add (will be on the left)
+        image_2_url (str): The public URL linking to the second image to add (will be on the right)
+        slide_id (str): The ID for the slide we want to place the images on
+
+    Returns:
+        list: A list of the two createImage request dictionaries
+    """
+    requests = []
+    requests.append(create_add_image_to_slide_request(image_1_url, slide_id, IMAGE_HEIGHT_EMU, IMAGE_WIDTH_EMU, 23000, 600000, IMAGE_SCALE_X, IMAGE_SCALE_Y, new_object_id("image"))) # <--- add request to place image_1 on slide to request list
+    requests.append(create_add_image_to_slide_request(image_2_url, slide_id, IMAGE_HEIGHT_EMU, IMAGE_WIDTH_EMU, 4555000, 600000, IMAGE_SCALE_X, IMAGE_SCALE_Y, new_object_id("image"))) # <--- add request to place image_2 on slide to request list
+    return requests
+
 def add_images_to_slide(image_1_url, image_2_url, slide_id):
     """Places two images on a given slide around the middle of the screen side by side so that they fill the slide horizontally.
 
@@ -270,10 +1049,103 @@ def add_images_to_slide(image_1_url, image_2_url, slide_id):
         image_2_url (str): The google drive public URL linking to the second image to add (will be on the right)
         slide_id (str): The ID for the slide we want to place the images on
     """
-    requests = []
-    requests.append(create_add_image_to_slide_request(image_1_url, slide_id, 3000000, 4000000, 23000, 600000, 1.14, 1.13)) # <--- add request to place image_1 on slide to request list
-    requests.append(create_add_image_to_slide_request(image_2_url, slide_id, 3000000, 4000000, 4555000, 600000, 1.14, 1.13)) # <--- add request to place image_2 on slide to request list
-    slides_service.presentations().batchUpdate(presentationId=presentation_id, body={"requests": requests}).execute() # <--- do a batch update on the presentation with all of the requests on the request list
+    requests = create_add_images_to_slide_requests(image_1_url, image_2_url, slide_id) # <--- build the requests to place both images
+    execute_slides_batch(presentation_id, requests) # <--- do a batch update on the presentation with all of the requests on the request list
+
+def get_slide_ids(pres_id=None, for_placing=False):
+    """Gets the object IDs of every slide in a presentation, in slide order. These come from our cache when we have a 
+       recent copy; otherwise only the slide IDs are requested (not every page element of every slide), so this stays 
+       small no matter how big the deck gets.
+
+    Args:
+        pres_id (str, optional): The presentation to look at. Defaults to None (the globally defined presentation).
+        for_placing (bool, optional): Whether new slides will be placed at the end of the list (or it will be counted), 
+                                      so it must be up to date unless we are the deck's only writer. Defaults to False.
+
+    Returns:
+        list: A list of slide object IDs (str), the first of which is our template slide
+    """
+    pres_id = pres_id or presentation_id
+    with slide_ids_lock:
+        cached = slide_ids_cache.get(pres_id)
+        trusted = sole_slides_writer or not for_placing # <--- another station may have added slides since we last looked
+        if cached and trusted and time.time() - cached["fetched_at"] < SLIDE_IDS_MAX_AGE_SECONDS: # <--- we have a recent copy
+            return list(cached["slide_ids"])
+    response = execute_request(slides_service.presentations().get(presentationId=pres_id, fields="slides.objectId")) # <--- only ask for the slide IDs
+    slide_ids = [slide['objectId'] for slide in response.get('slides', [])]
+    with slide_ids_lock:
+        slide_ids_cache[pres_id] = {"slide_ids": slide_ids, "fetched_at": time.time()}
+    return list(slide_ids)
+
+def invalidate_slide_ids(pres_id):
+    """Forgets our cached slide order for a presentation, so the next get_slide_ids reads it again.
+
+    Args:
+        pres_id (str): The presentation to forget
+    """
+    with slide_ids_lock:
+        slide_ids_cache.pop(pres_id, None)
+
+def apply_slide_changes(slide_ids, requests, replies):
+    """Updates a list of slide IDs in place to match what a batch update did to the deck (new slides from 
+       duplicateObject replies, moves from updateSlidesPosition and deletions from deleteObject).
+
+    Args:
+        slide_ids (list): The slide IDs before the batch update
+        requests (list): The requests that were sent
+        replies (list): The replies Google sent back (one per request)
+    """
+    for request, reply in zip(requests, replies):
+        if 'duplicateObject' in request and request['duplicateObject']['objectId'] in slide_ids: # <--- a slide was duplicated (the copy goes right after it)
+            original_index = slide_ids.index(request['duplicateObject']['objectId'])
+            slide_ids.insert(original_index + 1, reply['duplicateObject']['objectId'])
+        elif 'updateSlidesPosition' in request: # <--- slides were moved (the index is based on the order before the move)
+            moving = request['updateSlidesPosition']['slideObjectIds']
+            insertion_index = request['updateSlidesPosition']['insertionIndex']
+            moved_from_before = sum(1 for i, slide_id in enumerate(slide_ids) if slide_id in moving and i < insertion_index)
+            remaining = [slide_id for slide_id in slide_ids if slide_id not in moving]
+            insertion_index -= moved_from_before
+            slide_ids[:] = remaining[:insertion_index] + moving + remaining[insertion_index:]
+        elif 'deleteObject' in request and request['deleteObject']['objectId'] in slide_ids: # <--- a slide was deleted
+            slide_ids.remove(request['deleteObject']['objectId'])
+
+def execute_slides_batch(pres_id, requests):
+    """Sends a batch of requests to a presentation in one batch update and keeps our cached slide order in step with it.
+
+    Args:
+        pres_id (str): The presentation to update
+        requests (list): The request dictionaries to send
+
+    Returns:
+        dict: The batch update response
+    """
+    try:
+        response = execute_request(slides_service.presentations().batchUpdate(presentationId=pres_id, body={"requests": requests}))
+    except HttpError:
+        invalidate_slide_ids(pres_id) # <--- our idea of the deck may be out of date (e.g. someone else added or removed slides)
+        raise
+    with slide_ids_lock:
+        if pres_id in slide_ids_cache:
+            apply_slide_changes(slide_ids_cache[pres_id]["slide_ids"], requests, response.get('replies', []))
+    return response
+
+def create_duplicate_slide_request(template_slide_id, new_slide_id):
+    """ Creates a request dictionary to duplicate the template slide under an object ID that we choose.
+
+    Args:
+        template_slide_id (str): The ID of the slide to duplicate
+        new_slide_id (str): The object ID to give the copy
+
+    Returns:
+        dict: A request dictionary that details how we want to duplicate the template slide
+    """
+    request = {
+        "duplicateObject": {
+            "objectId": template_slide_id, # <--- the slide we want to copy
+            "objectIds": {template_slide_id: new_slide_id} # <--- the ID we want the copy to have
+        }
+    }
+    return request
 
 def duplicate_template_slide():
     """Creates and submits a request to duplicate the first slide in the globally defined presentation
@@ -282,43 +1154,372 @@ def duplicate_template_slide():
         str: The ID for the new slide that was just duplicated
     """
     global presentation_id # <--- Make sure we are using the global presentation_id
-    response = slides_service.presentations().get(presentationId=presentation_id).execute() # <--- Get the presentation we want to access
-    slides = response['slides'] # <--- Access the dict of info for each slide in the presentation
-    template_slide_id = slides[0]['objectId'] # <--- Since we are using the first slide in the presentation as our template, we want the ID of THAT SPECIFIC SLIDE
+    template_slide_id = get_slide_ids()[0] # <--- Since we are using the first slide in the presentation as our template, we want the ID of THAT SPECIFIC SLIDE
+    new_slide_id = new_object_id("flake") # <--- pick the ID of the new slide ourselves
    
    # Call an update where we request to duplicate the template slide
-    duplicate_response = slides_service.presentations().batchUpdate(
-        presentationId=presentation_id,
-        body={
-            "requests": [
-                {
-                    "duplicateObject": {
-                        "objectId": template_slide_id
-                    }
-                }
-            ]
-        }
-    ).execute()
+    execute_slides_batch(presentation_id, [create_duplicate_slide_request(template_slide_id, new_slide_id)])
 
-    new_slide_id = duplicate_response['replies'][0]['duplicateObject']['objectId'] # <--- Get the slide ID of the newly duplicated slide 
     return new_slide_id
 
-def move_slide(slide_id, new_slide_index):
-    """A method to move a certain slide in our slideshow to a new position
+def create_skip_slide_request(slide_id, skipped):
+    """ Creates a request dictionary to hide a slide from (or show it in) the slideshow.
+
+    Args:
+        slide_id (str): The ID of the slide
+        skipped (bool): True to hide it, False to show it
+
+    Returns:
+        dict: A request dictionary that details whether the slide is skipped
+    """
+    request = {
+        "updateSlideProperties": {
+            "objectId": slide_id,
+            "slideProperties": {"isSkipped": skipped},
+            "fields": "isSkipped" # <--- only change this one property
+        }
+    }
+    return request
+
+def get_spare_slide_prefix():
+    """ Gets the prefix of the object IDs of this station's spare slides.
+
+    Returns:
+        str: The prefix (e.g. "spare_1a2b3c4d")
+    """
+    return f"spare_{hashlib.sha1(station_name.encode('utf-8')).hexdigest()[:8]}" # <--- station names can have characters object IDs can't
+
+def want_spare_slides(pres_id):
+    """ Starts keeping a pool of spare slides for a presentation (the next refill_spare_slides fills it).
+
+    Args:
+        pres_id (str): The presentation
+    """
+    if spare_slide_pool_size > 0:
+        with spare_slides_lock:
+            spare_slides_wanted.add(pres_id)
+
+def reconcile_spare_slides(pres_id):
+    """ Finds the spare slides we left in a presentation last time, keeping up to spare_slide_pool_size of them and 
+        deleting the rest (in one batch update). A spare keeps its ID once it is used for a flake, so only the ones that 
+        are still hidden count (which takes one small read of each slide's ID and isSkipped).
+
+    Args:
+        pres_id (str): The presentation
+    """
+    prefix = get_spare_slide_prefix() + "_"
+    response = execute_request(slides_service.presentations().get(presentationId=pres_id, fields="slides(objectId,slideProperties/isSkipped)"))
+    leftover = [slide['objectId'] for slide in response.get('slides', [])[1:]
+                if slide['objectId'].startswith(prefix) and slide.get('slideProperties', {}).get('isSkipped')]
+    extra = leftover[spare_slide_pool_size:]
+    if extra:
+        execute_slides_batch(pres_id, [{"deleteObject": {"objectId": slide_id}} for slide_id in extra])
+    with spare_slides_lock:
+        spare_slides[pres_id] = leftover[:spare_slide_pool_size]
+
+def refill_spare_slides():
+    """ Tops up the pool of spare slides of every presentation we keep one for, with one batch update each. Checks the 
+        deck for our leftover spares first if we haven't yet (e.g. at startup, or after a batch update failed).
+    """
+    with spare_slides_lock:
+        wanted = list(spare_slides_wanted)
+    for pres_id in wanted:
+        with spare_slides_lock:
+            reconciled = pres_id in spare_slides
+        if not reconciled:
+            reconcile_spare_slides(pres_id)
+        with spare_slides_lock:
+            missing = spare_slide_pool_size - len(spare_slides[pres_id])
+        if missing <= 0:
+            continue
+        template_slide_id = get_slide_ids(pres_id)[0]
+        new_spare_ids = [new_object_id(get_spare_slide_prefix()) for _ in range(missing)]
+        requests = []
+        for spare_slide_id in new_spare_ids: # <--- each copy goes right after the template, hidden from the slideshow
+            requests.append(create_duplicate_slide_request(template_slide_id, spare_slide_id))
+            requests.append(create_skip_slide_request(spare_slide_id, True))
+        with tracing.stage("refill_spare_slides", slide_count=missing, priority=quota_scheduler.BACKGROUND):
+            execute_slides_batch(pres_id, requests)
+        with spare_slides_lock:
+            spare_slides[pres_id].extend(new_spare_ids)
+
+def refill_spare_slides_quietly():
+    """ Tops up the spare slide pools if there are any, only printing errors (submits just duplicate the template 
+        themselves until the pool is refilled).
+    """
+    if spare_slide_pool_size <= 0:
+        return
+    try:
+        refill_spare_slides()
+    except Exception as e:
+        print(f"Could not refill the spare slides: {e}")
+
+def take_spare_slide(pres_id):
+    """ Takes a spare slide from a presentation's pool (and starts keeping a pool for it if we weren't).
+
+    Args:
+        pres_id (str): The presentation
+
+    Returns:
+        str: The ID of the spare slide, or None if there isn't one ready
+    """
+    want_spare_slides(pres_id)
+    with spare_slides_lock:
+        pool = spare_slides.get(pres_id)
+        return pool.pop(0) if pool else None
+
+def drop_spare_slides(pres_id):
+    """ Stops keeping a pool of spare slides for a presentation (e.g. a shard that new flakes no longer go in), deleting 
+        the spares it still has. A spare that can't be deleted is only printed (it stays hidden).
+
+    Args:
+        pres_id (str): The presentation
+    """
+    with spare_slides_lock:
+        if pres_id not in spare_slides_wanted:
+            return
+        spare_slides_wanted.discard(pres_id)
+        pool = spare_slides.pop(pres_id, None) or []
+    if pool:
+        try:
+            execute_slides_batch(pres_id, [{"deleteObject": {"objectId": slide_id}} for slide_id in pool])
+        except Exception as e:
+            print(f"Could not delete the spare slides of a deck we no longer add to: {e}")
+
+def count_flake_slides(pres_id):
+    """ Counts the flake slides in a presentation: every slide but the template and the hidden spare slides (any 
+        station's). If we are the deck's only writer and know our spares, this comes from our cache; otherwise it takes 
+        one small read of each slide's ID and isSkipped.
+
+    Args:
+        pres_id (str): The presentation
+
+    Returns:
+        int: How many flake slides there are
+    """
+    if sole_slides_writer:
+        with spare_slides_lock:
+            spares = spare_slides.get(pres_id)
+        if spares is not None: # <--- every spare in the deck is one of ours
+            return len(get_slide_ids(pres_id, for_placing=True)) - 1 - len(spares)
+    response = execute_request(slides_service.presentations().get(presentationId=pres_id, fields="slides(objectId,slideProperties/isSkipped)"))
+    return sum(1 for slide in response.get('slides', [])[1:] # <--- (a used spare keeps its ID, but it is no longer hidden)
+               if not (slide['objectId'].startswith("spare_") and slide.get('slideProperties', {}).get('isSkipped')))
+
+def forget_spare_slides(pres_id):
+    """ Forgets a presentation's pool after a batch update that used it failed, so the next refill checks the deck for 
+        which spares are really there.
+
+    Args:
+        pres_id (str): The presentation
+    """
+    with spare_slides_lock:
+        spare_slides.pop(pres_id, None)
+
+def parse_deck_rollover(policy):
+    """ Parses a deck rollover policy (see deck_rollover).
+
+    Args:
+        policy (str): The policy (e.g. "slides:300", "month", "chip" or "" for none)
+
+    Raises:
+        ValueError: If the policy isn't one we know
+
+    Returns:
+        tuple: The kind of policy (str, or None for none) and the slide limit (int, or None unless it is "slides")
+    """
+    if not policy:
+        return None, None
+    kind, _, limit = policy.partition(":")
+    if kind not in DECK_ROLLOVER_POLICIES or (kind == "slides") != bool(limit) or (limit and not limit.isdigit()) or limit == "0":
+        raise ValueError(f"Unknown DECK_ROLLOVER '{policy}' (use slides:<N>, month or chip)")
+    return kind, int(limit) if limit else None
+
+def get_deck_base_name(pres_id):
+    """ Gets the name of the presentation a deck is a shard of (or its own name if it isn't a shard).
+
+    Args:
+        pres_id (str): The presentation ID
+
+    Returns:
+        str: The base presentation's name, or None if the deck isn't in the "Presentation IDs" sheet
+    """
+    names = [name for name, value in pres_id_dict.items() if value == pres_id]
+    if not names:
+        return None
+    match = re.fullmatch(r"(.*) \(([^()]*)\)", names[0])
+    if match and match.group(1) in pres_id_dict: # <--- "Deck (2)" is a shard of "Deck" (but "Deck (old)" alone is its own deck)
+        return match.group(1)
+    return names[0]
+
+def get_deck_shard_ids(pres_id):
+    """ Gets a presentation and every shard of it (see deck_rollover).
+
+    Args:
+        pres_id (str): The presentation ID (of the base deck or any of its shards)
+
+    Returns:
+        list: The presentation IDs
+    """
+    base_name = get_deck_base_name(pres_id)
+    if base_name is None:
+        return [pres_id]
+    shard_ids = {value for name, value in pres_id_dict.items() if name == base_name or re.fullmatch(re.escape(base_name) + r" \([^()]*\)", name)}
+    return sorted(shard_ids | {pres_id})
+
+def get_newest_numbered_shard(base_name):
+    """ Finds the highest numbered shard of a presentation (the presentation itself counts as number 1).
+
+    Args:
+        base_name (str): The base presentation's name
+
+    Returns:
+        tuple: The shard's number (int) and presentation ID (str)
+    """
+    newest = (1, pres_id_dict[base_name])
+    for name, pres_id in pres_id_dict.items():
+        match = re.fullmatch(re.escape(base_name) + r" \((\d+)\)", name)
+        if match and int(match.group(1)) > newest[0]:
+            newest = (int(match.group(1)), pres_id)
+    return newest
+
+def copy_permissions(source_id, target_id):
+    """ Shares a new deck with everyone the deck it was copied from is shared with (a Drive copy starts out private to 
+        the service account). A permission that can't be copied is only printed.
+
+    Args:
+        source_id (str): The presentation it was copied from
+        target_id (str): The new presentation
+    """
+    service = get_drive_service()
+    response = execute_request(service.permissions().list(fileId=source_id, supportsAllDrives=True,
+                                                          fields="permissions(type,role,emailAddress,domain)"))
+    for permission in response.get('permissions', []):
+        if permission['role'] == "owner": # <--- ownership can't be given away like this (the copy is ours)
+            continue
+        try:
+            execute_request(service.permissions().create(fileId=target_id, body=permission, sendNotificationEmail=False,
+                                                         supportsAllDrives=True))
+        except HttpError as e:
+            print(f"Could not share the new deck with {permission.get('emailAddress') or permission['type']}: {e}")
+
+def register_presentation(name, pres_id):
+    """ Adds a presentation to the "Presentation IDs" sheet (and to pres_id_dict and the startup cache), so every 
+        station can pick it.
+
+    Args:
+        name (str): The slideshow name
+        pres_id (str): The presentation ID
+    """
+    worksheet = get_worksheet(PRESENTATION_IDS_SPREADSHEET, PRESENTATION_IDS_SHEET)
+    header = worksheet.row_values(1) # <--- put each value under its column, wherever the columns are
+    worksheet.append_row([{"Slideshow_Name": name, "Presentation_ID": pres_id}.get(column, "") for column in header],
+                         value_input_option="RAW")
+    pres_id_dict[name] = pres_id
+    with startup_cache_lock:
+        cached = get_startup_cache()["presentation_ids"].get(f"{PRESENTATION_IDS_SPREADSHEET}/{PRESENTATION_IDS_SHEET}")
+        if cached: # <--- (its modifiedTime is now out of date, so the next refresh reads the sheet again anyway)
+            cached["records"][name] = pres_id
+            save_startup_cache()
+
+def create_deck_shard(name, source_id):
+    """ Creates a new shard: copies a deck of the same presentation (in Drive, so the template keeps all of its 
+        formatting), deletes every slide but the template from the copy, shares it like the original and registers it.
+
+    Args:
+        name (str): The shard's slideshow name (e.g. "Deck (3)")
+        source_id (str): The deck to copy (only its template slide is kept)
+
+    Returns:
+        str: The new presentation's ID
+    """
+    global pres_id_dict
+    with tracing.stage("create_deck_shard", slideshow_name=name):
+        pres_id_dict = refresh_presentation_IDs(PRESENTATION_IDS_SPREADSHEET, PRESENTATION_IDS_SHEET)
+        if name in pres_id_dict: # <--- another station just made it
+            return pres_id_dict[name]
+        new_id = execute_request(get_drive_service().files().copy(fileId=source_id, body={"name": name}, fields="id",
+                                                                  supportsAllDrives=True))['id']
+        slide_ids = get_slide_ids(new_id)
+        if len(slide_ids) > 1: # <--- keep only the template (this also drops any spare slides we copied)
+            execute_slides_batch(new_id, [{"deleteObject": {"objectId": slide_id}} for slide_id in slide_ids[1:]])
+        copy_permissions(source_id, new_id)
+        register_presentation(name, new_id)
+    print(f"Started a new deck: {name}")
+    return new_id
+
+def assign_decks(pres_id, flakes):
+    """ Works out which deck each of a batch of flakes goes in under the rollover policy (see deck_rollover), creating 
+        any shards that are needed.
+
+    Args:
+        pres_id (str): The presentation the flakes were submitted to
+        flakes (list): The flakes' submissions (see create_submission), in the order their slides will be added
+
+    Returns:
+        list: The presentation ID each flake's slide goes in
+    """
+    kind, limit = parse_deck_rollover(deck_rollover)
+    base_name = get_deck_base_name(pres_id) if kind else None
+    if base_name is None: # <--- no policy, or a deck we can't find in the directory
+        return [pres_id] * len(flakes)
+    targets = []
+    with deck_rollover_lock:
+        if kind == "slides":
+            number, target = get_newest_numbered_shard(base_name)
+            room = limit - count_flake_slides(target)
+            for _ in flakes:
+                if room <= 0: # <--- this shard is full, so start the next one
+                    number += 1
+                    target = create_deck_shard(f"{base_name} ({number})", target)
+                    room = limit
+                targets.append(target)
+                room -= 1
+        else:
+            for flake in flakes:
+                if kind == "month":
+                    month, _, year = flake['date'].split("/") # <--- MM/DD/YYYY
+                    name = f"{base_name} ({year}-{month})"
+                else:
+                    name = f"{base_name} (chip {flake['chip_num']})"
+                if name not in pres_id_dict: # <--- copy the base deck, since any other shard may be just as full
+                    create_deck_shard(name, pres_id_dict[base_name])
+                targets.append(pres_id_dict[name])
+    # Decks new flakes no longer go in don't need spares (under "chip" any chip's shard may be used again, so only the 
+    # base deck's pool is dropped)
+    for deck_id in get_deck_shard_ids(pres_id):
+        if deck_id not in targets and (kind != "chip" or deck_id == pres_id_dict[base_name]):
+            drop_spare_slides(deck_id)
+    return targets
+
+def create_move_slide_request(slide_id, new_slide_index):
+    """ Creates a request dictionary to move a certain slide in our slideshow to a new position
 
     Args:
         slide_id (str): The ID of the slide to move 
-        last_slide_index (int): The new index to move the side to do
+        new_slide_index (int): The new index to move the slide to
+
+    Returns:
+        dict: A request dictionary that details where we want to move the slide
     """
-    requests = []
     move_request = {
         "updateSlidesPosition": {
             "slideObjectIds": [slide_id], # <--- the slide we want to move
             "insertionIndex": new_slide_index # <--- the position to move to
         }
     }
-    requests.append(move_request) # <--- add this move_request to our list of requests
-    slides_service.presentations().batchUpdate(presentationId=presentation_id, body={"requests": requests}).execute() # <--- send our request out to actually update the presentation
+    return move_request
+
+def move_slide(slide_id, new_slide_index):
+    """A method to move a certain slide in our slideshow to a new position
+
+    Args:
+        slide_id (str): The ID of the slide to move 
+        new_slide_index (int): The new index to move the slide to
+    """
+    requests = []
+    requests.append(create_move_slide_request(slide_id, new_slide_index)) # <--- add this move_request to our list of requests
+    execute_slides_batch(presentation_id, requests) # <--- send our request out to actually update the presentation
 
 
 def create_replace_text_requests(slide_id, old_text, new_text):
@@ -344,21 +1545,69 @@ def create_replace_text_requests(slide_id, old_text, new_text):
     }
     return request
 
-def fill_text(new_slide_id, flake_id, size, nav_instr):
-    """ Method to replace all template text on a slide with our stored information.
+def create_fill_text_requests(new_slide_id, flake_id, size, nav_instr):
+    """ Method to create the requests that replace all template text on a slide with our stored information.
+
     Args:
         new_slide_id (str): The slide to place our information on
         flake_id (str): The flake_id string
         size (str): The size description string
         nav_instr (str): The navigation description string
+
+    Returns:
+        list: A list of replaceAllText request dictionaries
     """
     requests = []
 
     requests.append(create_replace_text_requests(new_slide_id, "{{FlakeID}}", flake_id)) # <--- create request to replace flake_id template text
     requests.append(create_replace_text_requests(new_slide_id, "{{MaxDimensions}}", size)) # <--- create request to replace dimensions template text
     requests.append(create_replace_text_requests(new_slide_id, "{{Navigation}}", nav_instr)) # <--- create request to replace navigation template text
+    return requests
+
+def fill_text(new_slide_id, flake_id, size, nav_instr):
+    """ Method to replace all template text on a slide with our stored information.
+    Args:
+        new_slide_id (str): The slide to place our information on
+        flake_id (str): The flake_id string
+        size (str): The size description string
+        nav_instr (str): The navigation description string
+    """
+    requests = create_fill_text_requests(new_slide_id, flake_id, size, nav_instr) # <--- build the text replacement requests
 
-    slides_service.presentations().batchUpdate(presentationId=presentation_id, body={"requests": requests}).execute() # <--- submit all requests to update slide
+    execute_slides_batch(presentation_id, requests) # <--- submit all requests to update slide
+
+def create_new_slide_requests(template_slide_id, slide_count, image1_url, image2_url, flake_id, nav_instr, size, spare_slide_id=None):
+    """ Creates every request needed to add a finished flake slide to the end of the presentation: duplicate the template 
+        (or un-hide a spare copy of it), move the copy to the end, fill in its text and place both images. Because we 
+        choose the new slide's object ID ourselves, all of these can be sent together in a single batch update (which 
+        Google applies atomically).
+
+    Args:
+        template_slide_id (str): The ID of the template slide to duplicate
+        slide_count (int): How many slides the presentation has before this duplication
+        image1_url (str): The url for the first image to add
+        image2_url (str): The url for the second image to add
+        flake_id (str): The flake_id for the new slide
+        nav_instr (str): The navigation instructions for the flake on our new slide
+        size (str): The size of the flake on our new slide
+        spare_slide_id (str, optional): A spare slide to use instead of duplicating the template (see take_spare_slide). 
+                                        Defaults to None.
+
+    Returns:
+        tuple: The ID of the new slide (str) and the list of request dictionaries (list)
+    """
+    requests = []
+    if spare_slide_id is None:
+        new_slide_id = new_object_id("flake") # <--- pick the ID of the new slide ourselves so later requests can refer to it
+        requests.append(create_duplicate_slide_request(template_slide_id, new_slide_id)) # <--- duplicate the template slide
+        requests.append(create_move_slide_request(new_slide_id, slide_count + 1)) # <--- after duplicating there is one more slide, so this index is the end of the slideshow
+    else:
+        new_slide_id = spare_slide_id # <--- already a copy of the template, it just needs showing and moving
+        requests.append(create_skip_slide_request(new_slide_id, False))
+        requests.append(create_move_slide_request(new_slide_id, slide_count)) # <--- nothing was added, so the end is the current slide count
+    requests.extend(create_fill_text_requests(new_slide_id, flake_id, size, nav_instr)) # <--- update the text on the new slide
+    requests.extend(create_add_images_to_slide_requests(image1_url, image2_url, new_slide_id)) # <--- add images to the new slide
+    return new_slide_id, requests
 
 def format_navigation_string(down_from_TR, left_from_TR):
     """ A method to format the navigation string and handle edge cases of values for the down_from_TR and left_from_TR values.
@@ -458,14 +1707,53 @@ def push_to_slides(image1_url, image2_url, flake_id='1', nav_instr='1', size='1'
         flake_id (str, optional): The flake_id for the new slide. Defaults to '1'.
         nav_instr (str, optional): The navigation instructions for the flake on our new slide. Defaults to '1'.
         size (str, optional): The size of the flake on our new slide. Defaults to '1'.
+
+    Returns:
+        str: The ID of the new slide
+    """
+    with tracing.stage("create_slides", slide_count=1):
+        slide_ids = get_slide_ids(for_placing=True) # <--- get the (small) list of slide IDs so we know the template slide and where the end of the slideshow is
+        spare_slide_id = take_spare_slide(presentation_id)
+        new_slide_id, requests = create_new_slide_requests(slide_ids[0], len(slide_ids), image1_url, image2_url, flake_id, nav_instr, size, spare_slide_id)
+        try:
+            execute_slides_batch(presentation_id, requests) # <--- duplicate, move, fill text and add images all in one round trip
+        except Exception:
+            if spare_slide_id:
+                forget_spare_slides(presentation_id)
+            raise
+    return new_slide_id
+
+def create_sheet_row(flake_id, date, chip_num, flake_num, hmax, vmax, dframes, lframes, layers):
+    """ Method to build the row for a flake in the format our sheet expects.
+
+    Args:
+        flake_id (str): The identifier for our flake to add to the sheet.
+        date (str): The date of our flake.
+        chip_num (int): The chip number of our flake.
+        flake_num (int): The flake number of our flake.
+        hmax (str): The horizontal max dimension of our flake.
+        vmax (str): The vertical max dimension of our flake.
+        dframes (str): How many frames down from the top right our flake is.
+        lframes (str): How many frames left from the top right our flake is.
+        layers (str): How many layers (approximate) our flake is.
+
+    Returns:
+        list: The values for the new row
+    """
+    return [flake_id, date, int(chip_num), int(flake_num), float(hmax), float(vmax), float(dframes), float(lframes), layers] # <--- cast each variable to the value it's meant to be and put them in a list to append as the new row in our sheet
+
+def create_entry_row(entry):
+    """ Builds the sheet row for a journal entry (see create_sheet_row).
+
+    Args:
+        entry (dict): The journal entry
+
+    Returns:
+        list: The values for its row
     """
-    new_slide_id = duplicate_template_slide() # <--- duplicate the template slide so that we can edit it for our new flake
-    presentation_after_duplication = slides_service.presentations().get(presentationId=presentation_id).execute() # <--- pull the new version of the slideshow down with the duplicated slide
-    updated_slides = presentation_after_duplication['slides'] # <--- get the list of slides from the new version of the presentation
-    last_slide_index = len(updated_slides) # <--- get length of the updated list of slides
-    move_slide(new_slide_id, last_slide_index) # <--- move the new slide to the end of the slideshow
-    fill_text(new_slide_id, flake_id, size, nav_instr) # <--- update the text on the new slide
-    add_images_to_slide(image1_url, image2_url, new_slide_id) # <--- add images to the new slide
+    f = entry['fields']
+    return create_sheet_row(f['flake_id'], f['date'], f['chip_num'], f['flake_num'], f['horizontal_max'], f['vertical_max'], 
+                            f['down_from_TR'], f['left_from_TR'], f['approx_num_layers'])
 
 def push_to_sheets(flake_id, date, chip_num, flake_num, hmax, vmax, dframes, lframes, layers):
     """ Method to push gathered information onto google sheets.
@@ -482,7 +1770,7 @@ def push_to_sheets(flake_id, date, chip_num, flake_num, hmax, vmax, dframes, lfr
         layers (str): How many layers (approximate) our flake is.
     """
     global sheet
-    new_row = [flake_id, date, int(chip_num), int(flake_num), float(hmax), float(vmax), float(dframes), float(lframes), layers] # <--- cast each variable to the value it's meant to be and put them in a list to append as the new row in our sheet
+    new_row = create_sheet_row(flake_id, date, chip_num, flake_num, hmax, vmax, dframes, lframes, layers)
     sheet.append_row(new_row) # <--- append the new row we just made
 
 def open_error_window(e):
@@ -499,10 +1787,594 @@ def open_error_window(e):
     tk.Label(eroot, text="AN ERROR OCCURED. PLEASE OPEN VSCODE TO INVESTIGATE.", fg='red').pack()
     tk.Label(eroot, text=e, fg='red').pack() # <--- place the error message on the popup window
     print(e)
-    eroot.mainloop() # <--- open window
+    # No mainloop call here: the popup is a Toplevel of root, so root's mainloop already runs it
+
+def open_timing_window():
+    """ Method to open up a window showing how long each stage of our submissions has taken this session.
+    """
+    troot = tk.Toplevel(root) # <--- create a new window
+    troot.title("Timing Summary")
+    troot.geometry("500x250")
+    tk.Label(troot, text=tracing.get_summary(), justify="left", font=("Courier", 10)).pack(padx=10, pady=10)
+
+def sync_flake_catalog():
+    """ Brings the local flake catalog up to date with the current sheet (reading only the rows added since last time, if 
+        the sheet has changed at all).
+    """
+    with tracing.stage("sync_catalog", priority=quota_scheduler.BACKGROUND):
+        worksheet = get_worksheet(current_spreadsheet_name, current_sheet_name)
+        try:
+            modified_time = get_modified_time(worksheet.spreadsheet.id) # <--- if nobody has touched the sheet, there is nothing to read
+        except HttpError:
+            modified_time = None # <--- just read the new rows
+        flake_catalog.sync_catalog(worksheet, flake_catalog.get_source(current_spreadsheet_name, current_sheet_name), modified_time)
+
+def open_catalog_window():
+    """ Method to open up a window for searching the local flake catalog. The search itself never touches the network; 
+        opening the window (or pressing "Sync with Sheet") queues a sync so the catalog includes the latest rows.
+    """
+    croot = tk.Toplevel(root) # <--- create a new window
+    croot.title("Search Flakes")
+    croot.geometry("650x520")
+
+    # Filters (leave any of them empty to not filter on it)
+    filters = {}
+    for key, label in (("chip_num", "Chip:"), ("date_from", "From date (MM/DD/YYYY):"), ("date_to", "To date (MM/DD/YYYY):"),
+                       ("min_horizontal_max", "Min horizontal max:"), ("min_vertical_max", "Min vertical max:"),
+                       ("max_layers", "Max # layers:")):
+        row = tk.Frame(croot)
+        row.pack(fill="x", padx=10)
+        tk.Label(row, text=label, width=24, anchor="w").pack(side="left")
+        filters[key] = tk.Entry(row, width=20)
+        filters[key].pack(side="left")
+
+    results_list = tk.Listbox(croot, width=90, height=15, font=("Courier", 9))
+    status_label = tk.Label(croot, text="")
+
+    def search():
+        values = {key: entry.get().strip() or None for key, entry in filters.items()}
+        try:
+            for key in ("min_horizontal_max", "min_vertical_max", "max_layers"):
+                values[key] = float(values[key]) if values[key] is not None else None
+            values["chip_num"] = int(values["chip_num"]) if values["chip_num"] is not None else None
+            start = time.perf_counter()
+            flakes = flake_catalog.find_flakes(source=flake_catalog.get_source(current_spreadsheet_name, current_sheet_name), **values)
+        except ValueError as e:
+            status_label.config(text=f"Invalid filter: {e}", fg='red')
+            return
+        results_list.delete(0, tk.END)
+        for flake in flakes:
+            results_list.insert(tk.END, flake_catalog.format_flake(flake))
+        status_label.config(text=f"{len(flakes)} flake(s) found in {(time.perf_counter() - start) * 1000:.1f} ms", fg='black')
+
+    tk.Button(croot, text="Search", command=search).pack(pady=5)
+    results_list.pack(padx=10)
+    status_label.pack()
+    tk.Button(croot, text="Sync with Sheet", command=lambda: queue_job("Sync flake catalog", sync_flake_catalog)).pack(pady=5)
+    queue_job("Sync flake catalog", sync_flake_catalog) # <--- queued behind any submissions, so they show up too
+
+def combine_errors(errors):
+    """ Combines the errors from steps that ran at the same time into one exception so they can all be shown together.
+
+    Args:
+        errors (list): The exceptions that were raised
+
+    Returns:
+        Exception: The only error if there was just one, otherwise an exception listing every error message
+    """
+    if len(errors) == 1: # <--- nothing to combine
+        return errors[0]
+    return Exception("\n".join(str(e) for e in errors)) # <--- put each error message on its own line
+
+def create_submission(flake_id, down_from_TR, left_from_TR, horizontal_max, vertical_max, approx_num_layers, image_1_path, image_2_path):
+    """ Checks the entered values for a flake and packages them up into a submission that can be pushed later (possibly 
+        on another thread, after the GUI inputs have already changed).
+
+    Args:
+        flake_id (str): The flake identifier (e.g. 'S2_1_052825')
+        down_from_TR (str): How many frames down from the top right our flake is
+        left_from_TR (str): How many frames left from the top right our flake is
+        horizontal_max (str): The horizontal max dimension of our flake
+        vertical_max (str): The vertical max dimension of our flake
+        approx_num_layers (str): How many layers (approximate) our flake is
+        image_1_path (str): Local path to the first image
+        image_2_path (str): Local path to the second image
+
+    Raises:
+        ValueError: If the flake ID or any of the numbers can't be parsed
+
+    Returns:
+        dict: Every value needed to push this flake to sheets and slides
+    """
+    flake_info = parse_flake_id(flake_id) # <--- parse flake id to get sample, flake numbers & date
+    return {
+        'flake_id': flake_id,
+        'date': flake_info['date'],
+        'chip_num': flake_info['chip_num'],
+        'flake_num': flake_info['flake_num'],
+        'down_from_TR': down_from_TR,
+        'left_from_TR': left_from_TR,
+        'horizontal_max': horizontal_max,
+        'vertical_max': vertical_max,
+        'approx_num_layers': approx_num_layers,
+        'nav_instr': format_navigation_string(float(down_from_TR), float(left_from_TR)), # <--- format the navigation string into plain english from the navigation instruction numbers
+        'size': f'{horizontal_max} by {vertical_max}', # <--- format size string in plain english
+        'image_1_path': image_1_path,
+        'image_2_path': image_2_path
+    }
+
+def split_appended_range(updated_range, row_count):
+    """ Splits the range reported by a sheets append into the range of each row that was appended 
+        ("Sheet1!A5:I6" --> ["Sheet1!A5:I5", "Sheet1!A6:I6"]).
+
+    Args:
+        updated_range (str): The updatedRange from the append response
+        row_count (int): How many rows were appended
+
+    Returns:
+        list: The A1 range of each appended row, in order
+    """
+    sheet_part, cells = updated_range.rsplit("!", 1) # <--- "Sheet1", "A5:I6"
+    match = re.fullmatch(r"([A-Z]+)(\d+)(?::([A-Z]+)\d+)?", cells)
+    first_column, first_row, last_column = match.group(1), int(match.group(2)), match.group(3) or match.group(1)
+    return [f"{sheet_part}!{first_column}{first_row + i}:{last_column}{first_row + i}" for i in range(row_count)]
+
+def is_temporary_error(error):
+    """ Works out whether an error only means a service couldn't be reached or was busy, which says nothing about the 
+        submissions that were being sent (so it doesn't count towards outbox.MAX_ATTEMPTS).
+
+    Args:
+        error (Exception): What went wrong
+
+    Returns:
+        bool: True if trying again later may well work
+    """
+    if isinstance(error, HttpError):
+        return error.resp.status in http_session.RETRY_STATUS_CODES
+    if isinstance(error, APIError):
+        return error.response.status_code in http_session.RETRY_STATUS_CODES
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError, socket.gaierror, 
+                              httplib2.HttpLib2Error))
+
+def record_failed_attempt(entries, error):
+    """ Records in the outbox that a stage failed for some journal entries (see outbox.mark_failed_attempt).
+
+    Args:
+        entries (list): The journal entries
+        error (Exception): What went wrong
+    """
+    outbox.mark_failed_attempt([entry['id'] for entry in entries], error, counts=not is_temporary_error(error))
+
+def images_expired(entry):
+    """ Checks whether a journal entry's uploaded images may already have been deleted by cleanup.py (or soon will be) 
+        while its slide still needs them.
+
+    Args:
+        entry (dict): The journal entry
+
+    Returns:
+        bool: True if the images should be uploaded again before the slide is created
+    """
+    if entry['image_1_url'] is None or entry['slide_id'] is not None:
+        return False
+    uploaded_at = datetime.fromisoformat(entry['images_uploaded_at'] or entry['created_at'])
+    return datetime.utcnow() > uploaded_at + timedelta(hours=IMAGE_MAX_AGE_HOURS - IMAGE_REUSE_MARGIN_HOURS)
+
+def upload_outbox_images(entries):
+    """ Uploads the images of every journal entry that doesn't have image URLs yet (or whose images are about to be 
+        deleted from the upload folder), in a single commit.
+
+    Args:
+        entries (list): Journal entries from the outbox (updated in place with the new URLs)
+
+    Raises:
+        Exception: If any images can't be uploaded
+    """
+    def has_files(entry):
+        return os.path.exists(entry['fields']['image_1_path']) and os.path.exists(entry['fields']['image_2_path'])
+    for entry in entries:
+        if images_expired(entry) and has_files(entry): # <--- (without the files, the old URLs are still our best bet)
+            entry['image_1_url'] = entry['image_2_url'] = None
+    pending = [entry for entry in entries if entry['image_1_url'] is None]
+    missing = [entry for entry in pending if not has_files(entry)]
+    pending = [entry for entry in pending if entry not in missing] # <--- don't let one missing file hold up everyone else's upload
+    if missing:
+        error = Exception(f"Image files not found for: {', '.join(entry['flake_id'] for entry in missing)}")
+        record_failed_attempt(missing, error)
+    if pending:
+        image_paths = []
+        for entry in pending:
+            image_paths.extend([entry['fields']['image_1_path'], entry['fields']['image_2_path']])
+        try:
+            with tracing.stage("upload_images", image_count=len(image_paths)):
+                image_urls = upload_images(image_paths) # <--- one commit (or one Drive batch) for every image in the batch
+        except Exception as e:
+            record_failed_attempt(pending, e)
+            raise
+        for i, entry in enumerate(pending):
+            entry['image_1_url'], entry['image_2_url'] = image_urls[2 * i], image_urls[2 * i + 1]
+            outbox.mark_images_uploaded(entry['id'], entry['image_1_url'], entry['image_2_url'])
+    if missing:
+        raise error
+
+def append_outbox_rows(entries):
+    """ Appends the sheet row of every journal entry that hasn't been appended yet, with one append per sheet.
+
+    Args:
+        entries (list): Journal entries from the outbox (updated in place once appended)
+    """
+    groups = {}
+    for entry in entries:
+        if not entry['row_appended']:
+            groups.setdefault((entry['spreadsheet_name'], entry['sheet_name']), []).append(entry)
+    for (spreadsheet_name, sheet_name), group in groups.items():
+        try:
+            rows = [create_entry_row(entry) for entry in group]
+            with tracing.stage("append_rows", row_count=len(rows)):
+                response = get_worksheet(spreadsheet_name, sheet_name).append_rows(rows) # <--- one request for the whole group
+        except Exception as e:
+            record_failed_attempt(group, e)
+            raise
+        for entry, row_range in zip(group, split_appended_range(response['updates']['updatedRange'], len(group))):
+            entry['row_appended'], entry['row_range'] = 1, row_range
+            outbox.mark_row_appended(entry['id'], row_range)
+
+def create_outbox_slides(entries):
+    """ Creates the slide of every journal entry that has its images uploaded but no slide yet, with one batch update per 
+        presentation. Under a rollover policy (see deck_rollover) each slide goes in the right shard of the presentation 
+        it was submitted to, and the entry is moved to that shard.
+
+    Args:
+        entries (list): Journal entries from the outbox (updated in place once created)
+    """
+    submitted_to = {}
+    for entry in entries:
+        if entry['slide_id'] is None and entry['image_1_url'] is not None:
+            submitted_to.setdefault(entry['presentation_id'], []).append(entry)
+    groups = {}
+    for pres_id, submitted in submitted_to.items():
+        try:
+            targets = assign_decks(pres_id, [entry['fields'] for entry in submitted])
+        except Exception as e: # <--- e.g. a new shard couldn't be created
+            record_failed_attempt(submitted, e)
+            raise
+        for entry, target in zip(submitted, targets):
+            groups.setdefault(target, []).append(entry)
+    for pres_id, group in groups.items():
+        try:
+            create_deck_slides(pres_id, group)
+        except HttpError as e:
+            if e.resp.status != 400 or len(group) == 1:
+                record_failed_attempt(group, e)
+                raise
+            # The batch update is all-or-nothing, so one bad entry (e.g. an image Slides can't fetch) sinks the whole 
+            # group. Try each entry on its own so only the ones that are really failing are held back.
+            errors = []
+            for entry in group:
+                try:
+                    create_deck_slides(pres_id, [entry])
+                except Exception as entry_error:
+                    record_failed_attempt([entry], entry_error)
+                    errors.append(Exception(f"{entry['flake_id']}: {entry_error}"))
+            if errors:
+                raise combine_errors(errors)
+        except Exception as e:
+            record_failed_attempt(group, e)
+            raise
+
+def create_deck_slides(pres_id, entries):
+    """ Creates the slides of some journal entries in one presentation with a single batch update.
+
+    Args:
+        pres_id (str): The presentation
+        entries (list): The journal entries (updated in place once created)
+
+    Raises:
+        Exception: If the batch update fails (none of the slides are created)
+    """
+    used_spares = False
+    try:
+        with tracing.stage("create_slides", slide_count=len(entries)):
+            slide_ids = get_slide_ids(pres_id, for_placing=True) # <--- find the template slide and the end of the slideshow
+            slide_count = len(slide_ids)
+            requests = []
+            new_slide_ids = []
+            for entry in entries:
+                f = entry['fields']
+                spare_slide_id = take_spare_slide(pres_id)
+                new_slide_id, slide_requests = create_new_slide_requests(slide_ids[0], slide_count, entry['image_1_url'], entry['image_2_url'], 
+                                                                         f['flake_id'], f['nav_instr'], f['size'], spare_slide_id)
+                requests.extend(slide_requests)
+                new_slide_ids.append(new_slide_id)
+                if spare_slide_id is None:
+                    slide_count += 1 # <--- a duplicated slide makes the deck one longer; a spare was already in it
+                else:
+                    used_spares = True
+            execute_slides_batch(pres_id, requests) # <--- every slide for this presentation in one round trip
+    except Exception:
+        if used_spares: # <--- the batch update was all-or-nothing, so check which spares are really left next time
+            forget_spare_slides(pres_id)
+        raise
+    for entry, new_slide_id in zip(entries, new_slide_ids):
+        entry['slide_id'], entry['presentation_id'] = new_slide_id, pres_id
+        outbox.mark_slide_created(entry['id'], new_slide_id, pres_id)
+
+def push_outbox_entries(entries):
+    """ Pushes a batch of journal entries onto slides and sheets, picking each one up from its last completed stage.
+
+    Args:
+        entries (list): Journal entries from the outbox (updated in place as each stage finishes)
+
+    Raises:
+        Exception: If any stage fails (the errors from every failed stage are combined into one). Whatever did succeed 
+                   is recorded, and the rest stays in the outbox to be retried.
+    """
+    # The image upload and the sheets append don't depend on each other, so run them at the same time. Only the 
+    # slides step has to wait, because it needs the image URLs.
+    errors = []
+    with tracing.stage("flush_outbox", flake_ids=[entry['flake_id'] for entry in entries]), ThreadPoolExecutor(max_workers=2) as executor:
+        images_future = executor.submit(tracing.wrap(upload_outbox_images), entries)
+        rows_future = executor.submit(tracing.wrap(append_outbox_rows), entries)
+        try:
+            images_future.result() # <--- wait on the image URLs
+        except Exception as e:
+            errors.append(e)
+        try:
+            create_outbox_slides(entries) # <--- only builds slides for entries whose images made it up
+        except Exception as e:
+            errors.append(e)
+        try:
+            rows_future.result() # <--- make sure the rows were appended
+        except Exception as e:
+            errors.append(e)
+        if errors: # <--- report every failure together instead of just the first one (the next retry picks up from here)
+            raise combine_errors(errors)
+
+def push_outbox_entries_to_server(entries):
+    """ Uploads the images of a batch of journal entries, then hands the entries to the submission server (see 
+        submission_server.py), which adds their rows and slides together with every other station's. Waits until the 
+        server has written them.
+
+    Args:
+        entries (list): Journal entries from the outbox (updated in place as the server writes them)
+
+    Raises:
+        Exception: If the images can't be uploaded, the server can't be reached, or the server couldn't write some of 
+                   the entries (they stay in the outbox and are sent again later; the server never writes one twice)
+    """
+    errors = []
+    try:
+        upload_outbox_images(entries)
+    except Exception as e:
+        errors.append(e)
+    ready = [entry for entry in entries if entry['image_1_url'] is not None]
+    if ready:
+        with tracing.stage("server_submit", flake_ids=[entry['flake_id'] for entry in ready]):
+            resp = http_session.post(f"{submission_server_url}/submit", timeout=SUBMISSION_SERVER_TIMEOUT_SECONDS, json={
+                "station": station_name,
+                "submissions": [{"client_id": entry['id'], "fields": entry['fields'], "presentation_id": entry['presentation_id'],
+                                 "spreadsheet_name": entry['spreadsheet_name'], "sheet_name": entry['sheet_name'],
+                                 "image_1_url": entry['image_1_url'], "image_2_url": entry['image_2_url']} for entry in ready]})
+        if resp.status_code != 200:
+            error = Exception(f"Submission server rejected the batch: {resp.status_code} {resp.text}")
+            outbox.mark_failed_attempt([entry['id'] for entry in ready], error, counts=resp.status_code not in http_session.RETRY_STATUS_CODES)
+            raise combine_errors(errors + [error])
+        results = {result['client_id']: result for result in resp.json()['results']}
+        for entry in ready:
+            result = results.get(entry['id'], {"error": "The submission server sent back no result for it"})
+            if result['error']:
+                # (if the server just hasn't got to it yet, that says nothing about the submission)
+                outbox.mark_failed_attempt([entry['id']], Exception(result['error']), counts=not result.get('waiting'))
+                errors.append(Exception(f"{entry['flake_id']}: {result['error']}"))
+                continue
+            entry['row_appended'], entry['row_range'], entry['slide_id'] = 1, result['row_range'], result['slide_id']
+            entry['presentation_id'] = result.get('presentation_id', entry['presentation_id']) # <--- the shard the server put it in
+            outbox.update_entry(entry['id'], row_appended=1, row_range=result['row_range'], slide_id=result['slide_id'],
+                                presentation_id=entry['presentation_id'])
+    if errors:
+        raise combine_errors(errors)
+
+def flush_outbox():
+    """ Pushes every unfinished submission in the outbox onto slides and sheets (ourselves, or through the submission 
+        server if there is one), a batch at a time, picking each one up from its last completed stage. This does all of 
+        the network work, so it is run on the background worker thread.
+
+    Raises:
+        Exception: If any stage fails. Whatever did succeed is recorded, and the rest stays in the outbox to be retried.
+    """
+    push = push_outbox_entries_to_server if submission_server_url else push_outbox_entries
+    while True:
+        entries = outbox.get_unfinished(OUTBOX_BATCH_SIZE)
+        if not entries: # <--- everything is pushed
+            return
+        push(entries)
+
+def retry_dead_submissions():
+    """ Method called (on the worker thread) on push of the Retry Failed Submissions button. Gives every submission 
+        that was set aside another go, e.g. once its missing image files are back.
+    """
+    if outbox.revive_dead():
+        flush_outbox()
+
+def retry_outbox():
+    """ Quietly tries to flush any submissions left in the outbox (e.g. after the network came back). Errors are only 
+        printed, since the operator already saw them when the submission first failed.
+    """
+    if outbox.count_unfinished() == 0:
+        return
+    try:
+        flush_outbox()
+    except Exception as e:
+        print(f"Outbox retry failed, will try again in {OUTBOX_RETRY_SECONDS} seconds: {e}")
+
+def queue_job(description, function, *args):
+    """ Puts a job on the background work queue and adds it to the status area as queued.
+
+    Args:
+        description (str): What the job is, as shown in the status area (e.g. "Submit S2_1_052825")
+        function (function): The function the worker thread should run
+        *args: The arguments to pass to the function
+    """
+    job = {'number': len(job_list) + 1, 'description': description, 'state': 'queued'}
+    job_list.append(job) # <--- remember the job so the status area can show it
+    job_status_list.insert(tk.END, format_job_status(job)) # <--- show it straight away
+    job_queue.put((job, function, args)) # <--- hand it to the worker thread
+
+def format_job_status(job):
+    """ Formats a job as one line of the status area.
+
+    Args:
+        job (dict): The job to format
+
+    Returns:
+        str: A line like "#3 Submit S2_1_052825: running"
+    """
+    return f"#{job['number']} {job['description']}: {job['state']}"
+
+def job_worker():
+    """ Runs queued jobs one at a time, forever. This runs on its own thread, so it must never touch Tkinter widgets; 
+        instead it reports state changes on job_updates for poll_job_updates to show.
+    """
+    while True:
+        try:
+            job, function, args = job_queue.get(timeout=OUTBOX_RETRY_SECONDS) # <--- wait for the next job
+        except queue.Empty: # <--- nothing to do, so retry anything stuck in the outbox (and tidy up old Drive images)
+            retry_outbox()
+            expire_drive_images()
+            refill_spare_slides_quietly()
+            continue
+        job_updates.put((job, 'running', None))
+        try:
+            function(*args)
+            job_updates.put((job, 'done', None))
+        except Exception as e:
+            job_updates.put((job, 'failed', e)) # <--- pass the error back so the GUI can show it
+        job_updates.put((None, 'status', get_status())) # <--- the job may have changed the outbox, so show it straight away
+        job_queue.task_done()
+        if job_queue.empty(): # <--- caught up, so get spare slides ready for the next submit
+            refill_spare_slides_quietly()
+
+def get_status():
+    """ Reads the outbox and quota status shown under the jobs. This waits for the outbox lock (which the worker holds 
+        while it writes), so it must only be called off the GUI thread.
+
+    Returns:
+        dict: 'waiting' (how many submissions are still to be pushed), 'dead' (the outbox entries set aside) and 'quota' 
+              (the quota usage line)
+    """
+    return {'waiting': outbox.count_unfinished(), 'dead': outbox.get_dead(), 'quota': quota_scheduler.format_usage()}
+
+def status_reporter():
+    """ Sends the status on job_updates every STATUS_REPORT_SECONDS, forever (so quota usage stays current even while a 
+        long job is running). This runs on its own thread.
+    """
+    while True:
+        job_updates.put((None, 'status', get_status()))
+        time.sleep(STATUS_REPORT_SECONDS)
+
+def show_status(status):
+    """ Shows a status read by get_status under the jobs.
+
+    Args:
+        status (dict): The status
+    """
+    waiting, dead = status['waiting'], status['dead']
+    text = f"{waiting} submission(s) waiting to upload" if waiting else "All submissions uploaded"
+    if dead: # <--- these won't go anywhere on their own, so make sure the operator sees them
+        text += f"\n{len(dead)} set aside after {outbox.MAX_ATTEMPTS} failed tries: {', '.join(entry['flake_id'] for entry in dead)}"
+    outbox_status_label.config(text=text, fg="red" if dead else "black")
+    quota_status_label.config(text=status['quota']) # <--- live quota usage, so a slowdown can be explained
+
+def poll_job_updates():
+    """ Shows any job state changes and status reported by the worker threads, then schedules itself to run again. 
+        Nothing here reads the outbox, so the window never waits on the worker.
+    """
+    while True:
+        try:
+            job, state, detail = job_updates.get_nowait() # <--- detail is the error for a failed job, or the status itself
+        except queue.Empty: # <--- nothing left to show
+            break
+        if job is None: # <--- a status report (see get_status)
+            show_status(detail)
+            continue
+        job['state'] = state
+        index = job['number'] - 1 # <--- jobs are listed in the order they were queued
+        job_status_list.delete(index)
+        job_status_list.insert(index, format_job_status(job))
+        job_status_list.itemconfig(index, fg={'failed': 'red', 'done': 'green'}.get(state, 'black'))
+        job_status_list.see(index)
+        if detail is not None:
+            open_error_window(detail) # <--- show errors from the worker just like the old synchronous ones
+    root.after(JOB_POLL_MS, poll_job_updates) # <--- check again soon
+
+def open_watch_folder_dialog():
+    """ Method called on push of the Watch Folder button. Asks for the folder the microscope saves captures into and 
+        starts watching it (instead of any folder we were already watching).
+    """
+    global watch_stop_event
+    directory = filedialog.askdirectory(title="Select the folder captures are saved into")
+    if not directory:
+        return
+    if watch_stop_event is None: # <--- first time, so start showing what the watcher finds
+        root.after(JOB_POLL_MS, poll_watch_events)
+    else:
+        watch_stop_event.set() # <--- stop watching the old folder
+    watch_stop_event = threading.Event()
+    threading.Thread(target=watch_folder.watch, daemon=True,
+                     args=(directory, get_flake_id_from_filepath, lambda image_paths: watch_events.put(('images', image_paths)),
+                           lambda *pair: watch_events.put(('pair', pair)), watch_stop_event)).start()
+    watch_status_label.config(text=f"Watching {os.path.basename(directory)} for new captures...")
+
+def poll_watch_events():
+    """ Pre-uploads any captures the watcher has found and loads finished flakes into the window, then schedules itself 
+        to run again.
+    """
+    while True:
+        try:
+            kind, value = watch_events.get_nowait()
+        except queue.Empty:
+            break
+        if kind == 'images':
+            queue_job(f"Pre-upload {len(value)} image(s)", watch_folder.pre_upload_images, value, upload_images) # <--- on the worker, so it never races a submit
+        else:
+            waiting_pairs.append(value)
+            if watched_flake is None: # <--- nothing loaded yet, so the operator can start on this one
+                load_next_watched_pair()
+    root.after(JOB_POLL_MS, poll_watch_events)
+
+def load_next_watched_pair():
+    """ Loads the next flake found by the watcher into the window (as if both images were picked with the Open Image 
+        buttons), so the operator only has to type its measurements and press Submit.
+    """
+    global image_1_path, image_2_path, flake_id, watched_flake
+    if not waiting_pairs:
+        watched_flake = None
+        watch_status_label.config(text="Waiting for new captures...")
+        return
+    flake_id, image_1_path, image_2_path = waiting_pairs.pop(0)
+    watched_flake = flake_id
+    waiting = f" ({len(waiting_pairs)} more waiting)" if waiting_pairs else ""
+    watch_status_label.config(text=f"Ready: {flake_id}{waiting}")
+
+def check_image_files(image_1_path, image_2_path):
+    """ Checks both of a flake's images have been picked and are still on disk, before its submission is journaled.
+
+    Args:
+        image_1_path (str): Local path to the first image ("" if it hasn't been picked)
+        image_2_path (str): Local path to the second image ("" if it hasn't been picked)
+
+    Raises:
+        ValueError: If either image hasn't been picked or can't be found
+    """
+    if not image_1_path or not image_2_path:
+        raise ValueError("Please open both images before submitting")
+    missing = [path for path in (image_1_path, image_2_path) if not os.path.isfile(path)]
+    if missing:
+        raise ValueError(f"Image file not found: {', '.join(missing)}")
 
 def submit_data():
-    """ Method called on push of submit button in GUI, pushes all data entered in GUI onto slides and sheets for a given flake.
+    """ Method called on push of submit button in GUI, queues all data entered in GUI to be pushed onto slides and sheets 
+        for a given flake. The actual uploading happens on the background worker so the window stays usable.
     """
     try:
         global flake_id, down_from_TR, left_from_TR, horizontal_max, vertical_max, approx_num_layers, delete_url_list
@@ -514,182 +2386,309 @@ def submit_data():
         vertical_max = entry_max_vertical.get()
         approx_num_layers = entry_layers.get()
 
+        check_image_files(image_1_path, image_2_path) # <--- catch a missing image now, not after the worker has retried it
+        submission = create_submission(flake_id, down_from_TR, left_from_TR, horizontal_max, vertical_max, approx_num_layers, image_1_path, image_2_path)
 
-        flake_info = parse_flake_id(flake_id) # <--- parse flake id to get sample, flake numbers & date
-        #Extract specifics from flake_info
-        date = flake_info['date']
-        sample_num = flake_info['chip_num']
-        flake_num = flake_info['flake_num']
-
-        formatted_navigation_string = format_navigation_string(float(down_from_TR), float(left_from_TR)) # <--- format the navigation string into plain english from the navigation instruction numbers
-        formatted_size_string = f'{horizontal_max} by {vertical_max}' # <--- format size string in plain english
-
-        #Upload images to imgbb and get their urls to use when adding them to slides
-        image1_url = upload_image_to_github(image_1_path)
-        print(image1_url)
-        image2_url = upload_image_to_github(image_2_path)
-        print(image2_url)
-
-        # Print out info to debug
-        #print("Flake ID:", flake_id)
-        #print(f"Chip Number:", sample_num)
-        #print(f"Flake Number:", flake_num)
-        #print(f"Date Found:", date)
-        #print("Max Dimensions:", formatted_size_string)
-        #print("Navigation:", formatted_navigation_string)
-        #print("10x Image:", image_1_path)
-        #print("50x Image:", image_2_path)
-        #print("Approximate # Layers:", approx_num_layers)
-        
-        #Perform the actual upload to sheets and slides
-        push_to_sheets(flake_id, date, sample_num, flake_num, horizontal_max, vertical_max, down_from_TR, left_from_TR, approx_num_layers)
-        push_to_slides(image1_url, image2_url, flake_id=flake_id, nav_instr=formatted_navigation_string, size=formatted_size_string)
-
+        with tracing.stage("journal_submission", flake_id=flake_id):
+            outbox.add_submission(submission, presentation_id, current_spreadsheet_name, current_sheet_name) # <--- save it locally first, so nothing is lost if the network is down
+        queue_job(f"Submit {flake_id}", flush_outbox) # <--- let the worker push it to sheets and slides
+        if watch_stop_event is not None: # <--- in watch mode, move on to the next captured flake
+            load_next_watched_pair()
 
     except (Exception) as e:
         open_error_window(e) # <--- handle any errors by opening up an error popup window
        
-def delete_slide(slide_id):
+def delete_slide(slide_id, pres_id=None):
     """Delete the given slide from our presentation.
 
     Args:
         slide_id (str): The ID of the slide we want to delete from our presentation.
+        pres_id (str, optional): The presentation the slide is in. Defaults to None (the globally defined presentation).
     """
     #Create delete slide request
     delete_request = {
-        "requests": [
-            {
-                "deleteObject": {
-                    "objectId": slide_id
-                }
-            }
-        ]
+        "deleteObject": {
+            "objectId": slide_id
+        }
     }
-    slides_service.presentations().batchUpdate(presentationId=presentation_id, body=delete_request).execute() # <--- run command to delete slide
-   
-def delete_last_entry():
-    """ Delete the last entry in the slides and sheets.
-    """
-    all_values = sheet.get_all_values() # <--- load in all rows from the sheet
-    last_row = len(all_values) # <--- get the last row
-
-    # Delete it
-    if last_row > 1: # <--- if there is more than the header row
-        sheet.delete_rows(last_row) # <--- delete the last row
-        print(f"Deleted row {last_row}.", 'green') # <--- prints a message confirming successful deletion
-    else:
-        print("The sheet is empty, cannot delete any rows. Close this window to continue.", 'red') # <--- prints a message showing there were no entries to be deleted 
-    
-    presentation = slides_service.presentations().get(presentationId=presentation_id).execute() # <--- fetch slides info from drive
-    slides = presentation.get('slides') # <--- get list of slides from presentation
-    if len(slides) > 1: # <--- check if there are slides (other than the template slide) that we can delete
-        #Get ID of last slide
-        last_slide = slides[-1]
-        slide_id = last_slide['objectId']
-
-        delete_slide(slide_id) # <--- delete last slide
-        print(f"Deleted slide with ID: {slide_id}.", 'green') # <--- prints message confirming successful deletion
-    else:
-       print("No slides found in the presentation. Close this window to continue.", 'red') # <--- prints a message showing there were no slides to be deleted 
-
+    execute_slides_batch(pres_id or presentation_id, [delete_request]) # <--- run command to delete slide
 
-env_selector_root = tk.Tk()
-env_selector_root.title("Select .env File")
-env_selector_root.geometry("600x100")
+def row_matches(row_values, expected_row):
+    """ Checks whether a row read back from the sheet holds the values we appended (numbers may come back formatted 
+        differently, e.g. "5" for 5.0). Any columns after ours are ignored.
 
-# Add in env select field
-
-tk.Label(env_selector_root, text="Name of .env File to Use:").pack()
-# Initial options
-default_env = tk.StringVar()
-env_options = load_options("env_filenames.txt")
-print(env_options)
-print(env_options[0])
-default_env.set(env_options[0])
-# Combobox widget
-env_select = ttk.Combobox(env_selector_root, values=env_options, state="normal", textvariable=default_env, width=40)
-env_select.pack()
+    Args:
+        row_values (list): The row's values as read from the sheet
+        expected_row (list): The values we appended (see create_sheet_row)
 
-tk.Button(env_selector_root, text="Next", command=setup_env_info).pack(pady=5)
+    Returns:
+        bool: True if it is our row
+    """
+    row_values = list(row_values) + [""] * (len(expected_row) - len(row_values))
+    for value, expected in zip(row_values, expected_row):
+        if str(value) == str(expected):
+            continue
+        try:
+            if float(str(value).replace(",", "")) == float(expected):
+                continue
+        except ValueError:
+            pass
+        return False
+    return True
+
+def delete_appended_row(worksheet, row_range, expected_row):
+    """ Deletes a row we appended earlier. The row is checked first (one small read) in case rows around it were added or 
+        deleted since, in which case we look for it within UNDO_SEARCH_ROWS rows of where it was. Nothing is deleted 
+        unless the whole row matches what we appended.
 
-env_selector_root.mainloop()
+    Args:
+        worksheet (gspread.Worksheet): The sheet the row is in
+        row_range (str): Where the row was appended (e.g. "Sheet1!A12:I12")
+        expected_row (list): The values we appended (see create_sheet_row)
 
+    Raises:
+        Exception: If more than one nearby row matches, so we can't tell which one is ours
 
-pres_id_dict = process_presentation_IDs("Presentation IDs", "Sheet1")
+    Returns:
+        int: The number of the row we deleted, or None if it was already gone
+    """
+    first_column, row_number, last_column = re.search(r"!([A-Z]+)(\d+)(?::([A-Z]+)\d+)?", row_range).groups() # <--- "Sheet1!A12:I12" --> A, 12, I
+    row_number, last_column = int(row_number), last_column or first_column
+    row_values = worksheet.row_values(row_number) # <--- read just that one row
+    if not row_matches(row_values, expected_row): # <--- the row has moved (or been deleted by someone else)
+        first_row = max(row_number - UNDO_SEARCH_ROWS, 1)
+        nearby = worksheet.get(f"{first_column}{first_row}:{last_column}{row_number + UNDO_SEARCH_ROWS}")
+        matches = [first_row + i for i, values in enumerate(nearby) if row_matches(values, expected_row)]
+        if not matches:
+            return None
+        if len(matches) > 1: # <--- e.g. the same flake submitted twice; deleting the wrong one would be worse than stopping
+            raise Exception(f"Rows {', '.join(map(str, matches))} all match {expected_row[0]}, so none of them were deleted")
+        row_number = matches[0]
+    worksheet.delete_rows(row_number) # <--- delete exactly our row
+    return row_number
 
+def delete_last_entry():
+    """ Undo our most recent submission that hasn't been undone yet: delete exactly the row it appended and the slide it 
+        created (and, if it hadn't finished uploading, stop it from being pushed). Pressing it again undoes the one 
+        before that, and so on.
+    """
+    entry = outbox.get_last_undoable(current_spreadsheet_name, current_sheet_name, get_deck_shard_ids(presentation_id)) # <--- the latest entry in our undo history
+    if entry is None:
+        print("There are no submissions left to undo.") # <--- prints a message showing there were no entries to be deleted 
+        return
 
+    with tracing.stage("undo", flake_id=entry['flake_id']):
+        if submission_server_url:
+            undo_entry_on_server(entry)
+        else:
+            undo_entry(entry)
 
-# Create Settings Page
-options_root = tk.Tk()
-options_root.title("Flake Tracker Settings")
-options_root.geometry("600x380")
+def undo_entry(entry):
+    """ Deletes the row and slide a submission created, then marks it undone.
 
-# Add in presentation ID select field
-default_presentation_id = tk.StringVar()
-default_presentation_id.set('Default Presentation')
-tk.Label(options_root, text="Presentation Name:").pack()
-# Initial options
-pres_id_options = list(pres_id_dict.keys())
-# Combobox widget
-presentation_id_select = ttk.Combobox(options_root, values=pres_id_options, state="normal", textvariable=default_presentation_id, width=40)
-presentation_id_select.pack()
+    Args:
+        entry (dict): The journal entry to undo
+    """
+    if entry['row_range']:
+        row_number = delete_appended_row(get_worksheet(entry['spreadsheet_name'], entry['sheet_name']), entry['row_range'], create_entry_row(entry))
+        if row_number:
+            print(f"Deleted row {row_number}.") # <--- prints a message confirming successful deletion
+        else:
+            print(f"Row for {entry['flake_id']} was already deleted.")
+        outbox.update_entry(entry['id'], row_range=None) # <--- remember the row is gone in case deleting the slide fails and we have to try again
+    if entry['slide_id']:
+        try:
+            delete_slide(entry['slide_id'], entry['presentation_id']) # <--- delete exactly our slide, wherever it is in the deck
+            print(f"Deleted slide with ID: {entry['slide_id']}.") # <--- prints message confirming successful deletion
+        except HttpError as e:
+            if e.resp.status not in (400, 404): # <--- anything other than "that slide doesn't exist" is a real problem
+                raise
+            print(f"Slide with ID {entry['slide_id']} was already deleted.")
+    outbox.mark_undone(entry['id']) # <--- done undoing, so the next undo goes one step further back (and the outbox never pushes this one again)
+
+def undo_entry_on_server(entry):
+    """ Asks the submission server to delete the row and slide it wrote for one of our submissions (the server does it in 
+        turn with every other station's writes, so undoing never races them), then marks it undone here.
 
-# Add in spreadsheet select field
-default_spreadsheet_name = tk.StringVar()
-default_spreadsheet_name.set('Default Sheet')
-tk.Label(options_root, text="Spreadsheet Name:").pack()
-spreadsheet_options = load_options("spreadsheets.txt")
-spreadsheet_select = ttk.Combobox(options_root, values=spreadsheet_options, state="normal", textvariable=default_spreadsheet_name, width=40)
-spreadsheet_select.pack()
+    Args:
+        entry (dict): The journal entry to undo
 
-# Add in sheet name select field
-default_sheet_name = tk.StringVar()
-default_sheet_name.set('Sheet1')
-tk.Label(options_root, text="Sheet Name:").pack()
-sheet_options = load_options("sheets.txt")
-sheet_select = ttk.Combobox(options_root, values=sheet_options, state="normal", textvariable=default_sheet_name, width=40)
-sheet_select.pack()
+    Raises:
+        Exception: If the server can't be reached or couldn't undo it
+    """
+    resp = http_session.post(f"{submission_server_url}/undo", timeout=SUBMISSION_SERVER_TIMEOUT_SECONDS,
+                             json={"station": station_name, "client_id": entry['id']})
+    if resp.status_code != 200:
+        raise Exception(f"Submission server could not undo {entry['flake_id']}: {resp.status_code} {resp.text}")
+    print(f"Undid {entry['flake_id']}." if resp.json()['undone'] else f"{entry['flake_id']} never reached the sheet or slides.")
+    outbox.mark_undone(entry['id'])
 
-#Add a button to exit the settings page and use the settings text fields to start up the program
-tk.Button(options_root, text="Next", command=shutdown_options_screen).pack(pady=5)
 
-# Open Window
-options_root.mainloop()
+def open_env_selector_screen():
+    """ Opens the window where the operator picks which .env file to use. Pressing "Next" connects to the services 
+        (see setup_env_info) and closes the window.
+    """
+    global env_selector_root, env_select
+    env_selector_root = tk.Tk()
+    env_selector_root.title("Select .env File")
+    env_selector_root.geometry("600x100")
 
-# GUI setup for main page
-root = tk.Tk()
-root.title("Flake Tracker")
-root.geometry("600x450")
+    # Add in env select field
 
-# Text Inputs for main page
-tk.Label(root, text="Horizontal Max:").pack()
-entry_max_horizontal = tk.Entry(root, width=40)
-entry_max_horizontal.pack()
+    tk.Label(env_selector_root, text="Name of .env File to Use:").pack()
+    # Initial options
+    default_env = tk.StringVar()
+    env_options = load_options("env_filenames.txt")
+    print(env_options)
+    print(env_options[0])
+    default_env.set(env_options[0])
+    # Combobox widget
+    env_select = ttk.Combobox(env_selector_root, values=env_options, state="normal", textvariable=default_env, width=40)
+    env_select.pack()
 
-tk.Label(root, text="Vertical Max:").pack()
-entry_max_vertical = tk.Entry(root, width=40)
-entry_max_vertical.pack()
+    tk.Button(env_selector_root, text="Next", command=setup_env_info).pack(pady=5)
 
-tk.Label(root, text="Down from Top Right:").pack()
-entry_down_TR = tk.Entry(root, width=40)
-entry_down_TR.pack()
+    env_selector_root.mainloop()
 
-tk.Label(root, text="Left from Top Right:").pack()
-entry_left_TR = tk.Entry(root, width=40)
-entry_left_TR.pack()
 
-tk.Label(root, text="Approximate # Layers:").pack()
-entry_layers = tk.Entry(root, width=40)
-entry_layers.pack()
+def open_options_screen():
+    """ Opens the settings window where the operator picks the presentation, spreadsheet and sheet to push to. Pressing 
+        "Next" loads those settings (see shutdown_options_screen) and closes the window.
+    """
+    global options_root, presentation_id_select, spreadsheet_select, sheet_select, options_status_label, options_next_button
+    # Create Settings Page
+    options_root = tk.Tk()
+    options_root.title("Flake Tracker Settings")
+    options_root.geometry("600x380")
+
+    # Add in presentation ID select field
+    default_presentation_id = tk.StringVar()
+    default_presentation_id.set('Default Presentation')
+    tk.Label(options_root, text="Presentation Name:").pack()
+    # Initial options
+    pres_id_options = list(pres_id_dict.keys())
+    # Combobox widget
+    presentation_id_select = ttk.Combobox(options_root, values=pres_id_options, state="normal", textvariable=default_presentation_id, width=40)
+    presentation_id_select.pack()
+
+    # Add in spreadsheet select field
+    default_spreadsheet_name = tk.StringVar()
+    default_spreadsheet_name.set('Default Sheet')
+    tk.Label(options_root, text="Spreadsheet Name:").pack()
+    spreadsheet_options = load_options("spreadsheets.txt")
+    spreadsheet_select = ttk.Combobox(options_root, values=spreadsheet_options, state="normal", textvariable=default_spreadsheet_name, width=40)
+    spreadsheet_select.pack()
+
+    # Add in sheet name select field
+    default_sheet_name = tk.StringVar()
+    default_sheet_name.set('Sheet1')
+    tk.Label(options_root, text="Sheet Name:").pack()
+    sheet_options = load_options("sheets.txt")
+    sheet_select = ttk.Combobox(options_root, values=sheet_options, state="normal", textvariable=default_sheet_name, width=40)
+    sheet_select.pack()
+
+    #Add a button to exit the settings page and use the settings text fields to start up the program
+    options_next_button = tk.Button(options_root, text="Next", command=shutdown_options_screen)
+    options_next_button.pack(pady=5)
+    options_status_label = tk.Label(options_root, text="", fg='red', wraplength=580) # <--- why Next didn't go through, if it didn't
+    options_status_label.pack()
+
+    # Check the (possibly cached) presentation names are current while the operator fills in the settings
+    refresh_presentation_IDs_in_background(PRESENTATION_IDS_SPREADSHEET, PRESENTATION_IDS_SHEET)
+    options_root.after(JOB_POLL_MS, poll_presentation_IDs)
+
+    # Open Window
+    options_root.mainloop()
+
+def poll_presentation_IDs():
+    """ Updates the presentation dropdown once the background check of the presentation names has finished, otherwise 
+        schedules itself to check again.
+    """
+    if presentation_ids_refreshed.is_set():
+        presentation_id_select['values'] = list(pres_id_dict.keys())
+    else:
+        options_root.after(JOB_POLL_MS, poll_presentation_IDs)
 
-# File buttons
-tk.Button(root, text="Open Image 1", command=lambda: open_im_file_dialog(1)).pack(pady=5)
-tk.Button(root, text="Open Image 2", command=lambda: open_im_file_dialog(2)).pack(pady=5)
 
-# Submit button
-tk.Button(root, text="Submit", command=submit_data).pack(pady=15)
+def open_main_screen():
+    """ Opens the main Flake Tracker window and starts the background worker that pushes its submissions.
+    """
+    global root, entry_max_horizontal, entry_max_vertical, entry_down_TR, entry_left_TR, entry_layers, job_status_list, outbox_status_label, watch_status_label
+    global quota_status_label
+    # GUI setup for main page
+    root = tk.Tk()
+    root.title("Flake Tracker")
+    root.geometry("600x860")
+
+    # Text Inputs for main page
+    tk.Label(root, text="Horizontal Max:").pack()
+    entry_max_horizontal = tk.Entry(root, width=40)
+    entry_max_horizontal.pack()
+
+    tk.Label(root, text="Vertical Max:").pack()
+    entry_max_vertical = tk.Entry(root, width=40)
+    entry_max_vertical.pack()
+
+    tk.Label(root, text="Down from Top Right:").pack()
+    entry_down_TR = tk.Entry(root, width=40)
+    entry_down_TR.pack()
+
+    tk.Label(root, text="Left from Top Right:").pack()
+    entry_left_TR = tk.Entry(root, width=40)
+    entry_left_TR.pack()
+
+    tk.Label(root, text="Approximate # Layers:").pack()
+    entry_layers = tk.Entry(root, width=40)
+    entry_layers.pack()
+
+    # File buttons
+    tk.Button(root, text="Open Image 1", command=lambda: open_im_file_dialog(1)).pack(pady=5)
+    tk.Button(root, text="Open Image 2", command=lambda: open_im_file_dialog(2)).pack(pady=5)
+    tk.Button(root, text="Watch Folder", command=open_watch_folder_dialog).pack(pady=5)
+    watch_status_label = tk.Label(root, text="")
+    watch_status_label.pack()
+
+    # Submit button
+    tk.Button(root, text="Submit", command=submit_data).pack(pady=15)
+
+    # Delete last entry button (queued behind any submissions so it deletes what the operator expects; press again to undo further back)
+    tk.Button(root, text="Delete Last Entry", command=lambda: queue_job("Delete last entry", delete_last_entry)).pack(pady=5)
+
+    # Status area showing queued, running, done and failed jobs
+    tk.Label(root, text="Jobs:").pack()
+    job_status_list = tk.Listbox(root, width=70, height=8)
+    job_status_list.pack()
+    outbox_status_label = tk.Label(root, text="", wraplength=580)
+    outbox_status_label.pack()
+    tk.Button(root, text="Retry Failed Submissions", command=lambda: queue_job("Retry failed submissions", retry_dead_submissions)).pack(pady=5)
+    quota_status_label = tk.Label(root, text="", wraplength=580)
+    quota_status_label.pack()
+    tk.Button(root, text="Show Timing Summary", command=open_timing_window).pack(pady=5)
+    tk.Button(root, text="Search Flakes", command=open_catalog_window).pack(pady=5)
+
+    outbox.open_outbox(outbox_file) # <--- open the local journal of submissions
+    flake_catalog.open_catalog(catalog_file) # <--- open the local copy of the flake sheet
+    if spare_slide_pool_size > 0 and not submission_server_url: # <--- (the server keeps its own spares)
+        want_spare_slides(presentation_id)
+        queue_job("Prepare spare slides", refill_spare_slides) # <--- reuse or remove last session's spares, then top up
+    if outbox.count_unfinished(): # <--- pick up anything left over from last time (e.g. a crash or an outage)
+        queue_job("Resume unfinished submissions", flush_outbox)
+    threading.Thread(target=job_worker, daemon=True).start() # <--- start the background worker
+    threading.Thread(target=status_reporter, daemon=True).start()
+    root.after(JOB_POLL_MS, poll_job_updates) # <--- start checking for job updates
+
+    root.mainloop()
+
+
+def main():
+    """ Runs the Flake Tracker GUI: pick a .env file, pick the settings, then enter flakes.
+    """
+    global pres_id_dict
+    open_env_selector_screen()
+    pres_id_dict = process_presentation_IDs(PRESENTATION_IDS_SPREADSHEET, PRESENTATION_IDS_SHEET) # <--- instant if we have it cached
+    open_options_screen()
+    open_main_screen()
 
-# Delete last entry button
-tk.Button(root, text="Delete Last Entry", command=delete_last_entry).pack(pady=5)
 
-root.mainloop()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import base64
+import hashlib
+import os
+import http_session
+from datetime import datetime
+
+# Base URL for the GitHub REST API
+GITHUB_API_URL = "https://api.github.com"
+
+# Uploaded images are named {name}_{timestamp}{ext}, with the upload time (UTC) in this format
+UPLOAD_TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
+
+# How many times to rebuild a commit when someone else moves the branch head before we can update it
+MAX_COMMIT_ATTEMPTS = 5
+
+
+def github_headers(token):
+    """ Builds the request headers for talking to the GitHub API.
+
+    Args:
+        token (str): The personal access github token we're using
+
+    Returns:
+        dict: The request headers
+    """
+    return {
+        "Authorization": f"token {token}", # <--- what's the personal access github token we're using?
+        "Accept": "application/vnd.github+json"
+    }
+
+
+def parse_upload_timestamp(filename):
+    """ Gets the upload time out of an uploaded image's filename ('S1_2_10x_20250528153000.jpg' --> 2025-05-28 15:30:00).
+
+    Args:
+        filename (str): The filename (or path) of the uploaded image
+
+    Returns:
+        datetime: The upload time in UTC, or None if the filename doesn't end in a timestamp
+    """
+    name = os.path.splitext(os.path.basename(filename))[0] # <--- filename without the extension
+    timestamp = name.rsplit("_", 1)[-1] # <--- the part after the last underscore
+    try:
+        return datetime.strptime(timestamp, UPLOAD_TIMESTAMP_FORMAT)
+    except ValueError: # <--- not one of our timestamped uploads
+        return None
+
+
+def git_blob_sha(content):
+    """ Computes the SHA that git (and so GitHub) gives a blob with the given contents, without uploading anything.
+
+    Args:
+        content (bytes): The raw file contents
+
+    Returns:
+        str: The blob SHA
+    """
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def check_response(response, action):
+    """ Raises an error if a GitHub API request didn't succeed.
+
+    Args:
+        response (requests.Response): The response to check
+        action (str): What we were trying to do (used in the error message)
+
+    Raises:
+        Exception: If the response has an error status code
+    """
+    if response.status_code >= 400:
+        raise Exception(f"GitHub {action} failed: {response.status_code} {response.text}")
+
+
+def get_branch_head(repo, branch, headers):
+    """ Gets the commit that a branch currently points at and the tree of that commit.
+
+    Args:
+        repo (str): The repo in the form "owner/name"
+        branch (str): The branch name
+        headers (dict): The request headers (see github_headers)
+
+    Returns:
+        tuple: The commit SHA (str) and its tree SHA (str)
+    """
+    resp = http_session.get(f"{GITHUB_API_URL}/repos/{repo}/git/ref/heads/{branch}", headers=headers) # <--- where does the branch point?
+    check_response(resp, "branch lookup")
+    commit_sha = resp.json()["object"]["sha"]
+    resp = http_session.get(f"{GITHUB_API_URL}/repos/{repo}/git/commits/{commit_sha}", headers=headers) # <--- what tree does that commit have?
+    check_response(resp, "commit lookup")
+    return commit_sha, resp.json()["tree"]["sha"]
+
+
+def list_tree(repo, tree_sha, headers):
+    """ Lists every file under a tree (including subfolders) in a single request.
+
+    Args:
+        repo (str): The repo in the form "owner/name"
+        tree_sha (str): The SHA of the tree (or a branch name) to list
+        headers (dict): The request headers (see github_headers)
+
+    Returns:
+        tuple: A list of dicts with the "path" and "sha" of every file (list), and whether GitHub cut the list short 
+               because the tree was too big (bool)
+    """
+    resp = http_session.get(f"{GITHUB_API_URL}/repos/{repo}/git/trees/{tree_sha}", headers=headers, params={"recursive": 1})
+    check_response(resp, "tree listing")
+    data = resp.json()
+    files = [entry for entry in data["tree"] if entry["type"] == "blob"] # <--- skip the folder entries
+    return files, data.get("truncated", False)
+
+
+def create_blob(repo, content, headers):
+    """ Stores file contents in the repo as a blob (this doesn't touch any branch, so it is safe to do in parallel).
+
+    Args:
+        repo (str): The repo in the form "owner/name"
+        content (bytes): The raw file contents
+        headers (dict): The request headers (see github_headers)
+
+    Returns:
+        str: The SHA of the new blob
+    """
+    data = {"content": base64.b64encode(content).decode("utf-8"), "encoding": "base64"}
+    resp = http_session.post(f"{GITHUB_API_URL}/repos/{repo}/git/blobs", headers=headers, json=data)
+    check_response(resp, "blob upload")
+    return resp.json()["sha"]
+
+
+def create_tree(repo, base_tree_sha, entries, headers):
+    """ Creates a new tree that is the base tree with the given entries added, replaced or removed.
+
+    Args:
+        repo (str): The repo in the form "owner/name"
+        base_tree_sha (str): The SHA of the tree to start from
+        entries (list): Git tree entries (dicts with "path", "mode", "type" and "sha"; a "sha" of None removes the path)
+        headers (dict): The request headers (see github_headers)
+
+    Returns:
+        str: The SHA of the new tree
+    """
+    resp = http_session.post(f"{GITHUB_API_URL}/repos/{repo}/git/trees", headers=headers,
+                         json={"base_tree": base_tree_sha, "tree": entries})
+    check_response(resp, "tree creation")
+    return resp.json()["sha"]
+
+
+def create_commit(repo, message, tree_sha, parent_sha, headers):
+    """ Creates a commit of the given tree on top of the given parent commit.
+
+    Args:
+        repo (str): The repo in the form "owner/name"
+        message (str): The commit message
+        tree_sha (str): The SHA of the tree to commit
+        parent_sha (str): The SHA of the parent commit
+        headers (dict): The request headers (see github_headers)
+
+    Returns:
+        str: The SHA of the new commit
+    """
+    resp = http_session.post(f"{GITHUB_API_URL}/repos/{repo}/git/commits", headers=headers,
+                         json={"message": message, "tree": tree_sha, "parents": [parent_sha]})
+    check_response(resp, "commit creation")
+    return resp.json()["sha"]
+
+
+def update_branch(repo, branch, commit_sha, headers):
+    """ Moves a branch to the given commit, but only if that is a fast-forward. If someone else moved the branch after we
+        read it, nothing is changed and False is returned so the caller can rebuild on top of the new head.
+
+    Args:
+        repo (str): The repo in the form "owner/name"
+        branch (str): The branch name
+        commit_sha (str): The SHA of the commit to move the branch to
+        headers (dict): The request headers (see github_headers)
+
+    Returns:
+        bool: True if the branch was moved, False if the branch head had moved under us
+    """
+    resp = http_session.patch(f"{GITHUB_API_URL}/repos/{repo}/git/refs/heads/{branch}", headers=headers,
+                          json={"sha": commit_sha, "force": False})
+    if resp.status_code == 422: # <--- not a fast-forward: the branch moved after we read it
+        return False
+    check_response(resp, "branch update")
+    return True
+
+
+def commit_files(repo, branch, message, entries, headers):
+    """ Commits a set of tree entries onto a branch as a single commit, retrying on top of the new head if the branch
+        moves while we are working.
+
+    Args:
+        repo (str): The repo in the form "owner/name"
+        branch (str): The branch name
+        message (str): The commit message
+        entries (list or function): Git tree entries to add, replace or remove (see create_tree), or a function that 
+                                    takes the head commit SHA and returns them (so they can be rebuilt against whatever 
+                                    the branch points at on each attempt)
+        headers (dict): The request headers (see github_headers)
+
+    Raises:
+        Exception: If the branch kept moving for MAX_COMMIT_ATTEMPTS attempts
+
+    Returns:
+        str: The SHA of the new commit (or of the current head if there turned out to be nothing to commit)
+    """
+    for _ in range(MAX_COMMIT_ATTEMPTS):
+        head_sha, base_tree_sha = get_branch_head(repo, branch, headers)
+        attempt_entries = entries(head_sha) if callable(entries) else entries
+        if not attempt_entries: # <--- nothing left to change
+            return head_sha
+        tree_sha = create_tree(repo, base_tree_sha, attempt_entries, headers)
+        commit_sha = create_commit(repo, message, tree_sha, head_sha, headers)
+        if update_branch(repo, branch, commit_sha, headers): # <--- compare-and-swap the branch onto our commit
+            return commit_sha
+    raise Exception(f"GitHub commit failed: {branch} kept moving after {MAX_COMMIT_ATTEMPTS} attempts")
@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+import quota_scheduler
+import tracing
+
+# How many times to retry a request that was throttled or hit a server error, and how long to wait between tries
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_MAX_SECONDS = 60
+
+# Which status codes mean "try again later" rather than "this request is wrong"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# How many connections to keep open per host, and how many requests may be in flight at once across all threads
+POOL_SIZE = 10
+max_concurrent_requests = 8
+
+# The shared session (created on first use) and the slots that limit how many requests run at once
+session = None
+session_lock = threading.Lock()
+request_slots = threading.BoundedSemaphore(max_concurrent_requests)
+
+
+def get_session():
+    """ Gets the shared requests session, creating it the first time. Reusing one session keeps connections open between
+        requests, so each call doesn't pay for a new TCP and TLS handshake.
+
+    Returns:
+        requests.Session: The shared session
+    """
+    global session
+    with session_lock:
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE) # <--- keep-alive connection pool
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        return session
+
+
+def set_max_concurrent_requests(limit):
+    """ Changes how many requests may be in flight at once.
+
+    Args:
+        limit (int): The new limit
+    """
+    global max_concurrent_requests, request_slots
+    max_concurrent_requests = limit
+    request_slots = threading.BoundedSemaphore(limit)
+
+
+def is_retryable(response):
+    """ Checks whether a response means we were throttled or the server had a temporary problem.
+
+    Args:
+        response (requests.Response): The response to check
+
+    Returns:
+        bool: True if the same request should be tried again later
+    """
+    if response.status_code in RETRY_STATUS_CODES:
+        return True
+    if response.status_code == 403: # <--- GitHub uses 403 for both primary and secondary rate limits
+        return response.headers.get("X-RateLimit-Remaining") == "0" or "rate limit" in response.text.lower()
+    return False
+
+
+def get_retry_delay(response, attempt):
+    """ Works out how long to wait before retrying. Retry-After and GitHub's rate-limit reset time are respected when the
+        server sends them; otherwise we back off exponentially with some jitter.
+
+    Args:
+        response (requests.Response): The throttled response (or None if the connection failed)
+        attempt (int): How many times we have already retried (0 for the first retry)
+
+    Returns:
+        float: How many seconds to wait
+    """
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX_SECONDS)
+            except ValueError: # <--- Retry-After can also be an HTTP date
+                return min(max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0), BACKOFF_MAX_SECONDS)
+        if response.headers.get("X-RateLimit-Remaining") == "0" and response.headers.get("X-RateLimit-Reset"):
+            return min(max(int(response.headers["X-RateLimit-Reset"]) - time.time(), 0), BACKOFF_MAX_SECONDS) # <--- wait for the rate limit window to reset
+    delay = BACKOFF_BASE_SECONDS * (2 ** attempt) # <--- 1, 2, 4, 8... seconds
+    return min(delay + random.uniform(0, BACKOFF_BASE_SECONDS), BACKOFF_MAX_SECONDS)
+
+
+def request(method, url, session=None, **kwargs):
+    """ Sends a request over the shared session, retrying with backoff if we are throttled, the server has a temporary
+        problem or the connection drops. Each try waits for its API's quota first (see quota_scheduler.py).
+
+    Args:
+        method (str): The HTTP method (e.g. "GET")
+        url (str): The URL to send it to
+        session (requests.Session, optional): The session to send it over instead of the shared one (e.g. a Google 
+                                              AuthorizedSession). Defaults to None.
+        **kwargs: Anything else requests accepts (headers, json, params...)
+
+    Raises:
+        requests.RequestException: If the connection still fails after MAX_RETRIES retries
+
+    Returns:
+        requests.Response: The final response (which may still be an error if we ran out of retries)
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        response = None
+        api = quota_scheduler.acquire(url, method) # <--- before taking a slot, so waiting for quota never holds one up
+        try:
+            with request_slots: # <--- wait for a free slot so we never have too many requests in flight
+                response = (session or get_session()).request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            tracing.record_request(retries=1 if attempt else 0)
+            if attempt == MAX_RETRIES: # <--- out of retries
+                raise
+        else:
+            tracing.record_request(bytes_sent=len(response.request.body or b""), retries=1 if attempt else 0) # <--- count it against the current stage
+            quota_scheduler.record_response(api, response.status_code, response.headers)
+            if not is_retryable(response) or attempt == MAX_RETRIES:
+                return response
+        time.sleep(get_retry_delay(response, attempt)) # <--- wait before trying again (outside the slot, so others can go)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request("PUT", url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import tempfile
+
+try:
+    from PIL import Image, ImageOps
+except ImportError: # <--- Pillow is optional; without it images are uploaded exactly as they are
+    Image = None
+    ImageOps = None
+
+# How much of a file to read at a time when hashing it (keeps memory flat for big captures)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def is_available():
+    """ Checks whether we can process images (Pillow is installed).
+
+    Returns:
+        bool: True if images can be resized and recompressed
+    """
+    return Image is not None
+
+
+def hash_file(path):
+    """ Computes the SHA-256 hash of a file's contents.
+
+    Args:
+        path (str): The path to the file
+
+    Returns:
+        str: The hex digest of the file's contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""): # <--- read the file a piece at a time
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def process_image(image_path, max_width, quality, cache_dir):
+    """ Shrinks an image down to at most max_width pixels wide and recompresses it as a JPEG of the given quality. The
+        result is cached by the hash of the source file (and the settings), so processing the same capture again is free.
+
+    Args:
+        image_path (str): The path to the original image
+        max_width (int): The widest the processed image should be, in pixels
+        quality (int): The JPEG quality to save with (1-95)
+        cache_dir (str): The folder to keep processed images in
+
+    Returns:
+        str: The path to the processed image, or image_path itself if Pillow isn't installed or processing wouldn't make
+             the file any smaller
+    """
+    if not is_available():
+        return image_path
+
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    key = f"{hash_file(image_path)}_w{max_width}_q{quality}" # <--- a different source or different settings means a different output
+    output_dir = os.path.join(cache_dir, key)
+    output_path = os.path.join(output_dir, f"{name}.jpg") # <--- keep the original name so the uploaded filename still identifies the flake
+    if not os.path.exists(output_path): # <--- we haven't processed this exact file before
+        os.makedirs(output_dir, exist_ok=True)
+        with Image.open(image_path) as image:
+            image = ImageOps.exif_transpose(image) # <--- apply any camera rotation before we throw the metadata away
+            image = image.convert("RGB") # <--- JPEG has no alpha channel
+            if image.width > max_width:
+                height = round(image.height * max_width / image.width) # <--- keep the aspect ratio
+                image = image.resize((max_width, height), Image.LANCZOS)
+            fd, temp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp") # <--- our own temp file, in case another thread is processing the same capture
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    image.save(f, "JPEG", quality=quality, optimize=True, progressive=True)
+                os.replace(temp_path, output_path) # <--- only put the file in the cache once it is completely written
+            except OSError:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                if not os.path.exists(output_path): # <--- (if another thread finished it first, that one is just as good)
+                    raise
+
+    if os.path.getsize(output_path) >= os.path.getsize(image_path) and image_path.lower().endswith((".jpg", ".jpeg")):
+        return image_path # <--- the original was already smaller, so just send that
+    return output_path
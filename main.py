@@ -1,29 +1,96 @@
 import sys
 import subprocess
 import os
+import hashlib
+import re
+from importlib import metadata
 
-def install_package(package):
-    """Install the given package on the system
+# Where we remember the requirements we last found fully installed, so later launches can skip checking them
+FINGERPRINT_FILE = ".requirements_fingerprint"
+
+
+def install_packages(packages):
+    """Install the given packages on the system (in a single pip run)
 
     Args:
-        package (str): The name of the package we want to install.
+        packages (list): The requirement strings (e.g. "gspread==6.2.1") we want to install.
     """
     # implement pip as a subprocess:
-    subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
-    # process output with an API in the subprocess module:
-    subprocess.check_output([sys.executable, '-m', 'pip', 'freeze'])
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install'] + packages)
+
 
-def install_all_requirements():
-    """ Reads from requirements.txt file if present and then installs all needed packages.
+def read_requirements():
+    """ Reads the requirements.txt file if present.
+
+    Returns:
+        list: The requirement strings, one per non-empty line (an empty list if there is no requirements.txt)
     """
     if not os.path.exists('requirements.txt'): # <--- check if we can find a file with that name in the same directory as the program is being run from
         return [] # <--- Returning empty list
     # Note that the above if statement guarantees that if the file does not exist we do not try to open it. If we try to open a file in read mode without it existing, it will return an error.
     with open('requirements.txt', "r") as f: # <--- open a file with the given file name in reading mode (we are not planning to modify the file)
-        packages = [line.strip() for line in f.readlines() if line.strip()]
-        for package in packages:
-            install_package(package) # <--- install all necessary packages as stated in requirements
+        return [line.strip() for line in f.readlines() if line.strip() and not line.strip().startswith('#')]
+
+
+def is_installed(requirement):
+    """ Checks whether a requirement is already installed at the right version.
+
+    Args:
+        requirement (str): A requirement string, either a bare package name or "name==version"
+
+    Returns:
+        bool: True if the package is installed (at exactly the pinned version, if there is one)
+    """
+    match = re.fullmatch(r"([A-Za-z0-9_.\-]+)\s*(?:==\s*([^\s;]+))?", requirement)
+    if not match: # <--- anything fancier than name==version, let pip decide
+        return False
+    name, version = match.groups()
+    try:
+        installed_version = metadata.version(name) # <--- look up the installed version without importing the package
+    except metadata.PackageNotFoundError:
+        return False
+    return version is None or installed_version == version
+
+
+def get_fingerprint(requirements):
+    """ Makes a fingerprint of the requirements and the Python they are installed into.
+
+    Args:
+        requirements (list): The requirement strings
+
+    Returns:
+        str: A hash that changes whenever the requirements or the Python interpreter change
+    """
+    text = "\n".join([sys.executable, sys.version] + requirements)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def install_all_requirements(force_check=False):
+    """ Reads from requirements.txt file if present and then installs any needed packages that are missing or at the wrong
+        version. If nothing has changed since the last launch where everything was installed, this does no checking at all.
+
+    Args:
+        force_check (bool, optional): Check every requirement even if the fingerprint matches. Defaults to False.
+    """
+    requirements = read_requirements()
+    fingerprint = get_fingerprint(requirements)
+    if not force_check and os.path.exists(FINGERPRINT_FILE):
+        with open(FINGERPRINT_FILE, "r") as f:
+            if f.read().strip() == fingerprint: # <--- same requirements and Python as the last good launch
+                return
+
+    missing = [requirement for requirement in requirements if not is_installed(requirement)]
+    if missing:
+        install_packages(missing) # <--- only install what is actually missing or mismatched
+    with open(FINGERPRINT_FILE, "w") as f:
+        f.write(fingerprint) # <--- remember this environment is good
 
 
-install_all_requirements()
-exec(open("flake_tracker.py").read()) # <--- run flake_tracker
+if __name__ == "__main__": # <--- (so the helpers above can be imported without launching anything)
+    install_all_requirements()
+    try:
+        import flake_tracker
+    except ImportError: # <--- something was uninstalled since the last good launch, so check everything again
+        install_all_requirements(force_check=True)
+        import flake_tracker
+    flake_tracker.main() # <--- run flake_tracker
@@ -0,0 +1,303 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+# The default file the outbox journal is kept in
+OUTBOX_FILE = "outbox.db"
+
+# Every submission is written here before anything is sent over the network. Each stage records its result as soon as it
+# finishes, so after a crash or an outage we pick up from the last completed stage instead of starting over:
+#   images uploaded --> image_1_url and image_2_url are set
+#   row appended    --> row_appended is 1 (and row_range says where it went)
+#   slide created   --> slide_id is set
+# A submission is done once all three stages are complete. The row range and slide ID also make up our undo history:
+# undoing a submission deletes exactly those two things and sets undone to 1.
+# A submission that keeps failing for reasons of its own (not an outage) is set aside (dead is set to 1) after 
+# MAX_ATTEMPTS tries, so it stops holding up the submissions behind it; it is only tried again if the operator asks.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    flake_id TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    presentation_id TEXT NOT NULL,
+    spreadsheet_name TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    image_1_url TEXT,
+    image_2_url TEXT,
+    row_appended INTEGER NOT NULL DEFAULT 0,
+    row_range TEXT,
+    slide_id TEXT,
+    done INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    undone INTEGER NOT NULL DEFAULT 0,
+    station TEXT,
+    client_id INTEGER,
+    images_uploaded_at TEXT,
+    dead INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS submissions_done ON submissions (done, id);
+"""
+
+# On a submission server (see submission_server.py) every entry also records which station sent it and that station's 
+# own journal ID for it, so a station resending a submission (e.g. after a timeout) never creates a second row or slide
+CLIENT_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS submissions_client ON submissions (station, client_id)"
+
+# Columns added after the first version of the journal, with how to add them to an older journal file
+MIGRATIONS = {
+    "undone": "ALTER TABLE submissions ADD COLUMN undone INTEGER NOT NULL DEFAULT 0",
+    "station": "ALTER TABLE submissions ADD COLUMN station TEXT",
+    "client_id": "ALTER TABLE submissions ADD COLUMN client_id INTEGER",
+    "images_uploaded_at": "ALTER TABLE submissions ADD COLUMN images_uploaded_at TEXT",
+    "dead": "ALTER TABLE submissions ADD COLUMN dead INTEGER NOT NULL DEFAULT 0"
+}
+
+# How many failed tries (not counting ones that failed because a service couldn't be reached) a submission gets before
+# it is set aside
+MAX_ATTEMPTS = 5
+
+# The open journal and the lock that makes it safe to use from several threads
+connection = None
+lock = threading.Lock()
+
+
+def open_outbox(path=OUTBOX_FILE):
+    """ Opens (creating if needed) the outbox journal.
+
+    Args:
+        path (str, optional): The file to keep the journal in. Defaults to OUTBOX_FILE.
+    """
+    global connection
+    with lock:
+        connection = sqlite3.connect(path, check_same_thread=False) # <--- the worker thread and the GUI both use it (guarded by lock)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL") # <--- writes stay fast and survive a crash
+        connection.executescript(SCHEMA)
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(submissions)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns: # <--- journal was made by an older version
+                connection.execute(statement)
+        connection.execute(CLIENT_INDEX)
+        connection.commit()
+
+
+def add_submission(submission, presentation_id, spreadsheet_name, sheet_name, station=None, client_id=None):
+    """ Writes a new submission to the journal.
+
+    Args:
+        submission (dict): The submission (see flake_tracker.create_submission)
+        presentation_id (str): The presentation its slide goes in
+        spreadsheet_name (str): The spreadsheet its row goes in
+        sheet_name (str): The sheet within the spreadsheet its row goes in
+        station (str, optional): The station that sent it (on a submission server). Defaults to None.
+        client_id (int, optional): The station's own journal ID for it (on a submission server). Defaults to None.
+
+    Returns:
+        int: The ID of the new journal entry (or of the existing one, if the station already sent this submission)
+    """
+    with lock:
+        if station is not None:
+            row = connection.execute("SELECT id FROM submissions WHERE station = ? AND client_id = ?", (station, client_id)).fetchone()
+            if row is not None: # <--- sent again, so keep the one we already have
+                return row["id"]
+        cursor = connection.execute(
+            "INSERT INTO submissions (created_at, flake_id, fields, presentation_id, spreadsheet_name, sheet_name, station, client_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (datetime.utcnow().isoformat(), submission['flake_id'], json.dumps(submission), presentation_id,
+             spreadsheet_name, sheet_name, station, client_id))
+        connection.commit()
+        return cursor.lastrowid
+
+
+def to_entry(row):
+    """ Turns a journal row into a dict, with the submission fields unpacked.
+
+    Args:
+        row (sqlite3.Row): The row
+
+    Returns:
+        dict: The journal entry
+    """
+    entry = dict(row)
+    entry['fields'] = json.loads(entry['fields'])
+    return entry
+
+
+def get_unfinished(limit):
+    """ Gets the oldest submissions that still have stages left to do (leaving out the ones that were set aside). 
+        Submissions that have never failed come first, so ones that keep failing can't crowd them out of a batch.
+
+    Args:
+        limit (int): The most submissions to return
+
+    Returns:
+        list: The journal entries, oldest first (after any that have already failed)
+    """
+    with lock:
+        rows = connection.execute("SELECT * FROM submissions WHERE done = 0 AND undone = 0 AND dead = 0 "
+                                  "ORDER BY attempts > 0, id LIMIT ?", (limit,)).fetchall()
+    return [to_entry(row) for row in rows]
+
+
+def get_entries(entry_ids):
+    """ Gets journal entries by ID.
+
+    Args:
+        entry_ids (list): The IDs of the journal entries
+
+    Returns:
+        list: The journal entries that exist, oldest first
+    """
+    with lock:
+        rows = connection.execute(f"SELECT * FROM submissions WHERE id IN ({', '.join('?' * len(entry_ids))}) ORDER BY id", list(entry_ids)).fetchall()
+    return [to_entry(row) for row in rows]
+
+
+def find_client_entry(station, client_id):
+    """ Finds the entry a station sent to a submission server.
+
+    Args:
+        station (str): The station that sent it
+        client_id (int): The station's own journal ID for it
+
+    Returns:
+        dict: The journal entry, or None if the station never sent it
+    """
+    with lock:
+        row = connection.execute("SELECT * FROM submissions WHERE station = ? AND client_id = ?", (station, client_id)).fetchone()
+    return to_entry(row) if row else None
+
+
+def count_unfinished():
+    """ Counts the submissions that still have stages left to do (leaving out the ones that were set aside).
+
+    Returns:
+        int: How many there are
+    """
+    with lock:
+        return connection.execute("SELECT COUNT(*) FROM submissions WHERE done = 0 AND undone = 0 AND dead = 0").fetchone()[0]
+
+
+def get_dead():
+    """ Gets the submissions that were set aside after failing MAX_ATTEMPTS times.
+
+    Returns:
+        list: The journal entries, oldest first
+    """
+    with lock:
+        rows = connection.execute("SELECT * FROM submissions WHERE done = 0 AND undone = 0 AND dead = 1 ORDER BY id").fetchall()
+    return [to_entry(row) for row in rows]
+
+
+def revive_dead():
+    """ Gives every submission that was set aside another MAX_ATTEMPTS tries (e.g. once the operator has fixed what was
+        wrong with it).
+
+    Returns:
+        int: How many submissions will be tried again
+    """
+    with lock:
+        cursor = connection.execute("UPDATE submissions SET dead = 0, attempts = 0 WHERE dead = 1 AND done = 0 AND undone = 0")
+        connection.commit()
+        return cursor.rowcount
+
+
+def update_entry(entry_id, **values):
+    """ Records the result of a stage for one submission, and marks it done if that was the last stage left.
+
+    Args:
+        entry_id (int): The ID of the journal entry
+        **values: The columns to set (e.g. slide_id="flake_...")
+    """
+    columns = ", ".join(f"{column} = ?" for column in values)
+    with lock:
+        connection.execute(f"UPDATE submissions SET {columns} WHERE id = ?", list(values.values()) + [entry_id])
+        connection.execute("UPDATE submissions SET done = 1, last_error = NULL WHERE id = ? AND image_1_url IS NOT NULL "
+                           "AND row_appended = 1 AND slide_id IS NOT NULL", (entry_id,))
+        connection.commit()
+
+
+def mark_images_uploaded(entry_id, image_1_url, image_2_url):
+    """ Records that a submission's images are uploaded.
+
+    Args:
+        entry_id (int): The ID of the journal entry
+        image_1_url (str): The URL of the first image
+        image_2_url (str): The URL of the second image
+    """
+    update_entry(entry_id, image_1_url=image_1_url, image_2_url=image_2_url, images_uploaded_at=datetime.utcnow().isoformat())
+
+
+def mark_row_appended(entry_id, row_range):
+    """ Records that a submission's sheet row is appended.
+
+    Args:
+        entry_id (int): The ID of the journal entry
+        row_range (str): Where the row went (e.g. "Sheet1!A12:I12")
+    """
+    update_entry(entry_id, row_appended=1, row_range=row_range)
+
+
+def mark_slide_created(entry_id, slide_id, presentation_id=None):
+    """ Records that a submission's slide is created.
+
+    Args:
+        entry_id (int): The ID of the journal entry
+        slide_id (str): The object ID of the new slide
+        presentation_id (str, optional): The presentation it was created in, if not the one it was submitted to (e.g. a 
+                                         shard of it). Defaults to None.
+    """
+    if presentation_id is None:
+        update_entry(entry_id, slide_id=slide_id)
+    else:
+        update_entry(entry_id, slide_id=slide_id, presentation_id=presentation_id)
+
+
+def mark_failed_attempt(entry_ids, error, counts=True):
+    """ Records that a flush attempt failed for some submissions. They stay in the journal to be retried, unless they 
+        have now failed MAX_ATTEMPTS times, in which case they are set aside.
+
+    Args:
+        entry_ids (list): The IDs of the journal entries
+        error (Exception): What went wrong
+        counts (bool, optional): Whether this counts towards MAX_ATTEMPTS (False if a service just couldn't be reached, 
+                                 which says nothing about the submissions). Defaults to True.
+    """
+    with lock:
+        connection.executemany(f"UPDATE submissions SET attempts = attempts + {1 if counts else 0}, last_error = ?, "
+                               f"dead = (attempts + {1 if counts else 0} >= {MAX_ATTEMPTS}) WHERE id = ?",
+                               [(str(error), entry_id) for entry_id in entry_ids])
+        connection.commit()
+
+
+def get_last_undoable(spreadsheet_name, sheet_name, presentation_ids):
+    """ Gets the most recent submission to a sheet and slideshow that hasn't been undone yet (finished or not), so an 
+        undo never reaches back into a sheet or deck that was in use earlier.
+
+    Args:
+        spreadsheet_name (str): The spreadsheet its row went in
+        sheet_name (str): The sheet within the spreadsheet its row went in
+        presentation_ids (list): The presentations its slide may have gone in (a deck and its shards)
+
+    Returns:
+        dict: The journal entry, or None if there is nothing left to undo
+    """
+    placeholders = ", ".join("?" * len(presentation_ids))
+    with lock:
+        row = connection.execute(f"SELECT * FROM submissions WHERE undone = 0 AND spreadsheet_name = ? AND sheet_name = ? "
+                                 f"AND presentation_id IN ({placeholders}) ORDER BY id DESC LIMIT 1",
+                                 (spreadsheet_name, sheet_name, *presentation_ids)).fetchone()
+    return to_entry(row) if row else None
+
+
+def mark_undone(entry_id):
+    """ Records that a submission has been undone (so it is never flushed or undone again).
+
+    Args:
+        entry_id (int): The ID of the journal entry
+    """
+    with lock:
+        connection.execute("UPDATE submissions SET undone = 1 WHERE id = ?", (entry_id,))
+        connection.commit()
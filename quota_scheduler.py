@@ -0,0 +1,282 @@
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import tracing
+
+# Each API's quota in requests per minute (0 for no limit). Sheets and Slides allow 60 per minute per user for writes,
+# Drive is far more generous, and GitHub's secondary rate limit allows about 80 content-creating (non-GET) requests a
+# minute (once its hourly limit runs out, the X-RateLimit headers pause it instead). These can be changed with
+# QUOTA_<API>_PER_MINUTE in the .env file.
+DEFAULT_LIMITS = {"sheets": 60, "slides": 60, "drive": 1000, "github": 80}
+
+# How much of a minute's quota may go out in one burst. The rest trickles in over the minute, so no 60 second window
+# ever holds more than the quota.
+BURST_FRACTION = 0.25
+
+# The share of each burst that background work leaves untouched, so a submit never finds the bucket emptied by a sync
+BACKGROUND_RESERVE = 0.5
+
+# When we are throttled the rate is halved (but never below MIN_RATE_FRACTION of the quota); every request that gets
+# through then adds RECOVERY_FRACTION of the quota back, until we are at the full quota again
+MIN_RATE_FRACTION = 0.1
+RECOVERY_FRACTION = 0.02
+
+# How long to pause an API for when it throttles us without saying how long to wait, and the longest we ever pause it 
+# for (the same cap http_session puts on its retry delays), so one response can't hold up every write for an hour
+DEFAULT_PAUSE_SECONDS = 1
+MAX_PAUSE_SECONDS = 60
+
+# Stages that run with this priority (see tracing.stage) wait for interactive work
+BACKGROUND = "background"
+INTERACTIVE = "interactive"
+
+
+class TokenBucket:
+    """ The quota for one API: a token bucket refilled at the rate we currently think the API will take. Interactive
+        requests go first; background requests wait while any interactive request is waiting and never take the last
+        BACKGROUND_RESERVE of the bucket.
+    """
+
+    def __init__(self, api, per_minute):
+        """ Sets up a full bucket.
+
+        Args:
+            api (str): The API it is for (e.g. "sheets")
+            per_minute (int): The quota in requests per minute (0 for no limit)
+        """
+        self.api = api
+        self.condition = threading.Condition()
+        self.waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.sent = deque() # <--- when each request in the last minute was let through
+        self.throttled = 0
+        self.paused_until = 0
+        self.set_limit(per_minute)
+
+    def set_limit(self, per_minute):
+        with self.condition:
+            self.per_minute = per_minute
+            self.capacity = max(per_minute * BURST_FRACTION, 1)
+            self.max_rate = per_minute * (1 - BURST_FRACTION) / 60 # <--- tokens per second
+            self.rate = self.max_rate
+            self.tokens = self.capacity
+            self.refilled_at = time.monotonic()
+            self.condition.notify_all()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+        return self.rate
+
+    def acquire(self, priority):
+        """ Waits until a request may be sent, then takes a token for it.
+
+        Args:
+            priority (str): INTERACTIVE or BACKGROUND
+
+        Returns:
+            float: How many seconds we waited
+        """
+        start = time.monotonic()
+        with self.condition:
+            self.waiting[priority] += 1
+            try:
+                while self.per_minute:
+                    now = time.monotonic()
+                    rate = self.refill(now)
+                    needed = 1 + (self.capacity * BACKGROUND_RESERVE if priority == BACKGROUND else 0)
+                    needed = min(needed, self.capacity) # <--- (with a small quota the bucket may only ever hold one token)
+                    if now < self.paused_until: # <--- the API told us to back off
+                        self.condition.wait(self.paused_until - now)
+                    elif priority == BACKGROUND and self.waiting[INTERACTIVE]: # <--- let the submit go first
+                        self.condition.wait(1)
+                    elif self.tokens >= needed:
+                        self.tokens -= 1
+                        break
+                    else: # <--- sleep until there will be enough tokens (or something changes)
+                        self.condition.wait((needed - self.tokens) / rate if rate > 0 else 1)
+                now = time.monotonic()
+                self.sent.append(now)
+                self.forget_old(now)
+            finally:
+                self.waiting[priority] -= 1
+                self.condition.notify_all() # <--- a background request may have been waiting on us
+        return time.monotonic() - start
+
+    def forget_old(self, now):
+        while self.sent and now - self.sent[0] > 60:
+            self.sent.popleft()
+
+    def record_response(self, status, headers):
+        """ Tunes the rate from a response: halved if we were throttled, a little higher if not. If the API's own rate 
+            limit headers say nothing is left, it is paused until the limit resets (for at most MAX_PAUSE_SECONDS).
+
+        Args:
+            status (int): The response's status code
+            headers (dict): The response's headers
+        """
+        headers = headers or {}
+        remaining, reset = headers.get("X-RateLimit-Remaining"), headers.get("X-RateLimit-Reset")
+        throttled = status == 429 or (status == 403 and (remaining == "0" or "Retry-After" in headers))
+        with self.condition:
+            now = time.monotonic()
+            if remaining == "0" and reset is not None: # <--- (GitHub) the hour's requests are used up
+                seconds_left = min(max(float(reset) - time.time(), 1), MAX_PAUSE_SECONDS)
+                self.paused_until = max(self.paused_until, now + seconds_left)
+            if throttled:
+                self.throttled += 1
+                self.refill(now)
+                self.rate = max(self.rate / 2, self.max_rate * MIN_RATE_FRACTION)
+                self.tokens = 0
+                self.paused_until = max(self.paused_until, now + get_pause_seconds(headers))
+            elif status < 400:
+                self.refill(now)
+                self.rate = min(self.rate + self.max_rate * RECOVERY_FRACTION, self.max_rate)
+            self.condition.notify_all()
+
+    def get_usage(self):
+        """ Reports how much of the quota is being used.
+
+        Returns:
+            dict: The quota, the rate we are holding to, how many requests went out in the last minute, how often we were
+                  throttled, how many requests are waiting (by priority) and how much longer we are paused for
+        """
+        with self.condition:
+            now = time.monotonic()
+            self.forget_old(now)
+            return {"limit_per_minute": self.per_minute,
+                    "rate_per_minute": round(self.rate * 60 / (1 - BURST_FRACTION)) if self.per_minute else 0,
+                    "used_last_minute": len(self.sent), "throttled": self.throttled, "waiting": dict(self.waiting),
+                    "paused_seconds": round(max(self.paused_until - now, 0), 1)}
+
+
+buckets = {api: TokenBucket(api, per_minute) for api, per_minute in DEFAULT_LIMITS.items()}
+
+
+def configure(limits):
+    """ Changes the quotas.
+
+    Args:
+        limits (dict): API --> requests per minute (0 for no limit)
+    """
+    for api, per_minute in limits.items():
+        buckets[api].set_limit(per_minute)
+
+
+def reset():
+    """ Forgets everything learned about each API (usage, throttling and rate) and refills every bucket.
+    """
+    for api, bucket in list(buckets.items()):
+        buckets[api] = TokenBucket(api, bucket.per_minute)
+
+
+def get_pause_seconds(headers):
+    """ Works out how long a throttled API wants us to wait from its Retry-After header.
+
+    Args:
+        headers (dict): The throttled response's headers
+
+    Returns:
+        float: How many seconds to pause the API for (at most MAX_PAUSE_SECONDS)
+    """
+    retry_after = headers.get("Retry-After")
+    if not retry_after:
+        return DEFAULT_PAUSE_SECONDS
+    try:
+        return min(float(retry_after), MAX_PAUSE_SECONDS)
+    except ValueError: # <--- Retry-After can also be an HTTP date
+        return min(max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0), MAX_PAUSE_SECONDS)
+
+
+def get_api(url):
+    """ Works out which API a request is for from its URL.
+
+    Args:
+        url (str): The request URL
+
+    Returns:
+        str: "github", "sheets", "slides" or "drive", or None if it isn't one we schedule
+    """
+    parts = urlsplit(url)
+    if "github" in parts.netloc or parts.path.startswith("/repos/"):
+        return "github"
+    if parts.netloc.startswith("sheets.") or parts.path.startswith("/v4/spreadsheets"):
+        return "sheets"
+    if parts.netloc.startswith("slides.") or parts.path.startswith("/v1/presentations"):
+        return "slides"
+    if "/drive/" in parts.path:
+        return "drive"
+    return None
+
+
+def get_priority():
+    """ Gets the priority of the work on this thread: background if any open stage says so, otherwise interactive.
+
+    Returns:
+        str: INTERACTIVE or BACKGROUND
+    """
+    for record in tracing.get_stack():
+        if record.get("priority") == BACKGROUND:
+            return BACKGROUND
+    return INTERACTIVE
+
+
+def acquire(url, method="GET"):
+    """ Waits until the API a request is for has quota for it (if it is one we schedule).
+
+    Args:
+        url (str): The request URL
+        method (str, optional): The HTTP method. Defaults to "GET".
+
+    Returns:
+        str: The API (pass it to record_response), or None
+    """
+    api = get_api(url)
+    if api == "github" and method.upper() == "GET": # <--- reads don't count towards GitHub's secondary limit (the hourly one is followed from its headers)
+        return api
+    if api is not None:
+        waited = buckets[api].acquire(get_priority())
+        stack = tracing.get_stack()
+        if waited and stack:
+            with tracing.lock:
+                stack[-1]["quota_wait_ms"] = stack[-1].get("quota_wait_ms", 0) + round(waited * 1000, 1)
+    return api
+
+
+def record_response(api, status, headers=None):
+    """ Tunes an API's rate from one of its responses.
+
+    Args:
+        api (str): The API (from acquire), or None
+        status (int): The response's status code
+        headers (dict, optional): The response's headers. Defaults to None.
+    """
+    if api is not None:
+        buckets[api].record_response(status, headers)
+
+
+def get_usage():
+    """ Reports how much of each API's quota is being used (see TokenBucket.get_usage).
+
+    Returns:
+        dict: API --> its usage
+    """
+    return {api: bucket.get_usage() for api, bucket in buckets.items()}
+
+
+def format_usage():
+    """ Summarises quota usage in one line for the status area.
+
+    Returns:
+        str: e.g. "Quota used this minute: sheets 12/60, slides 4/60 (throttled 1x), drive 0/1000, github 7/80"
+    """
+    parts = []
+    for api, usage in get_usage().items():
+        part = f"{api} {usage['used_last_minute']}/{usage['limit_per_minute'] or '∞'}"
+        if usage['throttled']:
+            part += f" (throttled {usage['throttled']}x)"
+        if usage['paused_seconds']:
+            part += f" (paused {usage['paused_seconds']:.0f}s)"
+        parts.append(part)
+    return "Quota used this minute: " + ", ".join(parts)
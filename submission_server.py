@@ -0,0 +1,320 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import flake_tracker
+import outbox
+import quota_scheduler
+import tracing
+
+# The default address stations reach the server on (use 0.0.0.0 to accept stations from the rest of the LAN)
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# The default file the server's journal is kept in (separate from any station's own outbox)
+SERVER_OUTBOX_FILE = "server_outbox.db"
+
+# Submissions that arrive within this many milliseconds of each other are written together: one append per sheet and one
+# batch update per presentation, however many stations sent them
+DEFAULT_WINDOW_MS = 250
+
+# How long a station's request may wait for its submissions to be written before we give up on it (the submissions stay
+# journaled and are written anyway; the station just sends them again and gets the result)
+REQUEST_TIMEOUT_SECONDS = 100
+
+
+class SubmissionServer:
+    """ Takes submissions and undos from every station over HTTP and does all of the Sheets and Slides writing for them.
+        Everything is journaled in the server's outbox first, then a single writer thread works through it, so the writes
+        to each presentation happen one batch at a time and an undo can never race a submission. Stations upload their
+        own images; only the rows and slides go through the server.
+
+        POST /submit   {"station": ..., "submissions": [{"client_id", "fields", "presentation_id", "spreadsheet_name",
+                        "sheet_name", "image_1_url", "image_2_url"}, ...]}
+                       --> {"results": [{"client_id", "row_range", "slide_id", "presentation_id", "error", "waiting"}, ...]}
+                           once they are written (presentation_id is the deck the slide went in, see deck_rollover, and
+                           waiting is true if the error is only that it hasn't been written yet)
+        POST /undo     {"station": ..., "client_id": ...} --> {"undone": true/false} once it is undone
+        GET  /status   --> what the server has done so far, what is waiting and how much of each API's quota is in use
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, window_ms=DEFAULT_WINDOW_MS):
+        """ Sets up the server (call start to start it).
+
+        Args:
+            host (str, optional): The address to listen on. Defaults to DEFAULT_HOST.
+            port (int, optional): The port to listen on (0 picks a free one). Defaults to DEFAULT_PORT.
+            window_ms (float, optional): How long to wait for more submissions before writing. Defaults to DEFAULT_WINDOW_MS.
+        """
+        self.window_seconds = window_ms / 1000
+        self.work = queue.Queue() # <--- ("submit", [journal IDs], done event) and ("undo", journal ID, done event) items, in arrival order
+        self.stats_lock = threading.Lock()
+        self.started_at = time.time()
+        self.stations = set()
+        self.batches = 0
+        self.largest_batch = 0
+        self.written = {} # <--- presentation ID --> how many submissions we've written to it
+        self.undone = 0
+        self.last_error = None
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self))
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """ Starts the writer thread and the HTTP server in the background, picking up anything left in the journal.
+
+        Returns:
+            SubmissionServer: This server
+        """
+        flake_tracker.sole_slides_writer = True # <--- every station sends its slides through us, so our slide order stays right
+        leftover = [entry['id'] for entry in outbox.get_unfinished(1000000)]
+        if leftover: # <--- written (or rejected) before we stopped last time, so finish them off
+            self.work.put(("submit", leftover, threading.Event()))
+        threading.Thread(target=self.write_forever, daemon=True).start()
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def submit(self, station, submissions):
+        """ Journals submissions from a station and waits until they are written.
+
+        Args:
+            station (str): The station that sent them
+            submissions (list): The submissions (see the class docstring)
+
+        Returns:
+            list: The result of each submission, in order
+        """
+        entry_ids = []
+        for submission in submissions:
+            entry_id = outbox.add_submission(submission['fields'], submission['presentation_id'], submission['spreadsheet_name'],
+                                             submission['sheet_name'], station, submission['client_id'])
+            outbox.mark_images_uploaded(entry_id, submission['image_1_url'], submission['image_2_url'])
+            entry_ids.append(entry_id)
+        with self.stats_lock:
+            self.stations.add(station)
+        done = threading.Event()
+        self.work.put(("submit", entry_ids, done))
+        done.wait(REQUEST_TIMEOUT_SECONDS)
+        entries = {entry['id']: entry for entry in outbox.get_entries(entry_ids)}
+        results = []
+        for submission, entry_id in zip(submissions, entry_ids): # <--- (a resent submission keeps its older ID, so go by ID, not order)
+            entry = entries[entry_id]
+            waiting = not entry['done'] and not entry['last_error']
+            error = "Still waiting to be written" if waiting else (None if entry['done'] else entry['last_error'])
+            results.append({"client_id": submission['client_id'], "row_range": entry['row_range'], "slide_id": entry['slide_id'],
+                            "presentation_id": entry['presentation_id'], "error": error, "waiting": waiting})
+        return results
+
+    def undo(self, station, client_id):
+        """ Undoes a station's submission (in turn with everything else being written) and waits until it is done.
+
+        Args:
+            station (str): The station that sent it
+            client_id (int): The station's own journal ID for it
+
+        Raises:
+            Exception: If it couldn't be undone
+
+        Returns:
+            bool: True if its row or slide was deleted, False if it never got that far
+        """
+        entry = outbox.find_client_entry(station, client_id)
+        if entry is None or entry['undone']: # <--- it never reached us, or it was already undone
+            return False
+        done = threading.Event()
+        self.work.put(("undo", entry['id'], done))
+        if not done.wait(REQUEST_TIMEOUT_SECONDS):
+            raise Exception("Timed out waiting for the undo")
+        entry = outbox.get_entries([entry['id']])[0]
+        if not entry['undone']:
+            raise Exception(entry['last_error'] or "The undo failed")
+        return True
+
+    def write_forever(self):
+        """ Works through the queued submissions and undos, forever. Each time something arrives, we wait window_seconds
+            for anything else, then write it all together.
+        """
+        while True:
+            try:
+                items = [self.work.get(timeout=flake_tracker.OUTBOX_RETRY_SECONDS)]
+            except queue.Empty: # <--- nothing new, so retry anything that failed earlier
+                leftover = [entry['id'] for entry in outbox.get_unfinished(flake_tracker.OUTBOX_BATCH_SIZE)]
+                if leftover:
+                    self.write_items([("submit", leftover, threading.Event())])
+                flake_tracker.refill_spare_slides_quietly()
+                continue
+            deadline = time.time() + self.window_seconds
+            while time.time() < deadline: # <--- gather everything that arrives within the window
+                try:
+                    items.append(self.work.get(timeout=max(deadline - time.time(), 0)))
+                except queue.Empty:
+                    break
+            self.write_items(items)
+            if self.work.empty(): # <--- caught up, so get spare slides ready for the next batch
+                flake_tracker.refill_spare_slides_quietly()
+
+    def write_items(self, items):
+        """ Writes a group of queued items in arrival order: every run of submissions between undos goes out together.
+
+        Args:
+            items (list): The queued items
+        """
+        batch = []
+        for kind, value, done in items:
+            if kind == "submit":
+                batch.append((value, done))
+                continue
+            self.write_submissions(batch) # <--- anything sent before the undo is written first
+            batch = []
+            self.undo_entry(value)
+            done.set()
+        self.write_submissions(batch)
+
+    def write_submissions(self, batch):
+        """ Writes the rows and slides of a batch of submissions, OUTBOX_BATCH_SIZE at a time (so one append per sheet and
+            one batch update per presentation each time).
+
+        Args:
+            batch (list): (journal IDs, done event) tuples
+        """
+        entry_ids = sorted({entry_id for ids, _ in batch for entry_id in ids})
+        entries = [entry for entry in outbox.get_entries(entry_ids) if not entry['done'] and not entry['undone']] if entry_ids else []
+        for start in range(0, len(entries), flake_tracker.OUTBOX_BATCH_SIZE):
+            chunk = entries[start:start + flake_tracker.OUTBOX_BATCH_SIZE]
+            try:
+                with tracing.stage("server_batch", submission_count=len(chunk)):
+                    flake_tracker.push_outbox_entries(chunk)
+            except Exception as e: # <--- what failed stays in the journal with its error, for the station to see and resend
+                print(f"Batch of {len(chunk)} submission(s) failed: {e}")
+                with self.stats_lock:
+                    self.last_error = str(e)
+            with self.stats_lock:
+                self.batches += 1
+                self.largest_batch = max(self.largest_batch, len(chunk))
+                for entry in chunk:
+                    if entry['slide_id'] is not None and entry['row_appended']:
+                        self.written[entry['presentation_id']] = self.written.get(entry['presentation_id'], 0) + 1
+        for _, done in batch:
+            done.set()
+
+    def undo_entry(self, entry_id):
+        """ Undoes one submission, recording the error in the journal if it fails.
+
+        Args:
+            entry_id (int): The journal ID of the submission
+        """
+        entry = outbox.get_entries([entry_id])[0]
+        if entry['undone']:
+            return
+        try:
+            with tracing.stage("undo", flake_id=entry['flake_id']):
+                flake_tracker.undo_entry(entry)
+            with self.stats_lock:
+                self.undone += 1
+        except Exception as e:
+            flake_tracker.record_failed_attempt([entry], e)
+            with self.stats_lock:
+                self.last_error = str(e)
+
+    def get_status(self):
+        """ Reports what the server has done so far, what is waiting and how much of each quota is in use.
+
+        Returns:
+            dict: The status
+        """
+        with tracing.lock:
+            stages = {stage: {"n": len(values), "p50_ms": round(tracing.percentile(values, 0.5), 1),
+                              "p95_ms": round(tracing.percentile(values, 0.95), 1)} for stage, values in tracing.durations.items()}
+        with self.stats_lock:
+            return {"uptime_seconds": round(time.time() - self.started_at), "stations": sorted(self.stations),
+                    "queued": self.work.qsize(), "unfinished": outbox.count_unfinished(), 
+                    "set_aside": [entry['flake_id'] for entry in outbox.get_dead()], "batches": self.batches,
+                    "largest_batch": self.largest_batch, "written": dict(self.written), "undone": self.undone,
+                    "last_error": self.last_error, "stages": stages, "quota": quota_scheduler.get_usage()}
+
+
+def make_handler(server):
+    """ Makes the request handler class for a SubmissionServer.
+
+    Args:
+        server (SubmissionServer): The server the requests go to
+
+    Returns:
+        type: The handler class
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # <--- keep-alive, so stations reuse their connection
+
+        def send_json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path.split("?")[0] == "/status":
+                self.send_json(200, server.get_status())
+            else:
+                self.send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            try:
+                body = self.read_json()
+                if self.path == "/submit":
+                    self.send_json(200, {"results": server.submit(body['station'], body['submissions'])})
+                elif self.path == "/undo":
+                    self.send_json(200, {"undone": server.undo(body['station'], body['client_id'])})
+                else:
+                    self.send_json(404, {"error": "Not found"})
+            except (ValueError, KeyError, TypeError) as e: # <--- a malformed request
+                self.send_json(400, {"error": f"Bad request: {e}"})
+            except Exception as e:
+                self.send_json(500, {"error": str(e)})
+
+        def log_message(self, format, *args): # <--- don't print a line per request
+            pass
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write every station's flakes to sheets and slides, coalescing their writes.")
+    parser.add_argument("--env", default=".env", help="The .env file to use (default: .env)")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"The address to listen on (default: {DEFAULT_HOST}; use 0.0.0.0 for the LAN)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"The port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--window-ms", type=float, default=DEFAULT_WINDOW_MS, help=f"How long to gather submissions before writing (default: {DEFAULT_WINDOW_MS})")
+    parser.add_argument("--outbox", default=SERVER_OUTBOX_FILE, help=f"The server's journal file (default: {SERVER_OUTBOX_FILE})")
+    args = parser.parse_args(argv)
+
+    flake_tracker.connect_services(args.env)
+    flake_tracker.submission_server_url = "" # <--- we are the server, so write to Google ourselves
+    flake_tracker.pres_id_dict = flake_tracker.refresh_presentation_IDs(flake_tracker.PRESENTATION_IDS_SPREADSHEET,
+                                                                        flake_tracker.PRESENTATION_IDS_SHEET) # <--- for DECK_ROLLOVER
+    outbox.open_outbox(args.outbox)
+    server = SubmissionServer(args.host, args.port, args.window_ms).start()
+    print(f"Submission server listening on {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
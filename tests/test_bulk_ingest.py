@@ -0,0 +1,49 @@
+import pytest
+import bulk_ingest
+import flake_tracker
+import outbox
+
+
+class FakeWorksheet:
+    """ Stands in for a gspread Worksheet that already has a header row.
+    """
+
+    def append_rows(self, rows):
+        return {"updates": {"updatedRange": f"Sheet1!A2:I{len(rows) + 1}"}}
+
+
+def test_failed_slides_batch_leaves_a_journal_to_resume_and_undo_from(tmp_path, monkeypatch):
+    outbox.open_outbox(str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(bulk_ingest, "SLIDES_PER_BATCH", 2)
+    monkeypatch.setattr(flake_tracker, "presentation_id", "deck")
+    monkeypatch.setattr(flake_tracker, "current_spreadsheet_name", "Flakes")
+    monkeypatch.setattr(flake_tracker, "current_sheet_name", "Sheet1")
+    monkeypatch.setattr(flake_tracker, "upload_images", lambda paths: [f"https://images/{i}" for i in range(len(paths))])
+    monkeypatch.setattr(flake_tracker, "get_worksheet", lambda spreadsheet_name, sheet_name: FakeWorksheet())
+    monkeypatch.setattr(flake_tracker, "assign_decks", lambda pres_id, submissions: [pres_id] * len(submissions))
+
+    def create_deck_slides(pres_id, entries):
+        if entries[0]['flake_id'] == "S1_3_101726": # <--- the second batch update fails
+            raise Exception("Slides is down")
+        for entry in entries:
+            outbox.mark_slide_created(entry['id'], f"slide_{entry['flake_id']}", pres_id)
+    monkeypatch.setattr(flake_tracker, "create_deck_slides", create_deck_slides)
+
+    submissions = []
+    for flake_num in range(1, 5):
+        paths = []
+        for zoom in ("10x", "50x"):
+            path = tmp_path / f"S1_{flake_num}_{zoom}.jpg"
+            path.write_bytes(b"jpeg bytes")
+            paths.append(str(path))
+        submissions.append(flake_tracker.create_submission(f"S1_{flake_num}_101726", "1", "2", "10", "12", "3", *paths))
+    entries = bulk_ingest.journal_submissions(submissions)
+
+    with pytest.raises(Exception, match="Slides is down"):
+        bulk_ingest.push_entries(entries)
+    unfinished = outbox.get_unfinished(10)
+    assert [entry['flake_id'] for entry in unfinished] == ["S1_3_101726", "S1_4_101726"]
+    assert [entry['row_range'] for entry in unfinished] == ["Sheet1!A4:I4", "Sheet1!A5:I5"] # <--- rows are in, and known
+    assert unfinished[0]['image_1_url'] is not None # <--- a resume only has the slides left to do
+    last = outbox.get_last_undoable("Flakes", "Sheet1", ["deck"]) # <--- or the rows can be taken back out with Undo
+    assert (last['flake_id'], last['row_range']) == ("S1_4_101726", "Sheet1!A5:I5")
@@ -0,0 +1,27 @@
+import pytest
+import cleanup
+import github_git
+
+
+def test_delete_files_reports_what_the_commit_actually_deleted(monkeypatch, capsys):
+    monkeypatch.setattr(github_git, "list_tree", lambda repo, tree_ish, headers: ([{"path": "a.jpg"}, {"path": "c.jpg"}], False))
+    monkeypatch.setattr(github_git, "commit_files", lambda repo, branch, message, entries, headers: entries("head"))
+
+    assert cleanup.delete_files(["Images/a.jpg", "Images/b.jpg", "Images/c.jpg"]) == 2 # <--- b.jpg was already gone
+    assert "Deleted 2 images (1 were already gone)" in capsys.readouterr().out
+
+
+def test_failed_cleanup_fails_the_action(monkeypatch):
+    monkeypatch.setattr(cleanup, "list_files", lambda: [{"name": "S1_2_10x_20200101000000.jpg", "path": "Images/S1_2_10x_20200101000000.jpg", "sha": "1"}])
+
+    def fail(*args):
+        raise Exception("GitHub commit failed: main kept moving after 5 attempts")
+    monkeypatch.setattr(github_git, "commit_files", fail)
+    with pytest.raises(Exception, match="kept moving"):
+        cleanup.main()
+
+    monkeypatch.setattr(cleanup, "BULK_DELETE", False)
+    monkeypatch.setattr(cleanup, "delete_file", lambda path, sha: False)
+    with pytest.raises(SystemExit) as exit_info:
+        cleanup.main()
+    assert exit_info.value.code == 1
@@ -0,0 +1,125 @@
+import json
+import os
+import re
+import types
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+import drive_storage
+import http_session
+
+SESSION_URI = "https://www.googleapis.com/upload/drive/v3/files?uploadType=resumable&upload_id=abc"
+
+
+def make_response(status, body=b"", headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers or {})
+    response._content = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    response.request = types.SimpleNamespace(body=None)
+    return response
+
+
+class FakeDrive:
+    """ Stands in for the authorized session drive_storage talks to Drive through: one resumable upload session (which
+        can drop the connection part way through a chunk, keeping what it got), the batch endpoint and the file list.
+    """
+
+    def __init__(self, total_size, received=b"", drops=0, batch_statuses=None, files=None):
+        self.total_size = total_size
+        self.received = bytearray(received)
+        self.drops = drops # <--- how many chunks to cut off half way
+        self.batch_statuses = batch_statuses or {} # <--- request path --> the status the batch answers it with
+        self.files = files or []
+        self.chunk_offsets = []
+        self.started = 0
+        self.batches = []
+
+    def request(self, method, url, data=None, headers=None, **kwargs):
+        if method == "PUT":
+            return self.put(url, data=data, headers=headers)
+        if "/batch/" in url:
+            return self.batch(data.decode("utf-8"), headers["Content-Type"])
+        if url.endswith("/upload/drive/v3/files"):
+            self.started += 1
+            return make_response(200, headers={"Location": SESSION_URI})
+        return make_response(200, {"files": self.files}) # <--- the expired image listing
+
+    def put(self, url, data=None, headers=None, allow_redirects=True):
+        start, end = re.match(r"bytes (\*|(\d+)-(\d+))/", headers["Content-Range"]).group(2, 3)
+        if start is not None:
+            assert int(start) == len(self.received) # <--- never skip or resend bytes Drive already has
+            self.chunk_offsets.append(int(start))
+            if self.drops:
+                self.drops -= 1
+                self.received += data[:len(data) // 2]
+                raise requests.ConnectionError("Connection reset by peer")
+            self.received += data
+        if len(self.received) == self.total_size:
+            return make_response(200, {"id": "file1"})
+        return make_response(308, headers={"Range": f"bytes=0-{len(self.received) - 1}"} if self.received else {})
+
+    def batch(self, body, content_type):
+        boundary = re.search(r"boundary=(\S+)", content_type).group(1)
+        parts = re.findall(r"Content-ID: <item(\d+)>\r\n\r\n(\w+) (\S+) HTTP/1\.1", body)
+        self.batches.append([path for _, _, path in parts])
+        lines = []
+        for number, _, path in reversed(parts): # <--- Drive doesn't promise to answer in order
+            status = self.batch_statuses.get(path, 204)
+            lines += [f"--response_{boundary}", "Content-Type: application/http", f"Content-ID: <response-item{number}>", "",
+                      f"HTTP/1.1 {status} Whatever", "Content-Type: application/json; charset=UTF-8", "", "{}"]
+        lines.append(f"--response_{boundary}--")
+        return make_response(200, "\r\n".join(lines).encode("utf-8"),
+                             headers={"Content-Type": f"multipart/mixed; boundary=response_{boundary}"})
+
+
+@pytest.fixture
+def image(tmp_path, monkeypatch):
+    monkeypatch.setattr(drive_storage, "CHUNK_SIZE", 256 * 1024)
+    monkeypatch.setattr(http_session, "get_retry_delay", lambda response, attempt: 0)
+    path = tmp_path / "S1_2_10x.jpg"
+    path.write_bytes(os.urandom(drive_storage.CHUNK_SIZE * 3 + 1000))
+    return str(path)
+
+
+def test_send_chunks_resumes_from_what_drive_received_after_a_dropped_connection(image):
+    content = open(image, "rb").read()
+    drive = FakeDrive(len(content), drops=2)
+
+    assert drive_storage.send_chunks(drive, SESSION_URI, image, 0, len(content)) == {"id": "file1"}
+    assert bytes(drive.received) == content
+    assert drive.chunk_offsets[:3] == [0, drive_storage.CHUNK_SIZE // 2, drive_storage.CHUNK_SIZE] # <--- each retry starts where Drive got to
+
+
+def test_upload_file_resumes_an_earlier_session(image):
+    content = open(image, "rb").read()
+    drive = FakeDrive(len(content), received=content[:drive_storage.CHUNK_SIZE * 2])
+
+    assert drive_storage.upload_file(drive, image, "S1_2_10x.jpg", "folder", session_uri=SESSION_URI) == "file1"
+    assert drive.started == 0 # <--- no new session
+    assert drive.chunk_offsets == [drive_storage.CHUNK_SIZE * 2, drive_storage.CHUNK_SIZE * 3]
+    assert bytes(drive.received) == content
+
+
+def test_send_batch_matches_out_of_order_responses_to_requests(monkeypatch):
+    monkeypatch.setattr(drive_storage, "BATCH_LIMIT", 2)
+    drive = FakeDrive(0, batch_statuses={"/drive/v3/files/b": 404, "/drive/v3/files/c": 500})
+
+    statuses = drive_storage.send_batch(drive, [("DELETE", f"/drive/v3/files/{file_id}", None) for file_id in "abc"])
+    assert statuses == [204, 404, 500]
+    assert drive.batches == [["/drive/v3/files/a", "/drive/v3/files/b"], ["/drive/v3/files/c"]]
+
+
+def test_share_files_names_the_files_that_failed():
+    drive = FakeDrive(0, batch_statuses={"/drive/v3/files/b/permissions?supportsAllDrives=true": 403})
+
+    with pytest.raises(Exception, match="failed for 1 image"):
+        drive_storage.share_files(drive, ["a", "b"])
+
+
+def test_expire_images_counts_already_deleted_files_but_not_failures():
+    drive = FakeDrive(0, batch_statuses={"/drive/v3/files/b?supportsAllDrives=true": 404,
+                                         "/drive/v3/files/c?supportsAllDrives=true": 500},
+                      files=[{"id": file_id, "name": f"{file_id}.jpg", "createdTime": "2026-10-16T00:00:00Z"} for file_id in "abc"])
+
+    assert drive_storage.expire_images(drive, "folder", 12) == 2
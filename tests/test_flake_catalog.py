@@ -0,0 +1,61 @@
+import re
+from datetime import datetime, timedelta
+import flake_catalog
+
+HEADER = ["Flake ID", "Date", "Chip", "Flake", "H Max", "V Max", "Down", "Left", "Layers"]
+
+
+class FakeWorksheet:
+    """ Stands in for a gspread Worksheet, counting how many times it is read.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.reads = []
+
+    def get(self, range_name):
+        self.reads.append(range_name)
+        first_row = int(re.match(r"A(\d+)", range_name).group(1))
+        return self.rows[first_row - 1:]
+
+
+def flake(flake_num, horizontal_max="10"):
+    return [f"S1_{flake_num}_101726", "10/17/2026", "1", str(flake_num), horizontal_max, "8", "3", "4", "2"]
+
+
+def test_unchanged_sheet_is_not_read_and_new_rows_are_read_from_the_end(tmp_path):
+    flake_catalog.open_catalog(str(tmp_path / "catalog.db"))
+    worksheet = FakeWorksheet([HEADER, flake(1), flake(2)])
+    assert flake_catalog.sync_catalog(worksheet, "Flakes/Sheet1", "2026-10-17T10:00:00.000Z") == 3
+
+    assert flake_catalog.sync_catalog(worksheet, "Flakes/Sheet1", "2026-10-17T10:00:00.000Z") == 0
+    assert len(worksheet.reads) == 1
+
+    worksheet.rows.append(flake(3))
+    assert flake_catalog.sync_catalog(worksheet, "Flakes/Sheet1", "2026-10-17T11:00:00.000Z") == 1
+    assert worksheet.reads[-1] == "A3:I"
+    assert len(flake_catalog.find_flakes(source="Flakes/Sheet1")) == 3
+
+
+def test_edited_last_row_triggers_a_full_read(tmp_path):
+    flake_catalog.open_catalog(str(tmp_path / "catalog.db"))
+    worksheet = FakeWorksheet([HEADER, flake(1), flake(2)])
+    flake_catalog.sync_catalog(worksheet, "Flakes/Sheet1", "1")
+
+    worksheet.rows[2] = flake(2, horizontal_max="55") # <--- same flake ID, different size
+    assert flake_catalog.sync_catalog(worksheet, "Flakes/Sheet1", "2") == 3
+    assert worksheet.reads[-1] == "A1:I"
+    assert flake_catalog.find_flakes(min_horizontal_max=50, source="Flakes/Sheet1")[0]["flake_id"] == "S1_2_101726"
+
+
+def test_whole_sheet_is_read_again_every_full_sync_hours(tmp_path):
+    flake_catalog.open_catalog(str(tmp_path / "catalog.db"))
+    worksheet = FakeWorksheet([HEADER, flake(1), flake(2)])
+    flake_catalog.sync_catalog(worksheet, "Flakes/Sheet1", "1")
+    long_ago = (datetime.utcnow() - timedelta(hours=flake_catalog.FULL_SYNC_HOURS + 1)).isoformat()
+    with flake_catalog.lock, flake_catalog.connection:
+        flake_catalog.connection.execute("UPDATE sync_state SET full_synced_at = ?", (long_ago,))
+
+    worksheet.rows[1] = flake(1, horizontal_max="60") # <--- an edit further up, which the last row can't show
+    assert flake_catalog.sync_catalog(worksheet, "Flakes/Sheet1", "1") == 3
+    assert flake_catalog.find_flakes(min_horizontal_max=50, source="Flakes/Sheet1")[0]["flake_id"] == "S1_1_101726"
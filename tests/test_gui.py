@@ -0,0 +1,71 @@
+import flake_tracker
+
+
+class FakeWidget:
+    """ Stands in for the Tk widgets and window shutdown_options_screen touches, recording what it does to them.
+    """
+
+    def __init__(self, value=""):
+        self.value = value
+        self.options = {'values': ()}
+        self.scheduled = []
+        self.destroyed = False
+
+    def get(self):
+        return self.value
+
+    def __getitem__(self, key):
+        return self.options[key]
+
+    def __setitem__(self, key, value):
+        self.options[key] = value
+
+    def config(self, **options):
+        self.options.update(options)
+
+    def after(self, ms, function):
+        self.scheduled.append(function)
+
+    def destroy(self):
+        self.destroyed = True
+
+
+def test_next_waits_for_the_presentation_check_without_blocking(monkeypatch):
+    window, button, label = FakeWidget(), FakeWidget(), FakeWidget()
+    for name, widget in [("options_root", window), ("options_next_button", button), ("options_status_label", label),
+                         ("presentation_id_select", FakeWidget("New Deck")), ("spreadsheet_select", FakeWidget("Flakes")),
+                         ("sheet_select", FakeWidget("Sheet1"))]:
+        monkeypatch.setattr(flake_tracker, name, widget, raising=False)
+    monkeypatch.setattr(flake_tracker, "save_option", lambda value, f_name: None)
+    monkeypatch.setattr(flake_tracker, "pres_id_dict", {})
+    monkeypatch.setattr(flake_tracker, "presentation_ids_refreshed", flake_tracker.threading.Event())
+    loaded = []
+    monkeypatch.setattr(flake_tracker, "load_settings_from_inputs", lambda *settings: loaded.append(settings))
+
+    flake_tracker.shutdown_options_screen() # <--- returns straight away instead of waiting on the check
+    assert button.options['state'] == "disabled" and window.scheduled == [flake_tracker.shutdown_options_screen]
+
+    flake_tracker.pres_id_dict["New Deck"] = "deck-id" # <--- the check found it
+    flake_tracker.presentation_ids_refreshed.set()
+    window.scheduled.pop()()
+    assert button.options['state'] == "normal"
+    assert loaded == [("deck-id", "Flakes", "Sheet1")] and window.destroyed
+
+
+def test_job_updates_show_the_status_without_reading_the_outbox(monkeypatch):
+    window, outbox_label, quota_label = FakeWidget(), FakeWidget(), FakeWidget()
+    monkeypatch.setattr(flake_tracker, "root", window, raising=False)
+    monkeypatch.setattr(flake_tracker, "outbox_status_label", outbox_label, raising=False)
+    monkeypatch.setattr(flake_tracker, "quota_status_label", quota_label, raising=False)
+    monkeypatch.setattr(flake_tracker, "job_updates", flake_tracker.queue.Queue())
+
+    def blocked():
+        raise AssertionError("the GUI thread read the outbox")
+    monkeypatch.setattr(flake_tracker.outbox, "count_unfinished", blocked)
+    monkeypatch.setattr(flake_tracker.outbox, "get_dead", blocked)
+
+    flake_tracker.job_updates.put((None, 'status', {'waiting': 0, 'dead': [{'flake_id': "S1_2_101726"}], 'quota': "sheets 1/60"}))
+    flake_tracker.poll_job_updates()
+    assert "S1_2_101726" in outbox_label.options['text'] and outbox_label.options['fg'] == "red"
+    assert quota_label.options['text'] == "sheets 1/60"
+    assert window.scheduled == [flake_tracker.poll_job_updates]
@@ -0,0 +1,77 @@
+from datetime import datetime
+import pytest
+import flake_tracker
+import github_git
+import main
+import quota_scheduler
+
+
+def test_split_appended_range():
+    assert flake_tracker.split_appended_range("Sheet1!A5:I6", 2) == ["Sheet1!A5:I5", "Sheet1!A6:I6"]
+    assert flake_tracker.split_appended_range("'Flakes 2026'!A12:I12", 1) == ["'Flakes 2026'!A12:I12"]
+    assert flake_tracker.split_appended_range("Sheet1!A7", 1) == ["Sheet1!A7:A7"] # <--- a single cell
+
+
+def test_apply_slide_changes_follows_duplicates_moves_and_deletes():
+    slide_ids = ["template", "a", "b"]
+    requests = [{"duplicateObject": {"objectId": "template", "objectIds": {"template": "new"}}},
+                {"updateSlidesPosition": {"slideObjectIds": ["new"], "insertionIndex": 4}},
+                {"deleteObject": {"objectId": "a"}},
+                {"deleteObject": {"objectId": "image_1"}}, # <--- not a slide, so nothing changes
+                {"replaceAllText": {"containsText": {"text": "{{FlakeID}}"}, "replaceText": "S1_2_101726"}}]
+    replies = [{"duplicateObject": {"objectId": "new"}}, {}, {}, {}, {}]
+
+    flake_tracker.apply_slide_changes(slide_ids, requests, replies)
+    assert slide_ids == ["template", "b", "new"]
+
+
+def test_apply_slide_changes_moves_a_slide_to_the_front():
+    slide_ids = ["template", "a", "b", "c"]
+    flake_tracker.apply_slide_changes(slide_ids, [{"updateSlidesPosition": {"slideObjectIds": ["c"], "insertionIndex": 1}}], [{}])
+    assert slide_ids == ["template", "c", "a", "b"]
+
+
+def test_is_installed():
+    pytest_version = pytest.__version__
+    assert main.is_installed("pytest")
+    assert main.is_installed(f"pytest=={pytest_version}")
+    assert not main.is_installed("pytest==0.0.1")
+    assert not main.is_installed("surely-not-an-installed-package")
+    assert not main.is_installed("pytest>=1.0") # <--- anything but name==version is left to pip
+
+
+def test_parse_upload_timestamp():
+    assert github_git.parse_upload_timestamp("uploads/S1_2_10x_20250528153000.jpg") == datetime(2025, 5, 28, 15, 30)
+    assert github_git.parse_upload_timestamp("S1_2_10x-2_20250528153000.png") == datetime(2025, 5, 28, 15, 30)
+    assert github_git.parse_upload_timestamp("S1_2_10x.jpg") is None
+    assert github_git.parse_upload_timestamp("README.md") is None
+
+
+def test_parse_deck_rollover():
+    assert flake_tracker.parse_deck_rollover("") == (None, None)
+    assert flake_tracker.parse_deck_rollover("slides:300") == ("slides", 300)
+    assert flake_tracker.parse_deck_rollover("month") == ("month", None)
+    assert flake_tracker.parse_deck_rollover("chip") == ("chip", None)
+    for policy in ("slides", "slides:0", "slides:-5", "slides:many", "month:3", "weekly"):
+        with pytest.raises(ValueError):
+            flake_tracker.parse_deck_rollover(policy)
+
+
+def test_get_api():
+    assert quota_scheduler.get_api("https://api.github.com/repos/lab/flakes/git/blobs") == "github"
+    assert quota_scheduler.get_api("https://sheets.googleapis.com/v4/spreadsheets/abc/values/Sheet1!A1:I") == "sheets"
+    assert quota_scheduler.get_api("https://slides.googleapis.com/v1/presentations/abc:batchUpdate") == "slides"
+    assert quota_scheduler.get_api("https://www.googleapis.com/upload/drive/v3/files?uploadType=resumable") == "drive"
+    assert quota_scheduler.get_api("https://www.googleapis.com/drive/v3/files/abc") == "drive"
+    assert quota_scheduler.get_api("http://127.0.0.1:8765/v4/spreadsheets/abc") == "sheets" # <--- the benchmark fakes are told apart by path
+    assert quota_scheduler.get_api("http://127.0.0.1:8765/submit") is None
+
+
+def test_check_image_files(tmp_path):
+    image_1 = tmp_path / "S1_2_10x.jpg"
+    image_1.write_bytes(b"jpeg bytes")
+    with pytest.raises(ValueError, match="open both images"):
+        flake_tracker.check_image_files(str(image_1), "")
+    with pytest.raises(ValueError, match="S1_2_50x.jpg"):
+        flake_tracker.check_image_files(str(image_1), str(tmp_path / "S1_2_50x.jpg"))
+    flake_tracker.check_image_files(str(image_1), str(image_1))
@@ -0,0 +1,31 @@
+import os
+import threading
+import pytest
+import image_processing
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def test_same_capture_processed_on_several_threads_at_once(tmp_path):
+    image_path = str(tmp_path / "S1_2_10x.png")
+    Image.new("RGB", (800, 600), (30, 120, 200)).save(image_path)
+    cache_dir = str(tmp_path / "cache")
+    results, errors = [], []
+
+    def process():
+        try:
+            results.append(image_processing.process_image(image_path, 400, 80, cache_dir))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=process) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(set(results)) == 1
+    with Image.open(results[0]) as processed:
+        assert processed.size == (400, 300)
+    assert not [name for _, _, names in os.walk(cache_dir) for name in names if name.endswith(".tmp")] # <--- no temp files left behind
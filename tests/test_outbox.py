@@ -0,0 +1,32 @@
+import outbox
+
+
+def add(flake_id):
+    return outbox.add_submission({"flake_id": flake_id}, "deck", "Flakes", "Sheet1")
+
+
+def test_failing_submission_is_set_aside_and_stops_blocking_the_rest(tmp_path):
+    outbox.open_outbox(str(tmp_path / "outbox.db"))
+    failing, fine = add("S1_1_101726"), add("S1_2_101726")
+    for _ in range(outbox.MAX_ATTEMPTS - 1):
+        outbox.mark_failed_attempt([failing], Exception("Image files not found"))
+        assert [entry['id'] for entry in outbox.get_unfinished(1)] == [fine] # <--- the one that never failed goes first
+    outbox.mark_failed_attempt([failing], Exception("Image files not found"))
+
+    assert [entry['id'] for entry in outbox.get_unfinished(20)] == [fine]
+    assert [entry['id'] for entry in outbox.get_dead()] == [failing]
+    assert outbox.count_unfinished() == 1
+
+    assert outbox.revive_dead() == 1
+    assert [entry['id'] for entry in outbox.get_unfinished(20)] == [failing, fine]
+
+
+def test_outages_dont_count_towards_max_attempts(tmp_path):
+    outbox.open_outbox(str(tmp_path / "outbox.db"))
+    entry_id = add("S1_1_101726")
+    for _ in range(outbox.MAX_ATTEMPTS * 2):
+        outbox.mark_failed_attempt([entry_id], ConnectionError("Network is unreachable"), counts=False)
+
+    entry = outbox.get_entries([entry_id])[0]
+    assert (entry['attempts'], entry['dead']) == (0, 0)
+    assert entry['last_error'] == "Network is unreachable"
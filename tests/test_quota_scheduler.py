@@ -0,0 +1,67 @@
+import threading
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+import flake_tracker
+import http_session
+import quota_scheduler
+
+
+def test_background_work_gets_through_a_small_quota():
+    bucket = quota_scheduler.TokenBucket("slides", 6) # <--- a bucket of 1.5 tokens, less than background work used to need
+    acquired = threading.Event()
+    threading.Thread(target=lambda: (bucket.acquire(quota_scheduler.BACKGROUND), acquired.set()), daemon=True).start()
+    assert acquired.wait(5)
+
+
+class FlakyRequest:
+    """ Stands in for a googleapiclient HttpRequest that fails a few times before it goes through.
+    """
+    uri = "https://slides.googleapis.com/v1/presentations/deck"
+    method = "GET"
+    body = None
+
+    def __init__(self, failures, status=429):
+        self.failures = failures
+        self.status = status
+        self.num_retries = []
+
+    def execute(self, num_retries=0):
+        self.num_retries.append(num_retries)
+        if self.failures:
+            self.failures -= 1
+            raise HttpError(httplib2.Response({"status": self.status}), b"Request failed")
+        return {"slides": []}
+
+
+def test_execute_request_retries_through_the_quota(monkeypatch):
+    acquired = []
+    monkeypatch.setattr(quota_scheduler, "acquire", lambda url, method="GET": acquired.append(url) or "slides")
+    monkeypatch.setattr(quota_scheduler, "record_response", lambda api, status, headers=None: None)
+    monkeypatch.setattr(http_session, "get_retry_delay", lambda response, attempt: 0)
+    request = FlakyRequest(failures=2)
+
+    assert flake_tracker.execute_request(request) == {"slides": []}
+    assert request.num_retries == [0, 0, 0] # <--- googleapiclient never retries behind the bucket's back
+    assert len(acquired) == 3 # <--- every try waited for quota
+
+
+def test_execute_request_gives_up_on_errors_that_wont_go_away(monkeypatch):
+    monkeypatch.setattr(quota_scheduler, "acquire", lambda url, method="GET": "slides")
+    monkeypatch.setattr(quota_scheduler, "record_response", lambda api, status, headers=None: None)
+    request = FlakyRequest(failures=1, status=400)
+
+    with pytest.raises(HttpError):
+        flake_tracker.execute_request(request)
+    assert request.num_retries == [0]
+
+
+def test_rate_limit_headers_only_pause_when_nothing_is_left_and_never_for_long():
+    bucket = quota_scheduler.TokenBucket("github", 80)
+    reset = str(int(quota_scheduler.time.time()) + 3000) # <--- the hourly window resets in 50 minutes
+    bucket.record_response(200, {"X-RateLimit-Remaining": "3", "X-RateLimit-Reset": reset})
+    assert bucket.get_usage()["paused_seconds"] == 0
+    assert bucket.acquire(quota_scheduler.INTERACTIVE) < 1 # <--- a low count doesn't slow writes to a crawl
+
+    bucket.record_response(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset})
+    assert 0 < bucket.get_usage()["paused_seconds"] <= quota_scheduler.MAX_PAUSE_SECONDS
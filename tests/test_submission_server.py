@@ -0,0 +1,38 @@
+import threading
+import outbox
+import submission_server
+
+
+def submission(client_id):
+    return {"client_id": client_id, "fields": {"flake_id": f"S1_{client_id}_101726"}, "presentation_id": "deck",
+            "spreadsheet_name": "Flakes", "sheet_name": "Sheet1", "image_1_url": "https://example.com/1.jpg",
+            "image_2_url": "https://example.com/2.jpg"}
+
+
+def write_submissions(batch):
+    """ Stands in for SubmissionServer.write_submissions: "writes" each entry with a row and slide named after its
+        station's client ID, so a result that comes back for the wrong submission is easy to spot.
+    """
+    for entry_ids, done in batch:
+        for entry in outbox.get_entries(entry_ids):
+            if not entry['done']:
+                outbox.update_entry(entry['id'], row_appended=1, row_range=f"Sheet1!A{entry['client_id']}:I{entry['client_id']}",
+                                    slide_id=f"slide_{entry['client_id']}")
+        done.set()
+
+
+def test_resend_mixed_with_new_submission_gets_its_own_results(tmp_path):
+    outbox.open_outbox(str(tmp_path / "server_outbox.db"))
+    server = submission_server.SubmissionServer(port=0, window_ms=0)
+    server.write_submissions = write_submissions
+    threading.Thread(target=server.write_forever, daemon=True).start()
+    try:
+        server.submit("station-1", [submission(6)]) # <--- client 6 reaches the server first (and gets the lower ID)
+        results = server.submit("station-1", [submission(5), submission(6)]) # <--- then is sent again alongside client 5
+    finally:
+        server.httpd.server_close()
+
+    assert [result['client_id'] for result in results] == [5, 6]
+    assert [result['slide_id'] for result in results] == ["slide_5", "slide_6"]
+    assert [result['row_range'] for result in results] == ["Sheet1!A5:I5", "Sheet1!A6:I6"]
+    assert all(result['error'] is None for result in results)
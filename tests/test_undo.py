@@ -0,0 +1,61 @@
+import re
+import pytest
+import flake_tracker
+import outbox
+
+
+class FakeWorksheet:
+    """ Stands in for a gspread Worksheet holding a list of rows (row 1 first), as the Sheets API would format them.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def row_values(self, row_number):
+        return self.rows[row_number - 1] if row_number <= len(self.rows) else []
+
+    def get(self, range_name):
+        first_row, last_row = (int(number) for number in re.findall(r"\d+", range_name)) # <--- "A1:I60" --> 1, 60
+        return self.rows[first_row - 1:last_row]
+
+    def delete_rows(self, row_number):
+        del self.rows[row_number - 1]
+
+
+def row(flake_id, flake_num=1):
+    return [flake_id, "10/17/2026", "1", str(flake_num), "12.5", "8", "3", "4", "2"]
+
+
+OURS = flake_tracker.create_sheet_row("S1_2_101726", "10/17/2026", 1, 2, "12.5", "8", "3", "4", "2")
+
+
+def test_moved_row_is_found_nearby_and_checked_in_full():
+    worksheet = FakeWorksheet([row("S1_1_101726"), row("S1_2_101726", flake_num=2), row("S1_3_101726")])
+
+    assert flake_tracker.delete_appended_row(worksheet, "Sheet1!A3:I3", OURS) == 2 # <--- a row above it was deleted
+    assert [values[0] for values in worksheet.rows] == ["S1_1_101726", "S1_3_101726"]
+
+
+def test_rows_with_the_same_flake_id_but_other_values_are_left_alone():
+    worksheet = FakeWorksheet([row("S1_2_101726", flake_num=7)])
+
+    assert flake_tracker.delete_appended_row(worksheet, "Sheet1!A2:I2", OURS) is None
+    assert len(worksheet.rows) == 1
+
+
+def test_refuses_to_guess_between_matching_rows():
+    worksheet = FakeWorksheet([row("S1_2_101726", flake_num=2), row("S1_1_101726"), row("S1_2_101726", flake_num=2)])
+
+    with pytest.raises(Exception, match="none of them were deleted"):
+        flake_tracker.delete_appended_row(worksheet, "Sheet1!A9:I9", OURS)
+    assert len(worksheet.rows) == 3
+
+
+def test_undo_stays_within_the_current_sheet_and_deck(tmp_path):
+    outbox.open_outbox(str(tmp_path / "outbox.db"))
+    ours = outbox.add_submission({"flake_id": "S1_1_101726"}, "deck", "Flakes", "Sheet1")
+    outbox.add_submission({"flake_id": "S1_2_101726"}, "other deck", "Flakes", "Sheet1")
+    outbox.add_submission({"flake_id": "S1_3_101726"}, "deck", "Flakes", "Sheet2")
+
+    assert outbox.get_last_undoable("Flakes", "Sheet1", ["deck", "deck shard"])['id'] == ours
+    assert outbox.get_last_undoable("Flakes", "Sheet3", ["deck"]) is None
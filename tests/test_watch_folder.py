@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import pytest
+import flake_tracker
+import watch_folder
+
+
+@pytest.fixture(autouse=True)
+def no_settling_time(monkeypatch):
+    monkeypatch.setattr(watch_folder, "STABLE_SECONDS", 0)
+
+
+def capture(folder, name, content=b"jpeg bytes"):
+    folder.mkdir(exist_ok=True)
+    path = folder / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_poll_finds_new_captures_once_they_stop_changing_and_pairs_them(tmp_path):
+    watcher = watch_folder.FolderWatcher(str(tmp_path), flake_tracker.get_flake_id_from_filepath)
+    image_1 = capture(tmp_path / "101726", "S1_2_10x.jpg")
+
+    assert watcher.poll() == ([], []) # <--- first sighting: it may still be being written
+    finished, pairs = watcher.poll()
+    assert finished == [image_1] and pairs == []
+
+    image_2 = capture(tmp_path / "101726", "S1_2_50x.jpg")
+    watcher.poll()
+    finished, pairs = watcher.poll()
+    assert finished == [image_2]
+    assert pairs == [("S1_2_101726", image_1, image_2)]
+    assert watcher.poll() == ([], []) # <--- each capture is only reported once
+
+
+def test_poll_waits_while_a_capture_is_still_growing(tmp_path):
+    watcher = watch_folder.FolderWatcher(str(tmp_path), flake_tracker.get_flake_id_from_filepath)
+    path = capture(tmp_path / "101726", "S1_3_10x.jpg", b"half")
+    watcher.poll()
+    with open(path, "ab") as f:
+        f.write(b" an image")
+
+    assert watcher.poll() == ([], []) # <--- its size changed since the last poll
+    assert watcher.poll()[0] == [path]
+
+
+def test_existing_images_are_only_reported_if_asked_for(tmp_path):
+    existing = capture(tmp_path / "101626", "S2_1_10x.jpg")
+
+    assert watch_folder.FolderWatcher(str(tmp_path), flake_tracker.get_flake_id_from_filepath).poll() == ([], [])
+    watcher = watch_folder.FolderWatcher(str(tmp_path), flake_tracker.get_flake_id_from_filepath, include_existing=True)
+    watcher.poll()
+    assert watcher.poll()[0] == [existing]
+
+
+def test_image_saved_before_watching_pairs_with_one_saved_after(tmp_path):
+    image_1 = capture(tmp_path / "101726", "S1_4_10x.jpg")
+    capture(tmp_path / "101726", "S1_5_10x.jpg")
+    capture(tmp_path / "101726", "S1_5_50x.jpg") # <--- already a complete pair, so nothing to wait for
+    watcher = watch_folder.FolderWatcher(str(tmp_path), flake_tracker.get_flake_id_from_filepath)
+
+    image_2 = capture(tmp_path / "101726", "S1_4_50x.jpg")
+    watcher.poll()
+    finished, pairs = watcher.poll()
+    assert finished == [image_2] # <--- the old image isn't reported (or uploaded) as a new capture
+    assert pairs == [("S1_4_101726", image_1, image_2)]
+    assert watcher.pairs == {}
+
+
+def test_watch_folder_does_not_import_flake_tracker():
+    # flake_tracker imports this module, so importing it back would load a second, unconnected copy when flake_tracker.py 
+    # is the script being run
+    check = "import sys, watch_folder; sys.exit('flake_tracker' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", check], cwd=os.path.dirname(os.path.abspath(watch_folder.__file__))).returncode == 0
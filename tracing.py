@@ -0,0 +1,160 @@
+import atexit
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+# Where trace records go: one JSON object per line, rotated so the log never grows past a few megabytes
+TRACE_FILE = "flake_tracker_trace.log"
+TRACE_FILE_MAX_BYTES = 5 * 1024 * 1024
+TRACE_FILE_BACKUPS = 3
+
+logger = logging.getLogger("flake_tracker.trace")
+logger.setLevel(logging.INFO)
+logger.propagate = False # <--- trace records only go to the trace file, never the console
+
+# The stages open on each thread (innermost last), so requests can be counted against the stage that made them
+open_stages = threading.local()
+
+# Every stage duration (in milliseconds) this session, by stage name, for the session summary
+durations = {}
+lock = threading.Lock()
+
+
+def configure(path=TRACE_FILE):
+    """ Starts writing trace records to a rotating log file and prints a timing summary when the program exits.
+
+    Args:
+        path (str, optional): The file to write trace records to. Defaults to TRACE_FILE.
+    """
+    if not logger.handlers: # <--- only set up once
+        handler = RotatingFileHandler(path, maxBytes=TRACE_FILE_MAX_BYTES, backupCount=TRACE_FILE_BACKUPS)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        atexit.register(print_summary)
+
+
+def get_stack():
+    """ Gets the list of stages open on this thread.
+
+    Returns:
+        list: The open stage records, innermost last
+    """
+    if not hasattr(open_stages, "stack"):
+        open_stages.stack = []
+    return open_stages.stack
+
+
+@contextmanager
+def stage(name, **attributes):
+    """ Times a stage of work. Requests, bytes sent and retries recorded while it is open (see record_request) are
+        counted against it, and when it ends a JSON trace record is written.
+
+    Args:
+        name (str): The name of the stage (e.g. "upload_images")
+        **attributes: Anything else worth recording about it (e.g. image_count=2)
+
+    Yields:
+        dict: The trace record, so the stage can add attributes as it goes
+    """
+    record = {"stage": name, "started_at": datetime.utcnow().isoformat(), "requests": 0, "bytes_sent": 0, "retries": 0}
+    record.update(attributes)
+    stack = get_stack()
+    parent = stack[-1] if stack else None
+    if parent:
+        record["parent"] = parent["stage"]
+    stack.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+        record["status"] = "ok"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        stack.pop()
+        if parent: # <--- a stage's requests also count towards the stage it is part of
+            with lock:
+                for counter in ("requests", "bytes_sent", "retries"):
+                    parent[counter] += record[counter]
+        with lock:
+            durations.setdefault(name, []).append(record["duration_ms"])
+        logger.info(json.dumps(record, default=str))
+
+
+def record_request(bytes_sent=0, retries=0):
+    """ Counts a network request against the innermost open stage on this thread (if any).
+
+    Args:
+        bytes_sent (int, optional): How many bytes the request body was. Defaults to 0.
+        retries (int, optional): How many of these were retries. Defaults to 0.
+    """
+    stack = get_stack()
+    if stack:
+        with lock:
+            stack[-1]["requests"] += 1
+            stack[-1]["bytes_sent"] += bytes_sent
+            stack[-1]["retries"] += retries
+
+
+def wrap(function):
+    """ Wraps a function so that, when it runs on another thread (e.g. in a thread pool), the requests it makes are
+        counted against the stage that was open when it was wrapped.
+
+    Args:
+        function (function): The function to wrap
+
+    Returns:
+        function: The wrapped function
+    """
+    stack = list(get_stack())
+    def run_in_stage(*args, **kwargs):
+        open_stages.stack = list(stack)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            open_stages.stack = []
+    return run_in_stage
+
+
+def percentile(values, fraction):
+    """ Gets a percentile of a list of numbers (nearest rank).
+
+    Args:
+        values (list): The numbers
+        fraction (float): Which percentile, from 0 to 1 (e.g. 0.95)
+
+    Returns:
+        float: The value at that percentile
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def get_summary():
+    """ Summarises this session's stage timings.
+
+    Returns:
+        str: One line per stage with its count and p50, p95 and max durations
+    """
+    with lock:
+        stages = {name: list(values) for name, values in durations.items()}
+    if not stages:
+        return "No stages timed yet."
+    lines = []
+    for name, values in sorted(stages.items()):
+        lines.append(f"{name}: n={len(values)} p50={percentile(values, 0.5):.0f}ms p95={percentile(values, 0.95):.0f}ms "
+                     f"max={max(values):.0f}ms")
+    return "\n".join(lines)
+
+
+def print_summary():
+    """ Prints this session's stage timings.
+    """
+    print("Stage timings this session:")
+    print(get_summary())
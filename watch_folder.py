@@ -0,0 +1,212 @@
+import argparse
+import os
+import threading
+import time
+import quota_scheduler
+import tracing
+
+# Which file types count as images when scanning a directory
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# The zoom tags in our image filenames ('S1_2_10x.jpg') and which image slot on the slide they go in
+IMAGE_1_ZOOM = "10x"
+IMAGE_2_ZOOM = "50x"
+
+# How often (in seconds) to check the folder for new captures
+POLL_SECONDS = 2
+
+# A capture only counts as finished once its size and modification time have stayed the same for a whole poll and it
+# hasn't been touched for at least this many seconds (so we never upload half an image the microscope is still writing)
+STABLE_SECONDS = 2
+
+
+def get_zoom_from_filepath(filepath):
+    """ Gets the microscope zoom tag from an image filename ('S1_2_10x.jpg' --> '10x').
+
+    Args:
+        filepath (str): The path to the image
+
+    Returns:
+        str: The lowercase zoom tag, or an empty string if the filename doesn't have one
+    """
+    filename = os.path.splitext(os.path.basename(filepath))[0] # <--- filename without the extension
+    parts = filename.split('_') # <--- ('S1_2_10x' --> ['S1', '2', '10x'])
+    if len(parts) < 3:
+        return ""
+    return parts[2].lower()
+
+
+class FolderWatcher:
+    """ Watches a directory tree of dated scan folders (<MMDDYY>/S<chip>_<flake>_<zoom>.jpg) for new captures without
+        rescanning it. Each poll only stats the folders we know about; a folder is only listed again when its modification
+        time changes (i.e. a file was added, removed or renamed in it), and only files that are still being written are
+        stat-ed on every poll.
+    """
+
+    def __init__(self, directory, get_flake_id, include_existing=False):
+        """ Starts watching a directory tree.
+
+        Args:
+            directory (str): The top of the directory tree
+            get_flake_id (function): Gets the flake ID from an image's path (flake_tracker.get_flake_id_from_filepath)
+            include_existing (bool, optional): Treat the images already there as new captures. Defaults to False (they 
+                                               are only used to pair with their flake's other image, if it turns up).
+        """
+        self.directory = directory
+        self.get_flake_id = get_flake_id
+        self.folder_mtimes = {} # <--- folder --> its modification time when we last listed it
+        self.seen = set() # <--- every image we've already found
+        self.pending = {} # <--- image that may still be being written --> its (size, modification time) at the last poll
+        self.pairs = {} # <--- flake ID --> {'image_1_path': ..., 'image_2_path': ...} for flakes still missing an image
+        self.list_folder(directory, include_existing)
+
+    def list_folder(self, folder, track_new_images=True):
+        """ Lists a folder, remembering its modification time, and starts tracking any images (and subfolders) we haven't
+            seen before.
+
+        Args:
+            folder (str): The folder to list
+            track_new_images (bool, optional): Whether new images count as captures (False just marks them as seen).
+                                               Defaults to True.
+        """
+        try:
+            self.folder_mtimes[folder] = os.stat(folder).st_mtime_ns # <--- before listing, so a file added while we list is caught next poll
+            entries = list(os.scandir(folder))
+        except FileNotFoundError: # <--- the folder was removed
+            self.folder_mtimes.pop(folder, None)
+            return
+        for entry in entries:
+            if entry.is_dir():
+                if entry.path not in self.folder_mtimes: # <--- a new dated folder
+                    self.list_folder(entry.path, track_new_images)
+            elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.path not in self.seen:
+                self.seen.add(entry.path)
+                if track_new_images:
+                    self.pending[entry.path] = None
+                elif self.add_to_pair(entry.path): # <--- not a new capture, but its other image may still be coming
+                    del self.pairs[self.get_flake_id(entry.path)] # <--- both were there before we started
+
+    def add_to_pair(self, path):
+        """ Files a finished image under its flake, waiting for the flake's other zoom.
+
+        Args:
+            path (str): The image
+
+        Returns:
+            tuple: (flake ID, image 1 path, image 2 path) if the flake now has both of its images, otherwise None
+        """
+        zoom = get_zoom_from_filepath(path)
+        slot = {IMAGE_1_ZOOM: 'image_1_path', IMAGE_2_ZOOM: 'image_2_path'}.get(zoom)
+        if slot is None: # <--- not one of our two zooms
+            return None
+        flake_id = self.get_flake_id(path)
+        images = self.pairs.setdefault(flake_id, {})
+        images[slot] = path
+        if len(images) < 2:
+            return None
+        return flake_id, images['image_1_path'], images['image_2_path']
+
+    def poll(self):
+        """ Checks for new captures.
+
+        Returns:
+            tuple: The images that finished being written since the last poll (list), and the flakes whose 10x and 50x
+                   images are now both finished (list of (flake ID, image 1 path, image 2 path) tuples)
+        """
+        for folder, mtime in list(self.folder_mtimes.items()):
+            try:
+                changed = os.stat(folder).st_mtime_ns != mtime
+            except FileNotFoundError:
+                changed = True
+            if changed: # <--- only list folders something happened in
+                self.list_folder(folder)
+
+        finished = []
+        now = time.time()
+        for path, last_signature in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError: # <--- a temporary file that was renamed or deleted
+                del self.pending[path]
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if signature == last_signature and stat.st_size > 0 and now - stat.st_mtime >= STABLE_SECONDS:
+                del self.pending[path]
+                finished.append(path)
+            else:
+                self.pending[path] = signature # <--- still changing (or new), check again next poll
+
+        complete_pairs = []
+        for path in finished:
+            pair = self.add_to_pair(path)
+            if pair is not None:
+                complete_pairs.append(pair)
+                del self.pairs[pair[0]]
+        return finished, complete_pairs
+
+
+def watch(directory, get_flake_id, on_images, on_pair, stop_event, include_existing=False):
+    """ Polls a directory tree every POLL_SECONDS until stop_event is set. Meant to run on its own thread.
+
+    Args:
+        directory (str): The top of the directory tree
+        get_flake_id (function): Gets the flake ID from an image's path
+        on_images (function): Called with the list of images that just finished being written
+        on_pair (function): Called with the flake ID, image 1 path and image 2 path once both of a flake's images are in
+        stop_event (threading.Event): Set to stop watching
+        include_existing (bool, optional): Treat the images already there as new captures. Defaults to False.
+    """
+    watcher = FolderWatcher(directory, get_flake_id, include_existing)
+    while not stop_event.wait(POLL_SECONDS):
+        try:
+            finished, complete_pairs = watcher.poll()
+        except OSError as e: # <--- e.g. a network drive dropped out; just try again next poll
+            print(f"Could not check {directory}: {e}")
+            continue
+        if finished:
+            on_images(finished)
+        for pair in complete_pairs:
+            on_pair(*pair)
+
+
+def pre_upload_images(image_paths, upload_images):
+    """ Uploads new captures straight away, so when their flake is submitted its images are already hosted and only the
+        sheet row and slide are left to do (the upload is found again by the images' contents).
+
+    Args:
+        image_paths (list): Local paths to the images
+        upload_images (function): Uploads them with the connected services (flake_tracker.upload_images). Passed in 
+                                  rather than imported, so this module never loads a second, unconnected copy of 
+                                  flake_tracker when that is the script being run.
+    """
+    with tracing.stage("pre_upload_images", image_count=len(image_paths), priority=quota_scheduler.BACKGROUND):
+        upload_images(image_paths)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch a directory of dated scan folders and upload new captures as they are saved.")
+    parser.add_argument("directory", help="Directory of dated scan folders (<MMDDYY>/S<chip>_<flake>_<10x|50x>.jpg)")
+    parser.add_argument("--env", default=".env", help="The .env file to use (default: .env)")
+    parser.add_argument("--include-existing", action="store_true", help="Also upload the images already in the directory")
+    args = parser.parse_args(argv)
+
+    import flake_tracker # <--- only when run on its own (see pre_upload_images)
+    flake_tracker.connect_services(args.env)
+
+    def upload(image_paths):
+        try:
+            pre_upload_images(image_paths, flake_tracker.upload_images)
+            print(f"Uploaded {len(image_paths)} image(s)")
+        except Exception as e: # <--- the submit will upload them instead
+            print(f"⚠️ Could not pre-upload {len(image_paths)} image(s): {e}")
+
+    print(f"Watching {args.directory} (Ctrl+C to stop)")
+    try:
+        watch(args.directory, flake_tracker.get_flake_id_from_filepath, upload, lambda flake_id, *_: print(f"✅ {flake_id} is ready to submit"), threading.Event(),
+              args.include_existing)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()